@@ -0,0 +1,161 @@
+# backend/app/cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from .config import CACHE_DB_PATH, CACHE_MAX_BYTES, CACHE_MAX_ENTRIES
+
+# Отличает промах от закэшированного None (например, sqlite_error=None)
+MISS = object()
+
+
+def normalize_sql(sql: str) -> str:
+    """Приводит переводы строк к \\n, чтобы CRLF и LF давали один ключ"""
+    return sql.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def content_digest(data) -> str:
+    """SHA-256 от строки, байтов или файлового объекта (читается блоками)"""
+    h = hashlib.sha256()
+    if isinstance(data, str):
+        h.update(data.encode("utf-8"))
+    elif isinstance(data, (bytes, bytearray)):
+        h.update(data)
+    else:
+        for chunk in iter(lambda: data.read(1024 * 1024), b""):
+            h.update(chunk)
+        data.seek(0)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов этапов, адресуемый по содержимому.
+
+    Ключ — хэш входных данных плюс конфигурация этапа (модель, диалект,
+    правила), поэтому смена настроек LLM не сбрасывает кэш линтера.
+    Размер ограничен числом записей и суммарным объёмом JSON-значений.
+    Если задан db_path, записи дублируются в SQLite-файл и переживают перезапуск.
+    Соединение с файлом открывается лениво в каждом процессе: кэш, унаследованный
+    воркером пула при fork, не пользуется соединением родителя.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 db_path: str = CACHE_DB_PATH):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+        self.db_path = db_path or None
+        self._conn = None
+        self._conn_pid = None
+
+    @property
+    def _db(self):
+        """Соединение с SQLite-файлом текущего процесса или None без db_path"""
+        if self.db_path is None:
+            return None
+        if self._conn_pid != os.getpid():
+            # Соединение родителя после fork не закрываем и не используем:
+            # SQLite запрещает работать с ним из нескольких процессов
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, stage TEXT, value TEXT, used REAL)"
+            )
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def key(stage: str, digest: str, config: dict) -> str:
+        raw = json.dumps([stage, digest, config], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, stage: str, key: str):
+        if not self.enabled:
+            return MISS
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits[stage] += 1
+                return json.loads(entry[1])
+
+            db = self._db
+            if db is not None:
+                row = db.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    db.execute("UPDATE cache SET used = ? WHERE key = ?", (time.time(), key))
+                    self._store(key, stage, row[0])
+                    self.hits[stage] += 1
+                    return json.loads(row[0])
+
+            self.misses[stage] += 1
+            return MISS
+
+    def put(self, stage: str, key: str, value) -> None:
+        if not self.enabled:
+            return
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._store(key, stage, raw)
+            db = self._db
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO cache (key, stage, value, used) VALUES (?, ?, ?, ?)",
+                    (key, stage, raw, time.time()),
+                )
+                self._prune_db()
+
+    def _store(self, key: str, stage: str, raw: str) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[1])
+        if len(raw) > self.max_bytes:
+            return
+        self._entries[key] = (stage, raw)
+        self._bytes += len(raw)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _prune_db(self) -> None:
+        # На диске держим не больше записей, чем в памяти, вытесняя давно неиспользованные
+        count = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self) -> dict:
+        stages = sorted(set(self.hits) | set(self.misses))
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "persistent": self.db_path is not None,
+            "stages": {
+                stage: {"hits": self.hits[stage], "misses": self.misses[stage]}
+                for stage in stages
+            },
+        }
+
+    def close(self) -> None:
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = self._conn_pid = None
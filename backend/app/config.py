@@ -2,6 +2,101 @@ import os
 
 # Модель для семантического анализа
 CODET5_MODEL = os.getenv("CODET5_MODEL", "Salesforce/codet5-base")
+# LLM_ENABLED=0 полностью отключает семантический анализ (модель не загружается)
+LLM_ENABLED = os.getenv("LLM_ENABLED", "1") == "1"
+# Динамическая int8-квантизация линейных слоёв для CPU
+LLM_QUANTIZE = os.getenv("LLM_QUANTIZE", "0") == "1"
+# Загружать модель при импорте приложения, до fork воркеров
+# (gunicorn --preload, пул процессов), чтобы они делили одну копию весов
+LLM_PRELOAD = os.getenv("LLM_PRELOAD", "0") == "1"
+# Режим tiered: CodeT5 запускается, только если детерминированные правила
+# (этап rules) не нашли ошибок; запрос с deep=true запускает его всегда.
+# LLM_TIERED=0 — CodeT5 всегда, как раньше
+LLM_TIERED = os.getenv("LLM_TIERED", "1") == "1"
+# Микропакетирование LLM-запросов: до LLM_BATCH_SIZE промптов за один generate,
+# ожидание добора пачки не дольше LLM_BATCH_MAX_WAIT_MS. 1 — без пакетов.
+# С пакетами модель работает в основном процессе, а не в пуле процессов
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1"))
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "10"))
+# Скрипт проверяется по фрагментам-таблицам; без батчера фрагменты одного
+# скрипта генерируются пачками по LLM_CHUNK_BATCH_SIZE
+LLM_CHUNK_BATCH_SIZE = max(1, int(os.getenv("LLM_CHUNK_BATCH_SIZE", "8")))
+# Сколько отчётов по фрагментам хранить в кэше (0 — не кэшировать)
+LLM_CHUNK_CACHE_SIZE = int(os.getenv("LLM_CHUNK_CACHE_SIZE", "4096"))
+
+# Файлы диаграмм больше этого размера (в байтах) разбираются потоково
+STREAM_PARSE_THRESHOLD = int(os.getenv("STREAM_PARSE_THRESHOLD", str(5 * 1024 * 1024)))
+
+# Сжатые страницы draw.io разбираются параллельно в пуле процессов (не больше
+# DRAWIO_PAGE_WORKERS вызовов на файл), если страниц несколько и их суммарный
+# объём не меньше DRAWIO_PARALLEL_MIN_BYTES; DRAWIO_PAGE_WORKERS<2 — последовательно
+# (меньшие файлы быстрее разобрать в одном процессе). 0 или 1 — без параллелизма
+DRAWIO_PAGE_WORKERS = int(os.getenv("DRAWIO_PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+DRAWIO_PARALLEL_MIN_BYTES = int(os.getenv("DRAWIO_PARALLEL_MIN_BYTES", str(256 * 1024)))
+
+# Режим генерации SQL по умолчанию (параметр mode в /convert):
+# alter — CREATE TABLE, затем ALTER TABLE ... ADD FOREIGN KEY на каждую связь;
+# ordered — таблицы в порядке зависимостей с внешними ключами внутри CREATE TABLE
+EMIT_MODE = os.getenv("EMIT_MODE", "alter")
+
+# Загрузки больше порога (в байтах) спулятся на диск, меньшие остаются в памяти
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(1024 * 1024)))
+# Максимальный размер тела запроса (в байтах); 0 — без ограничения
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", str(100 * 1024 * 1024)))
+
+# Количество переиспользуемых SQLite-in-memory баз для check_sqlite
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+
+# Пулы исполнителей для этапов валидации.
+# PROCESS_POOL_SIZE=0 — выполнять SQLFluff и CodeT5 в пуле потоков
+PROCESS_POOL_SIZE = int(os.getenv("PROCESS_POOL_SIZE", "2"))
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "4"))
+# Способ запуска процессов (fork/spawn/forkserver); пусто — по умолчанию для ОС
+PROCESS_POOL_START_METHOD = os.getenv("PROCESS_POOL_START_METHOD", "")
+# Сколько задач может ждать в очереди пула сверх числа воркеров; дальше — 503
+EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", "32"))
+# Значение заголовка Retry-After (в секундах) при переполнении очереди
+EXECUTOR_RETRY_AFTER = int(os.getenv("EXECUTOR_RETRY_AFTER", "5"))
+
+# Скрипты от LINT_SPLIT_MIN_STATEMENTS инструкций линтуются блоками параллельно
+# в пуле процессов (0 — всегда целиком). Правила, сравнивающие стиль по всему
+# файлу (например, единый регистр идентификаторов), тогда работают в пределах блока
+LINT_SPLIT_MIN_STATEMENTS = int(os.getenv("LINT_SPLIT_MIN_STATEMENTS", "200"))
+
+# Сколько разобранных скриптов (ParsedScript) хранить по хэшу текста; 0 — не хранить
+PARSED_SCRIPT_CACHE_SIZE = int(os.getenv("PARSED_SCRIPT_CACHE_SIZE", "32"))
+
+# Таймауты этапов валидации (в секундах); по истечении этап помечается timed_out
+STAGE_TIMEOUT = float(os.getenv("STAGE_TIMEOUT", "30"))
+LLM_STAGE_TIMEOUT = float(os.getenv("LLM_STAGE_TIMEOUT", "120"))
+
+# Кэш результатов /convert и этапов /validate.
+# CACHE_MAX_ENTRIES=0 отключает кэш; CACHE_DB_PATH — файл SQLite для хранения между перезапусками
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "")
+
+# Инкрементальная перепроверка (поле session в /validate): сколько последних
+# сессий хранить в памяти вместе с результатами по таблицам
+INCREMENTAL_SESSIONS = int(os.getenv("INCREMENTAL_SESSIONS", "256"))
+
+# Очередь задач /jobs для долгих проверок. По умолчанию задачи хранятся только
+# в памяти; с JOBS_DB_PATH (файл SQLite, например в каталоге данных сервиса)
+# они переживают перезапуск. Завершённые удаляются через JOBS_TTL секунд
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "")
+# Сколько задач выполняется одновременно
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+# Сколько задач может ждать в очереди; дальше — 503
+JOBS_MAX_QUEUED = int(os.getenv("JOBS_MAX_QUEUED", "100"))
+JOBS_TTL = float(os.getenv("JOBS_TTL", "3600"))
+# Наибольшее ожидание long-poll в GET /jobs/{id}?wait= (в секундах)
+JOBS_MAX_WAIT = float(os.getenv("JOBS_MAX_WAIT", "60"))
+
+# Профилирование отдельных запросов по заголовку X-Profile: cprofile | sample.
+# Выключено по умолчанию; дампы пишутся в PROFILE_DIR
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
 
 # Настройки сервера
 HOST = os.getenv("HOST", "0.0.0.0")
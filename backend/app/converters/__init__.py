@@ -0,0 +1,33 @@
+import io
+import os
+
+from .emitter import EMIT_MODES, SQL_DIALECTS, DeployPlan, convert, deferred_foreign_keys, emit_sql, plan_deploy
+from .erd_converter import parse_erd, read_erd
+from .graphml_converter import parse_graphml, read_graphml
+from .model import Column, ForeignKey, Schema, Table
+from .types import TypeResolver, get_type_resolver
+from .xml_converter import parse_drawio_xml, read_drawio_xml
+
+# Расширение файла → функция чтения диаграммы в промежуточную схему
+READERS = {
+    ".erd": read_erd,
+    ".graphml": read_graphml,
+    ".xml": read_drawio_xml,
+    ".drawio": read_drawio_xml,
+}
+
+
+def get_reader(filename):
+    """Возвращает функцию чтения по расширению имени файла или None"""
+    return READERS.get(os.path.splitext(filename or "")[1])
+
+
+def convert_document(filename, data, streaming=False, mode="alter", dialect=None):
+    """
+    Конвертирует диаграмму, переданную байтами, по расширению имени файла.
+    Функция уровня модуля: её вместе с аргументами можно отправить в пул процессов.
+    """
+    reader = get_reader(filename)
+    if reader is None:
+        return None, ["Ошибка: Неподдерживаемый формат файла"]
+    return convert(reader, io.BytesIO(data), streaming, mode, dialect)
@@ -0,0 +1,234 @@
+from dataclasses import dataclass, field
+
+from .model import ForeignKey, Schema, Table
+from .types import get_type_resolver
+
+# Режимы генерации SQL:
+#   alter   — все CREATE TABLE, затем ALTER TABLE ... ADD FOREIGN KEY на каждую связь;
+#   ordered — таблицы в порядке зависимостей, внешние ключи внутри CREATE TABLE
+EMIT_MODES = ("alter", "ordered")
+# Целевые диалекты SQL (имена как в sqlglot и SQLFluff); None — общий SQL
+SQL_DIALECTS = ("postgres", "mysql", "sqlite")
+# Диалекты, которые проверяют цель внешнего ключа уже при CREATE TABLE: связи,
+# разрывающие циклы, добавляются в них ALTER TABLE после всех таблиц. SQLite
+# и общий SQL (его скрипт выполняется в SQLite) принимают ссылки вперёд
+DEFERRING_DIALECTS = ("postgres", "mysql")
+
+
+@dataclass(slots=True)
+class DeployPlan:
+    """
+    Порядок создания таблиц для режима ordered.
+
+    levels — уровни таблиц: таблицы одного уровня ссылаются только на таблицы
+    предыдущих уровней, поэтому их можно создавать одновременно.
+    deferred — связи, разорванные для устранения циклов; в DEFERRING_DIALECTS
+    они добавляются после всех таблиц (в PostgreSQL — отложенными
+    DEFERRABLE INITIALLY DEFERRED ограничениями), в остальных остаются
+    внутри CREATE TABLE.
+    """
+    levels: list[list[str]] = field(default_factory=list)
+    deferred: list[ForeignKey] = field(default_factory=list)
+
+
+def strongly_connected(depends: dict[str, set[str]]) -> dict[str, str]:
+    """Компоненты сильной связности (Тарьян, без рекурсии): вершина → корень компоненты"""
+    index, low, component = {}, {}, {}
+    stack, on_stack = [], set()
+    for root in depends:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(depends[root]))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(depends[child])))
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component[member] = node
+                        if member == node:
+                            break
+    return component
+
+
+def plan_deploy(schema: Schema) -> DeployPlan:
+    """
+    Топологическая сортировка таблиц по внешним ключам (алгоритм Кана по уровням).
+
+    Ссылки таблицы на саму себя и на отсутствующие таблицы порядок не задают.
+    Если оставшиеся таблицы образуют цикл, разрывается одна таблица цикла —
+    та, у которой меньше всего неразрешённых ссылок; они уходят в deferred.
+    """
+    names: dict[str, str] = {}
+    for table in schema.tables:
+        if table.columns:
+            names.setdefault(table.name.lower(), table.name)
+
+    waiting: dict[str, set[str]] = {name: set() for name in names}
+    dependents: dict[str, set[str]] = {name: set() for name in names}
+    for fk in schema.foreign_keys:
+        source, target = fk.table.lower(), fk.ref_table.lower()
+        if source in names and target in names and source != target:
+            waiting[source].add(target)
+            dependents[target].add(source)
+
+    plan = DeployPlan()
+    broken: set[tuple[str, str]] = set()
+    position = {name: i for i, name in enumerate(names)}
+    ready = [name for name, deps in waiting.items() if not deps]
+    while waiting:
+        if not ready:
+            # Остались только циклы и зависящие от них таблицы. Разрываем цикл
+            # без внешних зависимостей: тогда отложенными станут только его связи
+            component = strongly_connected(waiting)
+            victim = min(
+                (name for name, deps in waiting.items()
+                 if all(component[dep] == component[name] for dep in deps)),
+                key=lambda name: len(waiting[name]),
+            )
+            for dep in waiting[victim]:
+                broken.add((victim, dep))
+                dependents[dep].discard(victim)
+            waiting[victim].clear()
+            ready = [victim]
+
+        plan.levels.append([names[name] for name in ready])
+        next_ready = []
+        for name in ready:
+            del waiting[name]
+            for dependent in dependents[name]:
+                deps = waiting[dependent]
+                deps.discard(name)
+                if not deps:
+                    next_ready.append(dependent)
+        ready = sorted(next_ready, key=position.__getitem__)
+
+    plan.deferred = [fk for fk in schema.foreign_keys if (fk.table.lower(), fk.ref_table.lower()) in broken]
+    return plan
+
+
+def _create_table(table: Table, foreign_keys: list[ForeignKey] = (), dialect: str | None = None) -> str:
+    # Типы схемы записаны в общем виде; для диалекта — в его написании
+    resolve = get_type_resolver(dialect).resolve if dialect else None
+    pk_columns = table.primary_key
+    columns = []
+    for col in table.columns:
+        col_type = resolve(col.type, default=None) if resolve else col.type
+        # Одиночный PK пишется inline, составной — отдельным ограничением
+        if col.primary_key and len(pk_columns) == 1:
+            columns.append(f"{col.name} {col_type} PRIMARY KEY")
+        else:
+            columns.append(f"{col.name} {col_type}")
+
+    if len(pk_columns) > 1:
+        columns.append(f"PRIMARY KEY ({', '.join(pk_columns)})")
+
+    for fk in foreign_keys:
+        columns.append(f"FOREIGN KEY ({fk.column}) REFERENCES {fk.ref_table}({fk.ref_column})")
+
+    return (
+        f"CREATE TABLE {table.name} (\n    " +
+        ",\n    ".join(columns) +
+        "\n);"
+    )
+
+
+def _add_foreign_key(fk: ForeignKey, deferred: bool = False) -> str:
+    suffix = " DEFERRABLE INITIALLY DEFERRED" if deferred else ""
+    return (
+        f"ALTER TABLE {fk.table} "
+        f"ADD FOREIGN KEY ({fk.column}) "
+        f"REFERENCES {fk.ref_table}({fk.ref_column}){suffix};"
+    )
+
+
+def deferred_foreign_keys(plan: DeployPlan, dialect: str | None) -> list[ForeignKey]:
+    """Связи плана, которые в этом диалекте выводятся ALTER TABLE после всех таблиц"""
+    return plan.deferred if dialect in DEFERRING_DIALECTS else []
+
+
+def emit_sql(schema: Schema, mode: str = "alter", dialect: str | None = None) -> list[str]:
+    """
+    Генерирует SQL по схеме.
+
+    alter: CREATE TABLE для каждой таблицы со столбцами, затем
+    ALTER TABLE ... ADD FOREIGN KEY для каждой связи.
+    ordered: CREATE TABLE в порядке plan_deploy с внешними ключами внутри
+    определения таблицы; ALTER остаются только для связей таблиц, которых нет
+    в схеме (их покажут AST-проверки), и в DEFERRING_DIALECTS — для связей,
+    разрывающих циклы.
+
+    dialect (SQL_DIALECTS) задаёт написание типов и ограничений; None — общий SQL.
+    """
+    if mode == "ordered":
+        return _emit_inline(schema, dialect, plan_deploy(schema))
+    if dialect == "sqlite":
+        # SQLite не поддерживает ALTER TABLE ... ADD FOREIGN KEY
+        return _emit_inline(schema, dialect)
+
+    sql_commands = [_create_table(table, dialect=dialect) for table in schema.tables if table.columns]
+    for fk in schema.foreign_keys:
+        sql_commands.append(_add_foreign_key(fk))
+    return sql_commands
+
+
+def _emit_inline(schema: Schema, dialect: str | None, plan: DeployPlan | None = None) -> list[str]:
+    """Внешние ключи внутри CREATE TABLE; таблицы в порядке plan или в исходном"""
+    deferred = deferred_foreign_keys(plan, dialect) if plan is not None else []
+    deferred_ids = {id(fk) for fk in deferred}
+
+    # Таблицы с одинаковым именем выводятся подряд, связи — в первой из них
+    tables: dict[str, list[Table]] = {}
+    for table in schema.tables:
+        if table.columns:
+            tables.setdefault(table.name.lower(), []).append(table)
+
+    inline: dict[str, list[ForeignKey]] = {}
+    orphans = []
+    for fk in schema.foreign_keys:
+        if id(fk) in deferred_ids:
+            continue
+        if fk.table.lower() in tables:
+            inline.setdefault(fk.table.lower(), []).append(fk)
+        else:
+            orphans.append(fk)
+
+    order = [name.lower() for level in plan.levels for name in level] if plan is not None else list(tables)
+    sql_commands = []
+    for key in order:
+        first, *rest = tables[key]
+        sql_commands.append(_create_table(first, inline.get(key, []), dialect))
+        sql_commands += [_create_table(table, dialect=dialect) for table in rest]
+    # Отложенная проверка есть в PostgreSQL, но не в MySQL
+    sql_commands += [_add_foreign_key(fk, deferred=dialect == "postgres") for fk in deferred]
+    sql_commands += [_add_foreign_key(fk) for fk in orphans]
+    return sql_commands
+
+
+def convert(reader, source, streaming=False, mode="alter", dialect=None):
+    """
+    Читает диаграмму reader'ом и генерирует SQL.
+    Возвращает (схема, SQL); при ошибке разбора схема — None, а SQL — текст ошибки.
+    """
+    try:
+        schema = reader(source, streaming=streaming)
+    except Exception as e:
+        return None, [f"Ошибка: {str(e)}"]
+    return schema, emit_sql(schema, mode, dialect) or ["Не обнаружено таблиц"]
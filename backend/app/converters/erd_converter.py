@@ -1,101 +1,107 @@
 import xml.etree.ElementTree as ET
 
-
-def parse_erd(file_path):
-    """Конвертирует ERD-файл в SQL"""
-    try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-
-        entities = {}
-        fk_constraints = []
-
-        # Парсим сущности
-        for entity in root.findall('.//entity'):
-            entity_id = entity.get('id')
-            entities[entity_id] = {
-                'name': entity.get('name'),
-                'attributes': [],
-                'fk_columns': []
-            }
-
-            for attribute in entity.findall('.//attribute'):
-                entities[entity_id]['attributes'].append({
-                    'name': attribute.get('name'),
-                    'type': attribute.get('type', 'VARCHAR(255)'),
-                    'is_pk': attribute.get('primary', 'false') == 'true'
-                })
-
-        # Парсим связи
-        for relation in root.findall('.//relation'):
-            if relation.get('type') == 'fk':
-                fk_entity_id = relation.get('fk-ref')
-                pk_entity_id = relation.get('pk-ref')
-
-                if fk_entity_id in entities and pk_entity_id in entities:
-                    fk_table = entities[fk_entity_id]['name']
-                    pk_table = entities[pk_entity_id]['name']
-
-                    # Находим PK целевой таблицы
-                    pk_column = next(
-                        (attr['name'] for attr in entities[pk_entity_id]['attributes'] if attr['is_pk']),
-                        'id'
-                    )
-
-                    # Добавляем колонку FK
-                    fk_column = f"{pk_table}_id"
-                    entities[fk_entity_id]['fk_columns'].append({
-                        'name': fk_column,
-                        'type': 'INTEGER'
-                    })
-
-                    # Запоминаем ограничение
-                    fk_constraints.append({
-                        'table': fk_table,
-                        'column': fk_column,
-                        'target_table': pk_table,
-                        'target_column': pk_column
-                    })
-
-        # Генерация SQL
-        sql_commands = []
-        for entity in entities.values():
-            if not entity['name']:
-                continue
-
-            columns = []
-            pk_columns = []
-
-            # Атрибуты
-            for attr in entity['attributes']:
-                col_def = f"{attr['name']} {attr['type']}"
-                if attr['is_pk']:
-                    pk_columns.append(attr['name'])
-                columns.append(col_def)
-
-            # Колонки FK
-            for fk in entity['fk_columns']:
-                columns.append(f"{fk['name']} {fk['type']}")
-
-            # Первичный ключ
-            if pk_columns:
-                columns.append(f"PRIMARY KEY ({', '.join(pk_columns)})")
-
-            sql_commands.append(
-                f"CREATE TABLE {entity['name']} (\n    " +
-                ",\n    ".join(columns) +
-                "\n);"
+from .emitter import convert
+from .model import Column, ForeignKey, Schema, Table
+from .streaming import iter_elements
+from .types import get_type_resolver
+
+resolve_type = get_type_resolver().resolve
+
+
+def _read_entity(entity):
+    """Разбирает элемент entity в таблицу"""
+    return Table(
+        name=entity.get('name'),
+        columns=[
+            Column(
+                name=attribute.get('name'),
+                # Нераспознанный тип оставляем как есть: в ERD он обычно уже записан на SQL
+                type=resolve_type(attribute.get('type'), default=None),
+                primary_key=attribute.get('primary', 'false') == 'true'
             )
+            for attribute in entity.findall('.//attribute')
+        ]
+    )
 
-        # Внешние ключи
-        for fk in fk_constraints:
-            sql_commands.append(
-                f"ALTER TABLE {fk['table']} "
-                f"ADD FOREIGN KEY ({fk['column']}) "
-                f"REFERENCES {fk['target_table']}({fk['target_column']});"
-            )
 
-        return sql_commands
+def _read_relation(relation):
+    """Возвращает пару (fk-ref, pk-ref) для связи типа fk или None"""
+    if relation.get('type') == 'fk':
+        return relation.get('fk-ref'), relation.get('pk-ref')
+    return None
+
+
+def _collect_tree(file_path):
+    tree = ET.parse(file_path)
+    root = tree.getroot()
+
+    entities = {}
+    for entity in root.findall('.//entity'):
+        entities[entity.get('id')] = _read_entity(entity)
+
+    relations = []
+    for relation in root.findall('.//relation'):
+        ref = _read_relation(relation)
+        if ref:
+            relations.append(ref)
+
+    return entities, relations
+
+
+def _collect_stream(file_path):
+    entities = {}
+    relations = []
+
+    # Один проход по документу; обработанные элементы сразу освобождаются
+    for elem in iter_elements(file_path, ('entity', 'relation')):
+        if elem.tag == 'entity':
+            entities[elem.get('id')] = _read_entity(elem)
+        else:
+            ref = _read_relation(elem)
+            if ref:
+                relations.append(ref)
+
+    return entities, relations
 
-    except Exception as e:
-        return [f"Ошибка: {str(e)}"]
\ No newline at end of file
+
+def read_erd(file_path, streaming=False):
+    """
+    Читает ERD-файл в промежуточную схему.
+
+    file_path — путь или файловый объект. При streaming=True документ читается
+    через iterparse за один проход, без построения полного дерева.
+    """
+    if streaming:
+        entities, relations = _collect_stream(file_path)
+    else:
+        entities, relations = _collect_tree(file_path)
+
+    schema = Schema(tables=[entity for entity in entities.values() if entity.name])
+
+    # Связываем сущности
+    for fk_entity_id, pk_entity_id in relations:
+        if fk_entity_id in entities and pk_entity_id in entities:
+            fk_table = entities[fk_entity_id]
+            pk_table = entities[pk_entity_id]
+
+            # Находим PK целевой таблицы
+            pk_column = next(iter(pk_table.primary_key), 'id')
+
+            # Добавляем колонку FK
+            fk_column = f"{pk_table.name}_id"
+            fk_table.columns.append(Column(name=fk_column, type='INTEGER'))
+
+            # Запоминаем ограничение
+            schema.foreign_keys.append(ForeignKey(
+                table=fk_table.name,
+                column=fk_column,
+                ref_table=pk_table.name,
+                ref_column=pk_column
+            ))
+
+    return schema
+
+
+def parse_erd(file_path, streaming=False):
+    """Конвертирует ERD-файл в SQL"""
+    return convert(read_erd, file_path, streaming)[1]
@@ -0,0 +1,33 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class Column:
+    name: str
+    type: str
+    primary_key: bool = False
+
+
+@dataclass(slots=True)
+class ForeignKey:
+    table: str
+    column: str
+    ref_table: str
+    ref_column: str
+
+
+@dataclass(slots=True)
+class Table:
+    name: str
+    columns: list[Column] = field(default_factory=list)
+
+    @property
+    def primary_key(self) -> list[str]:
+        return [col.name for col in self.columns if col.primary_key]
+
+
+@dataclass(slots=True)
+class Schema:
+    """Промежуточное представление схемы, общее для всех конвертеров"""
+    tables: list[Table] = field(default_factory=list)
+    foreign_keys: list[ForeignKey] = field(default_factory=list)
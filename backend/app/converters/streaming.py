@@ -0,0 +1,33 @@
+import xml.etree.ElementTree as ET
+
+
+def iter_elements(source, tags):
+    """
+    Потоково обходит XML-документ и отдаёт завершённые элементы с тегами из tags.
+
+    После обработки элемент отсоединяется от родителя и очищается, поэтому
+    в памяти держится не всё дерево, а только текущий элемент верхнего уровня.
+    Вложенные совпадения (например, узел внутри группы) остаются в родителе
+    до его закрытия, чтобы поиск по поддереву работал так же, как в ET.parse.
+    """
+    tags = set(tags)
+    stack = []
+    open_matches = 0
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            if elem.tag in tags:
+                open_matches += 1
+            continue
+
+        stack.pop()
+        if elem.tag in tags:
+            open_matches -= 1
+            yield elem
+
+        # Элемент внутри открытого совпадения ещё понадобится родителю
+        if open_matches == 0:
+            if stack:
+                stack[-1].remove(elem)
+            elem.clear()
@@ -0,0 +1,140 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+DEFAULT_TYPE = "VARCHAR(255)"
+
+# Написание типа в диаграмме (в нижнем регистре) → базовый SQL-тип
+TYPE_ALIASES = {
+    "int": "INTEGER",
+    "integer": "INTEGER",
+    "int4": "INTEGER",
+    "mediumint": "INTEGER",
+    "serial": "INTEGER",
+    "bigint": "BIGINT",
+    "int8": "BIGINT",
+    "long": "BIGINT",
+    "bigserial": "BIGINT",
+    "smallint": "SMALLINT",
+    "int2": "SMALLINT",
+    "short": "SMALLINT",
+    "tinyint": "SMALLINT",
+    "str": "VARCHAR",
+    "string": "VARCHAR",
+    "varchar": "VARCHAR",
+    "nvarchar": "VARCHAR",
+    "character varying": "VARCHAR",
+    "char": "CHAR",
+    "character": "CHAR",
+    "nchar": "CHAR",
+    "text": "TEXT",
+    "clob": "TEXT",
+    "longtext": "TEXT",
+    "mediumtext": "TEXT",
+    "date": "DATE",
+    "time": "TIME",
+    "datetime": "TIMESTAMP",
+    "timestamp": "TIMESTAMP",
+    "timestamptz": "TIMESTAMPTZ",
+    "timestamp with time zone": "TIMESTAMPTZ",
+    "bool": "BOOLEAN",
+    "boolean": "BOOLEAN",
+    "float": "FLOAT",
+    "real": "FLOAT",
+    "double": "FLOAT",
+    "double precision": "FLOAT",
+    "number": "NUMERIC",
+    "numeric": "NUMERIC",
+    "decimal": "NUMERIC",
+    "money": "NUMERIC",
+    "uuid": "UUID",
+    "guid": "UUID",
+    "blob": "BLOB",
+    "binary": "BLOB",
+    "bytea": "BLOB",
+    "varbinary": "BLOB",
+    "json": "JSON",
+    "jsonb": "JSON",
+}
+
+# Параметры по умолчанию, если в диаграмме они не указаны
+DEFAULT_ARGS = {"VARCHAR": "(255)"}
+
+# Целочисленные типы: параметр у них — ширина отображения MySQL («tinyint(1)»),
+# которую другие СУБД не принимают, поэтому он отбрасывается
+_WIDTH_ONLY = {"INTEGER", "BIGINT", "SMALLINT"}
+
+# Целевой диалект → написание базовых типов, отличающееся от общего
+DIALECT_TYPES = {
+    "generic": {},
+    "postgres": {"FLOAT": "DOUBLE PRECISION", "BLOB": "BYTEA", "JSON": "JSONB"},
+    "mysql": {"TIMESTAMP": "DATETIME", "TIMESTAMPTZ": "DATETIME", "UUID": "CHAR(36)", "FLOAT": "DOUBLE"},
+    "sqlite": {"TIMESTAMPTZ": "TIMESTAMP", "UUID": "TEXT", "JSON": "TEXT"},
+}
+
+# Псевдонимы из нескольких слов проверяются раньше своих префиксов («double precision» до «double»)
+_ALIAS_PATTERN = "|".join(
+    re.escape(alias).replace(r"\ ", r"\s+")
+    for alias in sorted(TYPE_ALIASES, key=len, reverse=True)
+)
+# Псевдоним целым словом и необязательные параметры: «varchar(100)», «numeric(10, 2)»,
+# но не «interval» или «point» (в отличие от поиска подстроки «int»)
+_TYPE_RE = re.compile(rf"\b({_ALIAS_PATTERN})\b\s*(\(\s*\d+\s*(?:,\s*\d+\s*)?\))?")
+
+
+class TypeResolver:
+    """
+    Приводит типы столбцов из диаграмм к SQL-типам целевого диалекта.
+
+    Сначала точное совпадение по словарю, затем один скомпилированный regex,
+    которому должна соответствовать вся строка. Тип с модификаторами
+    («int unsigned», «integer[]», «varchar(20) not null») остаётся как есть:
+    он уже записан на SQL, и модификаторы терять нельзя. Результат
+    запоминается для каждой встреченной строки, так что на широких таблицах
+    тип не ищется заново для каждого столбца.
+    """
+
+    def __init__(self, dialect: str = "generic", cache_size: int = 4096):
+        if dialect not in DIALECT_TYPES:
+            raise ValueError(f"Неизвестный диалект: {dialect}")
+        self.dialect = dialect
+        self._spelling = DIALECT_TYPES[dialect]
+        self._exact = {alias: self._spell(base, DEFAULT_ARGS.get(base, "")) for alias, base in TYPE_ALIASES.items()}
+        self._resolve = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def resolve(self, raw: Optional[str], default: Optional[str] = DEFAULT_TYPE) -> str:
+        """
+        SQL-тип для строки из диаграммы. Если тип не распознан, возвращается
+        default, а при default=None — исходная строка (тип уже записан на SQL)
+        """
+        resolved = self._resolve(raw or "")
+        if resolved is not None:
+            return resolved
+        return raw if default is None and raw else (default or DEFAULT_TYPE)
+
+    def _spell(self, base: str, args: str) -> str:
+        spelled = self._spelling.get(base, base)
+        # Написание диалекта с собственными параметрами (CHAR(36)) их не заменяет
+        return spelled if "(" in spelled else spelled + args
+
+    def _lookup(self, raw: str) -> Optional[str]:
+        key = " ".join(raw.lower().split())
+        exact = self._exact.get(key)
+        if exact is not None:
+            return exact
+        match = _TYPE_RE.match(key)
+        if match is None:
+            return None
+        if match.end() < len(key):
+            return " ".join(raw.split())
+        base = TYPE_ALIASES[" ".join(match.group(1).split())]
+        if base in _WIDTH_ONLY:
+            return self._spell(base, "")
+        args = match.group(2) or DEFAULT_ARGS.get(base, "")
+        return self._spell(base, args.replace(" ", ""))
+
+
+@lru_cache(maxsize=None)
+def get_type_resolver(dialect: str = "generic") -> TypeResolver:
+    """Общий для всех конвертеров экземпляр TypeResolver на диалект"""
+    return TypeResolver(dialect)
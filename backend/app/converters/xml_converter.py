@@ -1,125 +1,374 @@
+import base64
+import html
+import re
+import zlib
 import xml.etree.ElementTree as ET
-from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
 
+from ..config import DRAWIO_PARALLEL_MIN_BYTES
+from .emitter import convert
+from .model import Column, ForeignKey, Schema, Table
+from .types import get_type_resolver
 
-def parse_drawio_xml(file_path):
-    """Конвертирует XML из Draw.io в SQL с FOREIGN KEY через ALTER TABLE"""
-    try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-
-        # Namespace для Draw.io
-        ns = {'mx': 'http://schemas.microsoft.com/office/2006/01/customui'}
-
-        tables = {}
-        relationships = []
-
-        # 1. Парсинг таблиц
-        for cell in root.findall('.//mxCell', ns):
-            if cell.get('style', '').startswith('shape=table'):
-                table_id = cell.get('id')
-                value = cell.get('value', '')
-
-                if value:
-                    # Очистка HTML-тегов и разбор структуры
-                    clean_value = value.replace('<br>', '\n').replace('<b>', '').replace('</b>', '')
-                    parts = [p.strip() for p in clean_value.split('\n') if p.strip()]
-
-                    if parts:
-                        table_name = parts[0]
-                        columns = []
-                        pk = None
-
-                        for part in parts[1:]:
-                            if part.startswith('PK:'):
-                                pk = part.split(':')[1].strip()
-                            elif ':' in part:
-                                col_name, col_type = map(str.strip, part.split(':', 1))
-                                columns.append((col_name, col_type))
-                            else:
-                                columns.append((part, 'VARCHAR(255)'))
-
-                        tables[table_id] = {
-                            'name': table_name,
-                            'columns': columns,
-                            'pk': pk or (columns[0][0] if columns else 'id'),
-                            'fk_columns': []
-                        }
-
-        # 2. Парсинг связей
-        for edge in root.findall('.//mxCell', ns):
-            if edge.get('edge') == '1':
-                source = edge.get('source')
-                target = edge.get('target')
-
-                if source in tables and target in tables:
-                    target_table = tables[target]['name']
-                    target_pk = tables[target]['pk']
-                    fk_column = f"{target_table.lower()}_id"
-
-                    # Добавляем FK колонку в исходную таблицу
-                    tables[source]['fk_columns'].append({
-                        'name': fk_column,
-                        'ref_table': target_table,
-                        'ref_column': target_pk
-                    })
-
-                    relationships.append({
-                        'source_table': tables[source]['name'],
-                        'source_column': fk_column,
-                        'target_table': target_table,
-                        'target_column': target_pk
-                    })
-
-        # 3. Генерация SQL
-        sql_commands = []
-        type_mapping = {
-            'int': 'INTEGER',
-            'integer': 'INTEGER',
-            'str': 'VARCHAR(255)',
-            'string': 'VARCHAR(255)',
-            'text': 'TEXT',
-            'date': 'DATE',
-            'datetime': 'TIMESTAMP',
-            'bool': 'BOOLEAN',
-            'float': 'FLOAT',
-            'number': 'NUMERIC'
-        }
-
-        # Сначала создаем все таблицы без FK constraints
-        for table in tables.values():
-            if not table['columns']:
+
+resolve_type = get_type_resolver().resolve
+
+# Переводы строк в HTML-подписи draw.io и все остальные теги
+_LINE_BREAK_RE = re.compile(r"<\s*(?:br|/div|/p|/li|/tr)\b[^>]*>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]*>")
+# Пометки ключа в строке таблицы: отдельная ячейка «PK» или префикс «PK id»
+_KEY_MARKERS = {"PK", "FK", "UK", "PK,FK", "PK, FK", "PK FK"}
+_KEY_PREFIX_RE = re.compile(r"^(PK|FK|UK)(?:\s*,\s*(?:PK|FK|UK))*\s+(?=\S)")
+
+
+@dataclass(slots=True)
+class Cell:
+    id: str
+    value: str
+    style: Dict[str, str]
+    parent: Optional[str]
+    edge: bool
+    source: Optional[str]
+    target: Optional[str]
+
+
+@dataclass(slots=True)
+class Page:
+    """Таблицы одной страницы и связи между ними по именам таблиц и столбцов"""
+    tables: List[Table] = field(default_factory=list)
+    # (таблица, столбец или None, целевая таблица, целевой столбец или None)
+    links: List[Tuple[str, Optional[str], str, Optional[str]]] = field(default_factory=list)
+
+
+def _style(raw: str) -> Dict[str, str]:
+    """Стиль draw.io «shape=table;html=1;swimlane» → словарь (имя без значения → "")"""
+    style = {}
+    for item in raw.split(";"):
+        key, _, value = item.partition("=")
+        if key:
+            style[key.strip()] = value.strip()
+    return style
+
+
+def _text_lines(value: str) -> List[str]:
+    """Непустые строки подписи; HTML-разметка снимается, сущности раскрываются"""
+    if "<" in value:
+        value = _TAG_RE.sub("", _LINE_BREAK_RE.sub("\n", value))
+    value = html.unescape(value).replace("\xa0", " ")
+    return [line.strip() for line in value.splitlines() if line.strip()]
+
+
+def _is_table(style: Dict[str, str]) -> bool:
+    return style.get("shape") == "table" or "swimlane" in style
+
+
+def _cells(root) -> List[Cell]:
+    """
+    Ячейки страницы в порядке документа. Ячейка с пользовательскими
+    свойствами вложена в <object>/<UserObject>: id и подпись берутся у обёртки
+    """
+    cells = []
+    wrapped = set()
+    for elem in root.iter():
+        if elem.tag in ("object", "UserObject"):
+            inner = elem.find("mxCell")
+            if inner is None:
                 continue
+            wrapped.add(inner)
+            value, cell_id = elem.get("label", ""), elem.get("id")
+        elif elem.tag == "mxCell" and elem not in wrapped:
+            inner, value, cell_id = elem, elem.get("value", ""), elem.get("id")
+        else:
+            continue
+        cells.append(Cell(
+            # Ячейка без id (рукописный XML) не может быть концом связи
+            id=cell_id or f"#{len(cells)}",
+            value=value,
+            style=_style(inner.get("style", "")),
+            parent=inner.get("parent"),
+            edge=inner.get("edge") == "1",
+            source=inner.get("source"),
+            target=inner.get("target"),
+        ))
+    return cells
+
+
+def _split_column(text: str) -> Tuple[str, Optional[str], bool]:
+    """«PK id: int», «id int» или «id» → (имя, тип или None, помечен ли PK)"""
+    primary = False
+    # «+ id: int» — запись атрибута в стиле UML-списка
+    text = text.lstrip("+-# ")
+    marker = _KEY_PREFIX_RE.match(text)
+    if marker:
+        primary = "PK" in marker.group(0).upper()
+        text = text[marker.end():]
+    if ":" in text:
+        name, sql_type = map(str.strip, text.split(":", 1))
+    else:
+        name, _, sql_type = text.partition(" ")
+        sql_type = sql_type.strip()
+    return name.strip(), sql_type or None, primary
+
+
+def _row_column(texts: List[str]) -> Optional[Tuple[str, Optional[str], bool]]:
+    """Столбец из ячеек строки таблицы: [«PK», «id», «int»], [«id int»] и т. п."""
+    primary = False
+    values = []
+    for text in texts:
+        if text.upper() in _KEY_MARKERS:
+            primary = primary or "PK" in text.upper()
+        else:
+            values.append(text)
+    if not values:
+        return None
+    name, sql_type, marked = _split_column(values[0])
+    if sql_type is None and len(values) > 1:
+        sql_type = values[1]
+    return name, sql_type, primary or marked
+
+
+def _make_table(name: str, columns: List[Tuple[str, Optional[str], bool]], pk: List[str] = ()) -> Table:
+    # Первичный ключ: помеченные столбцы, иначе строка «PK: столбец, ...», иначе первый столбец
+    marked = {col_name for col_name, _, primary in columns if primary}
+    if not marked:
+        marked = set(pk) or {columns[0][0] if columns else "id"}
+    return Table(
+        name=name,
+        columns=[
+            Column(name=col_name, type=resolve_type(col_type or "VARCHAR(255)"), primary_key=col_name in marked)
+            for col_name, col_type, _ in columns
+        ],
+    )
+
+
+def _legacy_table(lines: List[str]) -> Table:
+    """Таблица из одной ячейки: имя, строки «столбец: тип» и «PK: столбец, ...»"""
+    columns, pk = [], []
+    for line in lines[1:]:
+        if line.startswith("PK:"):
+            pk = [name.strip() for name in line[3:].split(",") if name.strip()]
+        else:
+            name, sql_type, _ = _split_column(line) if ":" in line else (line, None, False)
+            columns.append((name, sql_type, False))
+    return _make_table(lines[0], columns, pk)
+
+
+def read_page(root) -> Page:
+    """
+    Таблицы и связи одной страницы (mxGraphModel или diagram).
+
+    Индекс родитель → дети строится за один проход по ячейкам. Таблица —
+    ячейка со стилем shape=table или swimlane; её столбцы — дочерние строки
+    (shape=tableRow с ячейками «PK | id | int» или элементы списка «id: int»),
+    а без дочерних строк — строки подписи самой ячейки. Связь, привязанная
+    к строке таблицы, задаёт столбец внешнего ключа и целевой столбец.
+    """
+    cells = _cells(root)
+    children: Dict[str, List[Cell]] = {}
+    for cell in cells:
+        if cell.parent is not None:
+            children.setdefault(cell.parent, []).append(cell)
+
+    page = Page()
+    # id ячейки → (имя таблицы, имя столбца или None) для привязки связей
+    anchors: Dict[str, Tuple[str, Optional[str]]] = {}
+    for cell in cells:
+        lines = _text_lines(cell.value) if _is_table(cell.style) and not cell.edge else []
+        if not lines:
+            continue
+
+        # Вложенные таблицы — не строки: swimlane бывает просто контейнером группы
+        rows = [row for row in children.get(cell.id, ()) if not row.edge and not _is_table(row.style)]
+        if not rows:
+            if cell.style.get("shape") != "table":
+                continue
+            table = _legacy_table(lines)
+            page.tables.append(table)
+            anchors[cell.id] = (table.name, None)
+            continue
+
+        columns, row_ids = [], []
+        for row in rows:
+            parts = children.get(row.id, ())
+            texts = [line for part in parts for line in _text_lines(part.value)] or _text_lines(row.value)
+            column = _row_column(texts)
+            if column is not None:
+                columns.append(column)
+                row_ids.append([row.id] + [part.id for part in parts])
+        table = _make_table(lines[0], columns)
+        page.tables.append(table)
+        anchors[cell.id] = (table.name, None)
+        for column, ids in zip(columns, row_ids):
+            for cell_id in ids:
+                anchors[cell_id] = (table.name, column[0])
 
-            columns = []
-
-            # Обычные колонки
-            for col_name, col_type in table['columns']:
-                sql_type = type_mapping.get(col_type.lower(), 'VARCHAR(255)')
-                if col_name == table['pk']:
-                    columns.append(f"{col_name} {sql_type} PRIMARY KEY")
-                else:
-                    columns.append(f"{col_name} {sql_type}")
-
-            # Колонки для FK (без constraints)
-            for fk in table['fk_columns']:
-                columns.append(f"{fk['name']} INTEGER")
-
-            sql_commands.append(
-                f"CREATE TABLE {table['name']} (\n    " +
-                ",\n    ".join(columns) +
-                "\n);"
-            )
-
-        # Затем добавляем FOREIGN KEY через ALTER TABLE
-        for rel in relationships:
-            sql_commands.append(
-                f"ALTER TABLE {rel['source_table']} "
-                f"ADD FOREIGN KEY ({rel['source_column']}) "
-                f"REFERENCES {rel['target_table']}({rel['target_column']});"
-            )
-
-        return sql_commands if sql_commands else ["Не обнаружено таблиц"]
-
-    except Exception as e:
-        return [f"Ошибка: {str(e)}"]
\ No newline at end of file
+    for cell in cells:
+        if cell.edge and cell.source in anchors and cell.target in anchors:
+            (table, column), (ref_table, ref_column) = anchors[cell.source], anchors[cell.target]
+            page.links.append((table, column, ref_table, ref_column))
+    return page
+
+
+def read_compressed_page(payload: str) -> Page:
+    """Страница в формате сохранения draw.io: base64 → raw deflate → URL-кодирование"""
+    data = zlib.decompress(base64.b64decode(payload), -15)
+    return read_page(ET.fromstring(unquote(data.decode("utf-8"))))
+
+
+def read_compressed_pages(payloads: List[str]) -> List[Page]:
+    """Несколько сжатых страниц подряд — единица работы для пула процессов"""
+    return [read_compressed_page(payload) for payload in payloads]
+
+
+# Параллельный разбор сжатых страниц: page_map(fn, payloads) → страницы по порядку
+# или None, если параллельно сейчас нельзя. Подключается исполнителем приложения
+# (ValidationExecutor.start), чтобы страницы уходили в его пул процессов
+_page_map = None
+
+
+def set_page_map(page_map) -> None:
+    global _page_map
+    _page_map = page_map
+
+
+def _read_compressed_pages(payloads: List[str]) -> List[Page]:
+    """
+    Сжатые страницы разбираются параллельно через _page_map, если их несколько
+    и суммарный объём не меньше DRAWIO_PARALLEL_MIN_BYTES: распаковка и
+    разбор XML упираются в CPU, а передача в процессы окупается только на больших файлах
+    """
+    if _page_map is None or len(payloads) < 2 or sum(map(len, payloads)) < DRAWIO_PARALLEL_MIN_BYTES:
+        return read_compressed_pages(payloads)
+    pages = _page_map(read_compressed_pages, payloads)
+    return pages if pages is not None else read_compressed_pages(payloads)
+
+
+_PAGE_TAGS = ("diagram", "mxGraphModel")
+_WRAPPER_TAGS = ("object", "UserObject")
+
+
+def _stream_pages(file_path, add) -> ET.Element:
+    """
+    Потоковый проход для _read_pages: каждая страница (diagram или
+    mxGraphModel) передаётся в add сразу после закрытия и затем очищается.
+    Ячейки вне страниц (экспорт с mxCell прямо в корне) собираются в
+    отдельный элемент root, который и возвращается, — как add(root) без streaming
+    """
+    bare = ET.Element("root")
+    stack = []
+    open_pages = 0
+    for event, elem in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            if elem.tag in _PAGE_TAGS:
+                open_pages += 1
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if elem.tag in _PAGE_TAGS:
+            open_pages -= 1
+            # mxGraphModel внутри diagram уже разобран как отдельная страница
+            if elem.tag == "mxGraphModel" or elem.find("mxGraphModel") is None:
+                add(elem)
+        if open_pages or (parent is not None and parent.tag in _WRAPPER_TAGS):
+            # Элемент страницы или ячейка внутри обёртки ещё понадобятся родителю
+            continue
+        if parent is not None:
+            parent.remove(elem)
+        if elem.tag == "mxCell" or elem.tag in _WRAPPER_TAGS:
+            bare.append(elem)
+        else:
+            elem.clear()
+    return bare
+
+
+def _read_pages(file_path, streaming: bool) -> List[Page]:
+    """
+    Страницы документа по порядку. Несжатые разбираются сразу, сжатые
+    собираются и распаковываются вместе (см. _read_compressed_pages)
+    """
+    pages: List[Optional[Page]] = []
+    payloads: List[Tuple[int, str]] = []
+
+    def add(elem) -> None:
+        # diagram без mxGraphModel: сжатая страница или ячейки прямо внутри
+        payload = (elem.text or "").strip() if elem.tag == "diagram" else ""
+        if payload and elem.find("mxCell") is None:
+            payloads.append((len(pages), payload))
+            pages.append(None)
+        else:
+            pages.append(read_page(elem))
+
+    if streaming:
+        bare = _stream_pages(file_path, add)
+        if not pages and len(bare):
+            add(bare)
+    else:
+        root = ET.parse(file_path).getroot()
+        diagrams = [root] if root.tag == "diagram" else list(root.iter("diagram"))
+        for diagram in diagrams:
+            model = diagram.find("mxGraphModel")
+            add(model if model is not None else diagram)
+        if not diagrams:
+            add(root)
+
+    for (index, _), page in zip(payloads, _read_compressed_pages([payload for _, payload in payloads])):
+        pages[index] = page
+    return pages
+
+
+def read_drawio_xml(file_path, streaming=False):
+    """
+    Читает XML из Draw.io в промежуточную схему.
+
+    file_path — путь или файловый объект. Поддерживаются несжатые и сжатые
+    страницы (формат сохранения draw.io по умолчанию) и несколько страниц
+    в одном файле; таблица, встречающаяся на нескольких страницах, берётся
+    с первой. При streaming=True документ читается через iterparse за один
+    проход: разобранные страницы не держатся в памяти.
+    """
+    schema = Schema()
+    tables: Dict[str, Table] = {}
+    links = []
+    for page in _read_pages(file_path, streaming):
+        for table in page.tables:
+            if table.name.lower() not in tables:
+                tables[table.name.lower()] = table
+                schema.tables.append(table)
+        links += page.links
+
+    seen = set()
+    for source, column, target, ref_column in links:
+        source_table, target_table = tables[source.lower()], tables[target.lower()]
+        if (column and ref_column and column in source_table.primary_key
+                and ref_column not in target_table.primary_key):
+            # Связь проведена от первичного ключа к внешнему: разворачиваем
+            source_table, target_table = target_table, source_table
+            column, ref_column = ref_column, column
+        ref_column = ref_column or next(iter(target_table.primary_key), 'id')
+        if column is None:
+            # Связь между таблицами целиком: добавляем FK-столбец <цель>_id
+            column = f"{target_table.name.lower()}_id"
+            if all(col.name.lower() != column for col in source_table.columns):
+                source_table.columns.append(Column(name=column, type='INTEGER'))
+
+        key = (source_table.name.lower(), column.lower(), target_table.name.lower(), ref_column.lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        schema.foreign_keys.append(ForeignKey(
+            table=source_table.name,
+            column=column,
+            ref_table=target_table.name,
+            ref_column=ref_column,
+        ))
+
+    return schema
+
+
+def parse_drawio_xml(file_path, streaming=False):
+    """Конвертирует XML из Draw.io в SQL с FOREIGN KEY через ALTER TABLE"""
+    return convert(read_drawio_xml, file_path, streaming)[1]
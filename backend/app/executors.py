@@ -0,0 +1,312 @@
+# backend/app/executors.py
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from .config import (
+    DRAWIO_PAGE_WORKERS,
+    EXECUTOR_MAX_QUEUE,
+    EXECUTOR_RETRY_AFTER,
+    LINT_SPLIT_MIN_STATEMENTS,
+    PROCESS_POOL_SIZE,
+    PROCESS_POOL_START_METHOD,
+    STREAM_PARSE_THRESHOLD,
+    THREAD_POOL_SIZE,
+)
+from .converters import convert_document
+from .converters.xml_converter import set_page_map
+from .metrics import POOL_RUN_SECONDS, POOL_WAIT_SECONDS
+
+# Этап валидации → (пул, метод SQLValidator).
+# SQLFluff и CodeT5 упираются в CPU и GIL, поэтому уходят в процессы;
+# SQLite и sqlglot достаточно быстрые, им хватает потоков.
+# Потоковые этапы получают ParsedScript целиком, в процессы уходит
+# только текст: блоки скрипта для lint и фрагменты по таблицам для llm.
+STAGES = {
+    "lint": ("process", "lint"),
+    "llm": ("process", "llm_validate_chunks"),
+    "sqlite": ("thread", "check_sqlite"),
+    "ast": ("thread", "ast_analysis"),
+    "rules": ("thread", "rule_analysis"),
+}
+
+# Валидатор рабочего процесса. При fork наследуется от родителя,
+# при spawn создаётся в инициализаторе процесса.
+_validator = None
+
+
+def _init_worker():
+    global _validator
+    if _validator is None:
+        from .validator.validator import SQLValidator
+        _validator = SQLValidator()
+
+
+def _call_validator(method, *args):
+    return getattr(_validator, method)(*args)
+
+
+def _timed(fn, *args):
+    # Выполняется в воркере: время работы без ожидания в очереди
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+
+class PoolSaturated(Exception):
+    """Очередь пула заполнена; клиенту нужно повторить запрос позже"""
+
+    def __init__(self, pool: str, retry_after: int = EXECUTOR_RETRY_AFTER):
+        super().__init__(f"Пул {pool} перегружен")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class StagePool:
+    """
+    Обёртка над concurrent.futures-исполнителем с ограниченной очередью.
+
+    Счётчики меняются только из потока event loop, поэтому блокировки не нужны.
+    """
+
+    def __init__(self, name: str, factory, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._factory = factory
+        self._executor = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self):
+        # Пул создаётся при первом обращении, чтобы процессы форкались
+        # уже после загрузки модели в родителе
+        if self._executor is None:
+            self._executor = self._factory(self.workers)
+        return self._executor
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated(self.name)
+
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        future = self.executor.submit(_timed, fn, *args)
+        self.in_flight += 1
+        # Место освобождается, когда задача действительно завершилась в воркере:
+        # отмена ожидающей корутины (тайм-аут этапа, отключение клиента) не
+        # останавливает уже запущенную задачу, и та продолжает занимать воркер
+        future.add_done_callback(lambda _: loop.is_closed() or loop.call_soon_threadsafe(self._release))
+        try:
+            result, run_seconds = await asyncio.wrap_future(future)
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        POOL_RUN_SECONDS.observe(run_seconds, pool=self.name)
+        POOL_WAIT_SECONDS.observe(max(time.perf_counter() - submitted - run_seconds, 0.0), pool=self.name)
+        return result
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ValidationExecutor:
+    """Выполняет этапы SQLValidator вне event loop"""
+
+    def __init__(
+        self,
+        validator,
+        process_workers: int = PROCESS_POOL_SIZE,
+        thread_workers: int = THREAD_POOL_SIZE,
+        max_queue: int = EXECUTOR_MAX_QUEUE,
+    ):
+        global _validator
+        _validator = validator
+        self.validator = validator
+        self._loop = None
+        self._pid = None
+
+        self.pools = {
+            "thread": StagePool(
+                "thread",
+                lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="validator"),
+                max(1, thread_workers),
+                max_queue,
+            ),
+        }
+        if process_workers > 0:
+            context = multiprocessing.get_context(PROCESS_POOL_START_METHOD or None)
+            self.pools["process"] = StagePool(
+                "process",
+                lambda n: ProcessPoolExecutor(max_workers=n, mp_context=context, initializer=_init_worker),
+                process_workers,
+                max_queue,
+            )
+
+        # С микропакетами CodeT5 работает в этом процессе: запросы должны
+        # сходиться в один батчер, а не расходиться по процессам пула.
+        # Потоки этого пула только ждут результаты батчера
+        if validator.llm_batcher is not None:
+            self.pools["llm_batch"] = StagePool(
+                "llm_batch",
+                lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="llm"),
+                validator.llm_batcher.max_batch_size,
+                max_queue,
+            )
+
+    def start(self) -> None:
+        """
+        Вызывается из lifespan: запоминает event loop и подключает пул
+        конвертации к разбору сжатых страниц draw.io (см. map_pages)
+        """
+        self._loop = asyncio.get_running_loop()
+        self._pid = os.getpid()
+        set_page_map(self.map_pages)
+
+    def map_pages(self, fn, items: list):
+        """
+        Синхронный вход для конвертера, работающего в потоке пула: fn над
+        группами items в пуле конвертации, результат — по каждому элементу.
+        None — выполнить последовательно: пул не процессный или перегружен,
+        вызов из потока event loop (ждать там нельзя) или из воркера пула,
+        унаследовавшего исполнитель при fork
+        """
+        pool = self.convert_pool
+        if self._loop is None or os.getpid() != self._pid or pool.name != "process" or DRAWIO_PAGE_WORKERS < 2:
+            return None
+        try:
+            asyncio.get_running_loop()
+            return None
+        except RuntimeError:
+            pass
+        try:
+            return asyncio.run_coroutine_threadsafe(self._map_groups(pool, fn, items), self._loop).result()
+        except PoolSaturated:
+            return None
+
+    async def _map_groups(self, pool: StagePool, fn, items: list) -> list:
+        # Элементы делятся поровну между воркерами, по одному вызову на воркер
+        parts = min(pool.workers, DRAWIO_PAGE_WORKERS, len(items))
+        groups = [items[k::parts] for k in range(parts)]
+        results = await asyncio.gather(*(pool.run(fn, group) for group in groups))
+        ordered = [None] * len(items)
+        for k, group_results in enumerate(results):
+            ordered[k::parts] = group_results
+        return ordered
+
+    async def parse(self, sql: str, dialect: str | None = None):
+        """Разбирает скрипт один раз для всех этапов (см. SQLValidator.parse_script)"""
+        return await self.run_thread(self.validator.parse_script, sql, dialect)
+
+    @property
+    def convert_pool(self) -> StagePool:
+        """Пул для конвертации диаграмм: разбор XML упирается в CPU, как и SQLFluff"""
+        return self.pools.get("process") or self.pools["thread"]
+
+    async def convert(self, filename: str, data: bytes, mode: str = "alter", dialect: str | None = None):
+        """Конвертирует диаграмму из байтов в пуле; возвращает (схема, SQL)"""
+        streaming = len(data) >= STREAM_PARSE_THRESHOLD
+        return await self.convert_pool.run(convert_document, filename, data, streaming, mode, dialect)
+
+    async def run_thread(self, fn, *args):
+        """Выполняет вспомогательную функцию (разбор, планирование) в пуле потоков"""
+        return await self.pools["thread"].run(fn, *args)
+
+    async def run_units(self, stage: str, texts: list[str], dialect: str | None = None) -> list:
+        """
+        Выполняет этап lint или llm над независимыми фрагментами скрипта
+        (таблицами при инкрементальной проверке); результат — по каждому фрагменту
+        """
+        if not texts:
+            return []
+        pool_name, _ = STAGES[stage]
+        pool = self.pools.get(pool_name) or self.pools["thread"]
+
+        if stage == "llm":
+            if "llm_batch" in self.pools:
+                return await self.pools["llm_batch"].run(self.validator.llm_chunk_reports, texts, dialect)
+            return await self._call(pool, "llm_chunk_reports", texts, dialect)
+
+        # Фрагменты делятся поровну между воркерами пула, по одному вызову на воркер
+        parts = min(pool.workers, len(texts))
+        groups = [texts[k::parts] for k in range(parts)]
+        results = await asyncio.gather(*(self._call(pool, "lint_many", group, dialect) for group in groups))
+        ordered = [None] * len(texts)
+        for k, group_results in enumerate(results):
+            ordered[k::parts] = group_results
+        return ordered
+
+    async def run(self, stage: str, script):
+        """Выполняет метод валидатора stage над разобранным скриптом в соответствующем пуле"""
+        pool_name, method = STAGES[stage]
+        pool = self.pools.get(pool_name) or self.pools["thread"]
+
+        if stage == "lint":
+            issues = await self._lint(pool, script)
+            # Привязка замечаний к инструкциям по строке и позиции
+            for issue in issues:
+                index = script.statement_at(issue.get("line"), issue.get("pos"))
+                issue["statement"] = index + 1 if index is not None else None
+            return issues
+
+        if stage == "llm":
+            chunks = await self.pools["thread"].run(self.validator.llm_chunks, script)
+            if "llm_batch" in self.pools:
+                return await self.pools["llm_batch"].run(self.validator.llm_validate_chunks, chunks, script.dialect)
+            return await self._call(pool, method, chunks, script.dialect)
+
+        return await self._call(pool, method, script)
+
+    async def _call(self, pool: StagePool, method: str, *args):
+        if pool.name == "process":
+            return await pool.run(partial(_call_validator, method), *args)
+        return await pool.run(getattr(self.validator, method), *args)
+
+    async def _lint(self, pool: StagePool, script):
+        """Линтует большой скрипт блоками инструкций на всех процессах пула"""
+        blocks = [(script.sql, 0)]
+        if pool.name == "process" and LINT_SPLIT_MIN_STATEMENTS > 0:
+            blocks = self.validator.lint_blocks(script, pool.workers, LINT_SPLIT_MIN_STATEMENTS)
+
+        results = await asyncio.gather(*(self._call(pool, "lint", text, offset, script.dialect) for text, offset in blocks))
+        return [issue for issues in results for issue in issues]
+
+    def stats(self) -> dict:
+        stats = {name: pool.stats() for name, pool in self.pools.items()}
+        if "llm_batch" in stats:
+            stats["llm_batch"].update(self.validator.llm_batcher.stats())
+        return stats
+
+    def shutdown(self) -> None:
+        set_page_map(None)
+        self._loop = None
+        for pool in self.pools.values():
+            pool.shutdown()
+
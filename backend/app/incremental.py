@@ -0,0 +1,160 @@
+# backend/app/incremental.py
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from .cache import content_digest, normalize_sql
+from .config import INCREMENTAL_SESSIONS
+from .validator.ast_checks import (
+    check_foreign_key,
+    check_table,
+    index_script,
+    index_statements,
+    missing_table_message,
+)
+from .validator.script import ParsedScript, Statement
+
+# Этапы, которые перепроверяются по таблицам. SQLite выполняет скрипт целиком:
+# порядок инструкций и ссылки между таблицами не дают проверить таблицу отдельно
+UNIT_STAGES = ("lint", "ast", "llm")
+
+
+@dataclass(slots=True)
+class Submission:
+    """Предыдущая отправка сессии: хэши таблиц и результаты этапов по таблицам"""
+    digests: Dict[str, str]
+    # этап → таблица → результат относительно текста таблицы (см. unit_text)
+    results: Dict[str, Dict[str, object]] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class Plan:
+    """Что перепроверять в новой отправке"""
+    units: Dict[str, List[Statement]]
+    digests: Dict[str, str]
+    # Изменённые таблицы и их соседи по внешним ключам
+    recompute: Set[str]
+    removed: Set[str]
+    previous: Optional[Submission]
+
+    def todo(self, stage: str) -> List[str]:
+        """Таблицы, для которых этап нужно выполнить заново"""
+        stored = self.previous.results.get(stage, {}) if self.previous else {}
+        return [table for table in self.units if table in self.recompute or table not in stored]
+
+    def reused(self, stage: str) -> Dict[str, object]:
+        stored = self.previous.results.get(stage, {}) if self.previous else {}
+        return {table: stored[table] for table in self.units if table not in self.recompute and table in stored}
+
+
+class SessionStore:
+    """
+    Последние отправки по идентификатору сессии (LRU).
+    Используется только из потока event loop, поэтому без блокировок.
+    """
+
+    def __init__(self, max_sessions: int = INCREMENTAL_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, Submission] = OrderedDict()
+
+    def get(self, session: str) -> Optional[Submission]:
+        submission = self._sessions.get(session)
+        if submission is not None:
+            self._sessions.move_to_end(session)
+        return submission
+
+    def put(self, session: str, submission: Submission) -> None:
+        if self.max_sessions <= 0:
+            return
+        self._sessions[session] = submission
+        self._sessions.move_to_end(session)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+def unit_text(statements: List[Statement]) -> str:
+    """Текст таблицы: её инструкции в исходном виде, каждая с новой строки"""
+    return "\n".join(statement.text for statement in statements) + "\n"
+
+
+def plan_revalidation(script: ParsedScript, previous: Optional[Submission]) -> Plan:
+    """
+    Сравнивает таблицы скрипта с предыдущей отправкой по хэшу их инструкций.
+    Перепроверяются изменённые и новые таблицы, а также таблицы, связанные
+    с изменёнными или удалёнными внешним ключом в любую сторону.
+    """
+    units = script.by_table()
+    digests = {table: content_digest(normalize_sql(unit_text(statements))) for table, statements in units.items()}
+    if previous is None:
+        return Plan(units, digests, set(units), set(), None)
+
+    changed = {table for table, digest in digests.items() if previous.digests.get(table) != digest}
+    removed = set(previous.digests) - set(units)
+    touched = changed | removed
+
+    _, foreign_keys = index_statements(script.trees)
+    neighbours = set()
+    for fk in foreign_keys:
+        source, target = fk.table.lower(), fk.ref_table.lower()
+        if source in touched:
+            neighbours.add(target)
+        if target in touched:
+            neighbours.add(source)
+
+    recompute = (changed | neighbours) & set(units)
+    return Plan(units, digests, recompute, removed, previous)
+
+
+def ast_unit_messages(script: ParsedScript, plan: Plan, tables: List[str]) -> Dict[str, List[str]]:
+    """
+    AST-сообщения по таблицам: индекс строится по всему скрипту (внешним
+    ключам нужны целевые таблицы), а проверяются только переданные таблицы
+    и внешние ключи, объявленные в их инструкциях
+    """
+    index, foreign_keys, missing = index_script(script.trees)
+    wanted = set(tables)
+    messages = {table: [] for table in tables}
+
+    for name in missing:
+        if name.lower() in wanted:
+            messages[name.lower()].append(missing_table_message(name))
+
+    for table in tables:
+        if table in index:
+            messages[table] += check_table(index[table])
+    for fk in foreign_keys:
+        if fk.table.lower() in wanted:
+            messages[fk.table.lower()] += check_foreign_key(fk, index)
+    if "" in wanted:
+        messages[""] = [
+            f"Инструкция {statement.index + 1} (строка {statement.line}) не разобрана: {statement.error}"
+            for statement in plan.units[""] if statement.error
+        ] + messages[""]
+    return messages
+
+
+def map_lint_issues(script: ParsedScript, statements: List[Statement], issues: List[dict]) -> List[dict]:
+    """
+    Переводит строки и позиции замечаний из текста таблицы (unit_text)
+    в координаты исходного скрипта и проставляет номер инструкции
+    """
+    starts, line = [], 1
+    for statement in statements:
+        starts.append(line)
+        line += statement.text.count("\n") + 1
+
+    mapped = []
+    for issue in issues:
+        issue = dict(issue)
+        unit_line = issue.get("line")
+        if unit_line:
+            k = max(bisect_right(starts, unit_line) - 1, 0)
+            statement = statements[k]
+            issue["line"] = statement.line + unit_line - starts[k]
+            issue["statement"] = statement.index + 1
+            if unit_line == starts[k] and issue.get("pos"):
+                # Первая строка инструкции может начинаться не с первой колонки
+                issue["pos"] += statement.start - (script.sql.rfind("\n", 0, statement.start) + 1)
+        mapped.append(issue)
+    return mapped
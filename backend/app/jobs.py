@@ -0,0 +1,290 @@
+# backend/app/jobs.py
+import asyncio
+import itertools
+import json
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from .config import (
+    EXECUTOR_RETRY_AFTER,
+    JOBS_DB_PATH,
+    JOBS_MAX_QUEUED,
+    JOBS_TTL,
+    JOBS_WORKERS,
+)
+from .metrics import JOB_RUN_SECONDS, JOB_WAIT_SECONDS
+
+# Приоритет задачи → место в очереди: проверки из интерфейса раньше пакетных из CI
+JOB_PRIORITIES = {"interactive": 0, "batch": 1}
+# Состояния, после которых задача не меняется и со временем удаляется
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobQueueFull(Exception):
+    """В очереди задач нет места; клиенту нужно повторить запрос позже"""
+
+    def __init__(self, retry_after: int = EXECUTOR_RETRY_AFTER):
+        super().__init__("Очередь задач заполнена")
+        self.retry_after = retry_after
+
+
+@dataclass(slots=True)
+class Job:
+    id: str
+    priority: str
+    # Параметры задачи в JSON; из них runner восстанавливает запрос после перезапуска
+    request: dict
+    status: str = "queued"
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+    # Промежуточные результаты в порядке поступления
+    events: List[dict] = field(default_factory=list)
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+
+# runner(задача, progress) → итоговый результат; progress(событие) сохраняет
+# промежуточный результат, который сразу виден в GET /jobs/{id}
+Runner = Callable[[Job, Callable[[dict], None]], Awaitable[dict]]
+
+
+class JobQueue:
+    """
+    Очередь долгих проверок внутри процесса: без внешнего брокера, на одном хосте.
+
+    Задачи выбираются по приоритету, затем по времени постановки; одновременно
+    выполняется не больше workers задач. Состояние каждой задачи пишется в
+    SQLite-файл: после перезапуска завершённые задачи доступны до истечения
+    ttl, а поставленные и прерванные на середине выполняются заново.
+    Промежуточные результаты дописываются в отдельную таблицу по одной
+    строке, а строка задачи перезаписывается только при смене состояния.
+    Используется только из потока event loop, поэтому без блокировок.
+    """
+
+    def __init__(self, runner: Runner, db_path: str = JOBS_DB_PATH, workers: int = JOBS_WORKERS,
+                 max_queued: int = JOBS_MAX_QUEUED, ttl: float = JOBS_TTL):
+        self.runner = runner
+        self.db_path = db_path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._order = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        # Задачи уведомлений держатся здесь до завершения, иначе их может собрать GC
+        self._notifying: Set[asyncio.Task] = set()
+        self._db = None
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue()
+        self._changed = asyncio.Condition()
+        # Пустой путь — задачи только в памяти
+        self._db = sqlite3.connect(self.db_path or ":memory:", check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, priority TEXT, status TEXT, request TEXT, "
+            "result TEXT, error TEXT, created REAL, updated REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            "job_id TEXT, seq INTEGER, event TEXT, PRIMARY KEY (job_id, seq))"
+        )
+        self._restore()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+        self._tasks.append(asyncio.create_task(self._expire_loop()))
+
+    async def stop(self) -> None:
+        # Прерванные задачи остаются в базе со статусом running и перезапустятся при старте
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _restore(self) -> None:
+        self._purge()
+        rows = self._db.execute(
+            "SELECT id, priority, status, request, result, error, created, updated "
+            "FROM jobs ORDER BY created"
+        ).fetchall()
+        for row in rows:
+            job = Job(
+                id=row[0], priority=row[1], status=row[2], request=json.loads(row[3]),
+                result=json.loads(row[4]) if row[4] else None,
+                error=row[5], created=row[6], updated=row[7],
+            )
+            self._jobs[job.id] = job
+            if not job.finished:
+                # Результаты прерванного выполнения неполные: задача начинается заново
+                job.status = "queued"
+                self._db.execute("DELETE FROM job_events WHERE job_id = ?", (job.id,))
+                self._save(job)
+                self._enqueue(job)
+        for job_id, event in self._db.execute("SELECT job_id, event FROM job_events ORDER BY job_id, seq"):
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.events.append(json.loads(event))
+
+    def submit(self, request: dict, priority: str = "interactive") -> Job:
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"Неизвестный приоритет: {priority}")
+        if self._queue is None:
+            raise RuntimeError("Очередь задач не запущена")
+        queued = sum(1 for job in self._jobs.values() if job.status == "queued")
+        if queued >= self.max_queued:
+            raise JobQueueFull()
+        job = Job(id=uuid.uuid4().hex, priority=priority, request=request)
+        self._jobs[job.id] = job
+        self._save(job)
+        self._enqueue(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and self._expired(job, time.time()):
+            return None
+        return job
+
+    async def wait(self, job_id: str, timeout: float, since: Optional[int] = None) -> Optional[Job]:
+        """
+        Long-poll: ждёт не дольше timeout секунд, пока задача завершится или,
+        если задан since, пока у неё станет больше since промежуточных результатов
+        """
+        def ready():
+            job = self.get(job_id)
+            return job is None or job.finished or (since is not None and len(job.events) > since)
+
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(ready), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Отменяет задачу в очереди или выполняющуюся. Работа, уже отданная
+        в пулы исполнителей, доходит до конца, но её результат отбрасывается
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        self._update(job, status="cancelled")
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return job
+
+    def stats(self) -> dict:
+        counts = {status: 0 for status in ("queued", "running") + FINISHED}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {**counts, "workers": self.workers, "max_queued": self.max_queued, "persistent": bool(self.db_path)}
+
+    def _enqueue(self, job: Job) -> None:
+        self._queue.put_nowait((JOB_PRIORITIES[job.priority], next(self._order), job.id))
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            # Отменённые в очереди задачи остаются в куче и пропускаются здесь
+            if job is None or job.status != "queued":
+                continue
+            JOB_WAIT_SECONDS.observe(time.time() - job.updated, priority=job.priority)
+            self._update(job, status="running")
+            await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        def progress(event: dict) -> None:
+            if job.status == "running":
+                job.events.append(event)
+                job.updated = time.time()
+                self._db.execute(
+                    "INSERT INTO job_events (job_id, seq, event) VALUES (?, ?, ?)",
+                    (job.id, len(job.events), json.dumps(event, ensure_ascii=False)),
+                )
+                self._db.execute("UPDATE jobs SET updated = ? WHERE id = ?", (job.updated, job.id))
+                self._notify_waiters()
+
+        started = time.perf_counter()
+        task = asyncio.create_task(self.runner(job, progress))
+        self._running[job.id] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job.status != "cancelled":
+                # Остановка сервера: задача останется running и выполнится после перезапуска
+                raise
+            outcome = "cancelled"
+        except Exception as e:
+            outcome = "failed"
+            self._update(job, status="failed", error=str(e) or type(e).__name__)
+        else:
+            outcome = "done"
+            if job.status == "running":
+                self._update(job, status="done", result=result)
+        finally:
+            self._running.pop(job.id, None)
+        JOB_RUN_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+    def _update(self, job: Job, **changes) -> None:
+        for name, value in changes.items():
+            setattr(job, name, value)
+        self._touch(job)
+
+    def _touch(self, job: Job) -> None:
+        job.updated = time.time()
+        self._save(job)
+        self._notify_waiters()
+
+    def _notify_waiters(self) -> None:
+        task = asyncio.create_task(self._notify())
+        self._notifying.add(task)
+        task.add_done_callback(self._notifying.discard)
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    def _save(self, job: Job) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO jobs "
+            "(id, priority, status, request, result, error, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job.id, job.priority, job.status,
+                json.dumps(job.request, ensure_ascii=False),
+                json.dumps(job.result, ensure_ascii=False) if job.result is not None else None,
+                job.error, job.created, job.updated,
+            ),
+        )
+
+    def _expired(self, job: Job, now: float) -> bool:
+        return job.finished and now - job.updated > self.ttl
+
+    def _purge(self) -> None:
+        now = time.time()
+        for job_id in [job.id for job in self._jobs.values() if self._expired(job, now)]:
+            del self._jobs[job_id]
+        expired = "SELECT id FROM jobs WHERE status IN (?, ?, ?) AND updated < ?"
+        params = (*FINISHED, now - self.ttl)
+        self._db.execute(f"DELETE FROM job_events WHERE job_id IN ({expired})", params)
+        self._db.execute(f"DELETE FROM jobs WHERE id IN ({expired})", params)
+
+    async def _expire_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.ttl, 60))
+            self._purge()
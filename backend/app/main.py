@@ -1,92 +1,773 @@
+import asyncio
+import dataclasses
+import json
 import os
-import tempfile
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import re
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import List, Optional
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 from .schemas import (
+    BatchItemResult,
+    BatchSummary,
     ConvertResponse,
+    DiagramFormat,
+    EmitMode,
+    IncrementalReport,
+    JobInfo,
+    JobPriority,
+    JobRequest,
     ValidateRequest,
     ValidateResponse,
     LintIssue,
+    RuleFinding,
+    SqlDialect,
+)
+from .converters import Column, ForeignKey, Schema, Table, deferred_foreign_keys, get_reader, plan_deploy
+from .converters.emitter import convert as run_reader, emit_sql
+from .reverse import DIAGRAM_WRITERS, read_source
+from .validator.validator import SQLValidator, merge_reports
+from .validator.ast_checks import run_schema_checks
+from .validator.rules import has_errors, run_schema_rules
+from .config import EMIT_MODE, JOBS_MAX_WAIT, LLM_PRELOAD, LLM_STAGE_TIMEOUT, LLM_TIERED, STAGE_TIMEOUT, STREAM_PARSE_THRESHOLD
+from .uploads import UploadLimitMiddleware, UploadRoute, expand_batch, open_upload
+from .executors import PoolSaturated, ValidationExecutor
+from .jobs import Job, JobQueue, JobQueueFull
+from .metrics import ServerTimingMiddleware, observe_convert, observe_stage, render_prometheus, server_timing
+from .profiling import ProfilingMiddleware
+from .cache import MISS, ResultCache, content_digest, normalize_sql
+from .incremental import (
+    UNIT_STAGES,
+    SessionStore,
+    Submission,
+    ast_unit_messages,
+    map_lint_issues,
+    plan_revalidation,
+    unit_text,
 )
-from .converters.erd_converter import parse_erd
-from .converters.graphml_converter import parse_graphml
-from .converters.xml_converter import parse_drawio_xml
-from .validator.validator import SQLValidator
 
-app = FastAPI(title="ER2SQL Service")
+validator = SQLValidator()
+if LLM_PRELOAD:
+    validator.preload()
+executor = ValidationExecutor(validator)
+result_cache = ResultCache()
+sessions = SessionStore()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    executor.start()
+    await jobs.start()
+    yield
+    await jobs.stop()
+    executor.shutdown()
+    result_cache.close()
+
+app = FastAPI(title="ER2SQL Service", lifespan=lifespan)
+app.router.route_class = UploadRoute
 
+app.add_middleware(UploadLimitMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(ProfilingMiddleware)
+# CORS добавляется последним и оборачивает остальные: ответы, которые
+# middleware отправляют сами (413 при превышении размера), тоже получают заголовки
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],   # фронтенд
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Dump"],
 )
 
-validator = SQLValidator()
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
-def _save_temp(file: UploadFile) -> str:
-    suffix = os.path.splitext(file.filename)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(file.file.read())
-        return tmp.name
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request: Request, exc: JobQueueFull):
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 @app.post("/convert", response_model=ConvertResponse)
-async def convert(file: UploadFile = File(...)):
-    tmp_path = _save_temp(file)
+async def convert(
+    file: UploadFile = File(...),
+    mode: EmitMode = EMIT_MODE,
+    dialect: Optional[SqlDialect] = None,
+):
+    """
+    Конвертирует диаграмму в SQL. mode=ordered выводит таблицы в порядке
+    зависимостей с внешними ключами внутри CREATE TABLE и заполняет levels;
+    dialect — SQL для postgres, mysql или sqlite вместо общего.
+
+    Разобранная схема кэшируется по содержимому файла, SQL — по хэшу схемы,
+    режиму и диалекту: другой диалект той же диаграммы файл заново не разбирает
+    """
+    reader = get_reader(file.filename)
+    if reader is None:
+        raise HTTPException(400, "Неподдерживаемый формат файла")
+
+    source = open_upload(file)
+    schema_key = ResultCache.key("convert", content_digest(source), {"reader": reader.__name__})
+    schema = _cached_schema(schema_key)
+    if schema is not None:
+        server_timing("convert", 0.0, f"{reader.__name__}, cached")
+        return await _render_response(schema, mode, dialect)
+
+    streaming = (file.size or 0) >= STREAM_PARSE_THRESHOLD
+    started = time.perf_counter()
+    # В потоке пула: разбор большой диаграммы не блокирует event loop
+    schema, sql = await executor.run_thread(run_reader, reader, source, streaming, mode, dialect)
+    _observe_conversion(reader, started, schema, file.size or 0)
+    if schema is None:
+        # Ошибки разбора не кэшируем
+        return ConvertResponse(sql=sql)
+    result_cache.put("convert", schema_key, _schema_dict(schema))
+    return await _render_response(schema, mode, dialect, sql)
+
+def _observe_conversion(reader, started: float, schema: Schema | None, size: int) -> None:
+    observe_convert(
+        reader.__name__,
+        time.perf_counter() - started,
+        "ok" if schema is not None else "error",
+        size,
+        len(schema.tables) if schema is not None else None,
+    )
+
+def _schema_dict(schema: Schema) -> dict:
+    return {
+        "tables": [dataclasses.asdict(table) for table in schema.tables],
+        "foreign_keys": [dataclasses.asdict(fk) for fk in schema.foreign_keys],
+    }
+
+def _schema_from_dict(tables: list[dict], foreign_keys: list[dict]) -> Schema:
+    return Schema(
+        tables=[
+            Table(name=table["name"], columns=[Column(**col) for col in table["columns"]])
+            for table in tables
+        ],
+        foreign_keys=[ForeignKey(**fk) for fk in foreign_keys],
+    )
+
+def _cached_schema(schema_key: str) -> Schema | None:
+    """Схема, ранее разобранная из того же файла, или None"""
+    cached = result_cache.get("convert", schema_key)
+    if cached is MISS:
+        return None
+    return _schema_from_dict(cached["tables"], cached["foreign_keys"])
+
+async def _render_response(schema: Schema, mode: str, dialect: str | None, sql: list[str] | None = None) -> ConvertResponse:
+    """
+    Ответ конвертации по схеме. SQL для (хэш схемы, режим, диалект) берётся
+    из кэша, иначе генерируется (если не передан уже готовый) и сохраняется
+    """
+    data = _schema_dict(schema)
+    render_key = ResultCache.key(
+        "render", content_digest(json.dumps(data, sort_keys=True)), {"mode": mode, "dialect": dialect},
+    )
+    rendered = result_cache.get("render", render_key)
+    if rendered is MISS:
+        if sql is None:
+            sql = await executor.run_thread(emit_sql, schema, mode, dialect) or ["Не обнаружено таблиц"]
+        rendered = {"sql": sql}
+        if mode == "ordered":
+            plan = plan_deploy(schema)
+            rendered["levels"] = plan.levels
+            rendered["deferred_foreign_keys"] = [
+                dataclasses.asdict(fk) for fk in deferred_foreign_keys(plan, dialect)
+            ]
+        result_cache.put("render", render_key, rendered)
+    return ConvertResponse(**data, **rendered)
+
+async def _convert_item(name: str, load, slots: asyncio.Semaphore, mode: str, dialect: str | None) -> BatchItemResult:
+    """Конвертирует один файл пакета; любая ошибка остаётся в его строке ответа"""
+    async with slots:
+        started = time.perf_counter()
+        elapsed = lambda: round((time.perf_counter() - started) * 1000, 3)
+        reader = get_reader(name)
+        if reader is None:
+            return BatchItemResult(file=name, sql=[], error="Неподдерживаемый формат файла")
+        try:
+            data = await asyncio.to_thread(load)
+            schema_key = ResultCache.key("convert", content_digest(data), {"reader": reader.__name__})
+            schema = _cached_schema(schema_key)
+            if schema is not None:
+                response = await _render_response(schema, mode, dialect)
+                return BatchItemResult(file=name, cached=True, elapsed_ms=elapsed(), **response.model_dump())
+            converting = time.perf_counter()
+            schema, sql = await executor.convert(name, data, mode, dialect)
+            _observe_conversion(reader, converting, schema, len(data))
+            if schema is None:
+                return BatchItemResult(file=name, sql=sql, error=sql[0], elapsed_ms=elapsed())
+            result_cache.put("convert", schema_key, _schema_dict(schema))
+            response = await _render_response(schema, mode, dialect, sql)
+        except Exception as e:
+            return BatchItemResult(file=name, sql=[], error=str(e) or type(e).__name__, elapsed_ms=elapsed())
+        return BatchItemResult(file=name, elapsed_ms=elapsed(), **response.model_dump())
+
+async def _convert_batch_lines(items, mode: str, dialect: str | None):
+    started = time.perf_counter()
+    # В пул одновременно отправляется не больше файлов, чем в нём воркеров:
+    # большой пакет не упирается в лимит очереди и не вытесняет другие запросы
+    slots = asyncio.Semaphore(executor.convert_pool.workers)
+    tasks = [asyncio.ensure_future(_convert_item(name, load, slots, mode, dialect)) for name, load in items]
+    results = []
     try:
-        if tmp_path.endswith(".erd"):
-            sql = parse_erd(tmp_path)
-        elif tmp_path.endswith(".graphml"):
-            sql = parse_graphml(tmp_path)
-        elif tmp_path.endswith(".xml"):
-            sql = parse_drawio_xml(tmp_path)
-        else:
-            raise HTTPException(400, "Неподдерживаемый формат файла")
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            results.append(result)
+            yield result.model_dump_json() + "\n"
     finally:
-        os.remove(tmp_path)
+        # Клиент отключился — оставшиеся файлы не конвертируем
+        for task in tasks:
+            task.cancel()
 
-    return {"sql": sql}
+    summary = BatchSummary(
+        files=len(results),
+        converted=sum(1 for result in results if result.error is None),
+        failed=sum(1 for result in results if result.error is not None),
+        cached=sum(1 for result in results if result.cached),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 3),
+        convert_ms=round(sum(result.elapsed_ms for result in results), 3),
+    )
+    yield json.dumps({"summary": summary.model_dump()}, ensure_ascii=False) + "\n"
 
-@app.post("/validate", response_model=ValidateResponse)
-async def validate(req: ValidateRequest):
-    sql = req.sql
+@app.post("/convert_batch")
+async def convert_batch(
+    files: List[UploadFile] = File(...),
+    mode: EmitMode = EMIT_MODE,
+    dialect: Optional[SqlDialect] = None,
+):
+    """
+    Пакетная конвертация: несколько файлов и/или zip-архивов в одном запросе.
+    Результаты отдаются NDJSON по мере готовности (порядок — по завершению),
+    последней строкой идёт {"summary": ...} с итогами и временем.
+    """
+    for file in files:
+        open_upload(file)
+    return StreamingResponse(_convert_batch_lines(expand_batch(files), mode, dialect), media_type="application/x-ndjson")
 
-    # 1. Статический анализ (SQLFluff)
-    lint_raw = validator.lint(sql)
-    lint = [
+@app.post("/reverse")
+async def reverse(file: UploadFile = File(...), format: DiagramFormat = "drawio"):
+    """
+    Обратное преобразование: база SQLite или SQL-дамп → диаграмма .erd,
+    GraphML или draw.io. Схема читается до начала ответа (ошибки — 400),
+    диаграмма отдаётся потоком, без построения XML-дерева
+    """
+    source = open_upload(file)
+    try:
+        schema = await executor.run_thread(read_source, file.filename or "schema", source)
+    except (ValueError, sqlite3.DatabaseError) as e:
+        raise HTTPException(400, str(e))
+
+    extension, writer = DIAGRAM_WRITERS[format]
+    # В заголовке только ASCII: имя загрузки может быть любым
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.splitext(os.path.basename(file.filename or ""))[0])
+    filename = (stem or "schema") + extension
+    return StreamingResponse(
+        writer(schema),
+        media_type="application/xml",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+STAGES = ("lint", "sqlite", "ast", "rules", "llm")
+
+# Результат этапа llm, когда CodeT5 не запускался (режим tiered)
+LLM_SKIPPED = object()
+
+def _lint_issues(lint_raw: list[dict]) -> list[LintIssue]:
+    return [
         LintIssue(
             code=issue.get("code",""),
-            line=issue.get("line_no") or issue.get("line") or 0,
-            pos=issue.get("line_pos") or issue.get("position") or 0,
-            description=issue.get("description","")
+            line=issue.get("line") or 0,
+            pos=issue.get("pos") or 0,
+            description=issue.get("description",""),
+            statement=issue.get("statement"),
         )
         for issue in lint_raw
     ]
 
-    # 2. Динамическая проверка (SQLite)
-    sqlite_err = validator.check_sqlite(sql)
+def _request_schema(req: ValidateRequest) -> Schema | None:
+    """Промежуточная схема, переданная вместе с SQL, если она есть"""
+    if req.tables is None:
+        return None
+    return _schema_from_dict(
+        [table.model_dump() for table in req.tables],
+        [fk.model_dump() for fk in req.foreign_keys],
+    )
+
+def _stage_timeout(stage: str, timeout: float | None) -> float:
+    if timeout is not None:
+        return timeout
+    return LLM_STAGE_TIMEOUT if stage == "llm" else STAGE_TIMEOUT
+
+async def _run_stage(stage: str, script, cache_key: str, timeout: float):
+    """
+    Выполняет этап в пуле над разобранным скриптом;
+    возвращает (этап, результат, истёк ли таймаут)
+    """
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(executor.run(stage, script), timeout)
+    except asyncio.TimeoutError:
+        # Задача в пуле доработает сама, но ответ её больше не ждёт
+        _observe_stage(stage, started, "timeout", len(script.statements))
+        return stage, None, True
+    except Exception as e:
+        _observe_stage(stage, started, _failure(e), len(script.statements))
+        raise
+    _observe_stage(stage, started, "ok", len(script.statements))
+    result_cache.put(stage, cache_key, result)
+    return stage, result, False
+
+def _observe_stage(stage: str, started: float, outcome: str, statements: int | None = None) -> None:
+    observe_stage(stage, time.perf_counter() - started, outcome, statements)
+
+def _failure(error: Exception) -> str:
+    return "rejected" if isinstance(error, PoolSaturated) else "error"
+
+async def _parse(sql: str, dialect: str | None = None):
+    """Разбор скрипта в пуле потоков с замером времени"""
+    started = time.perf_counter()
+    script = await executor.parse(sql, dialect)
+    _observe_stage("parse", started, "ok", len(script.statements))
+    return script
+
+# Поля ValidateResponse, которые заполняет каждый этап
+STAGE_FIELDS = {
+    "lint": ("lint_issues",),
+    "sqlite": ("sqlite_error", "sqlite_statement"),
+    "ast": ("ast_messages",),
+    "rules": ("rule_findings",),
+    "llm": ("llm_report", "llm_skipped"),
+}
+
+def _tiered(req: ValidateRequest) -> bool:
+    return LLM_TIERED and not req.deep
+
+async def _rule_findings(req: ValidateRequest, schema: Schema | None, script, digest: str) -> list[dict]:
+    """Находки правил: по схеме, из кэша этапа rules или заново по скрипту"""
+    if schema is not None:
+        return run_schema_rules(schema)
+    cache_key = ResultCache.key("rules", digest, validator.stage_config("rules", req.dialect))
+    findings = result_cache.get("rules", cache_key)
+    if findings is MISS:
+        findings = await executor.run_thread(validator.rule_analysis, script)
+        result_cache.put("rules", cache_key, findings)
+    return findings
+
+async def _gated_llm(run_llm, findings):
+    """
+    Режим tiered: CodeT5 (run_llm) запускается, только если правила не нашли
+    ошибок. Иначе этап llm сразу завершается с LLM_SKIPPED: заведомо
+    неверную схему дорогая модель не проверяет. findings — результат этапа
+    rules этого же запроса (см. _RulesGate) или _rule_findings, если этап
+    не запрошен; None (таймаут, ошибка этапа) ворота не закрывает
+    """
+    started = time.perf_counter()
+    if has_errors(await findings or []):
+        _observe_stage("llm", started, "skipped")
+        return "llm", LLM_SKIPPED, False
+    return await run_llm()
+
+class _RulesGate:
+    """
+    Находки этапа rules для ворот CodeT5 в одном запросе: этап выполняется
+    один раз, а _gated_llm ждёт его результат, не пересчитывая правила
+    """
+
+    def __init__(self):
+        self.findings = asyncio.get_running_loop().create_future()
 
-    # 3. AST-анализ (sqlglot)
-    ast_msgs = validator.ast_analysis(sql)
+    def publish(self, findings) -> None:
+        if not self.findings.done():
+            self.findings.set_result(findings)
 
-    # 4. LLM-проверка (CodeT5)
-    llm_report = validator.llm_validate(sql)
+    async def run(self, stage_run):
+        """Выполняет этап rules (stage_run) и публикует его находки"""
+        try:
+            item = await stage_run
+        except BaseException:
+            self.publish(None)
+            raise
+        self.publish(item[1])
+        return item
 
-    return ValidateResponse(
-        lint_issues=lint,
-        sqlite_error=sqlite_err,
-        ast_messages=ast_msgs,
-        llm_report=llm_report,
+def _llm_gate(req: ValidateRequest, stages: list[str]) -> _RulesGate | None:
+    """Ворота по этапу rules, если в tiered-режиме запрошены и rules, и llm"""
+    if "llm" in stages and "rules" in stages and _tiered(req):
+        return _RulesGate()
+    return None
+
+def _gate_findings(gate: _RulesGate | None, req: ValidateRequest, schema: Schema | None, script, digest: str):
+    return gate.findings if gate is not None else _rule_findings(req, schema, script, digest)
+
+async def _stage_results(req: ValidateRequest):
+    """
+    Отдаёт (этап, результат, истёк ли таймаут) по мере готовности:
+    сначала этапы из кэша и AST по схеме, затем остальные в порядке завершения
+    """
+    sql = req.sql
+    schema = _request_schema(req)
+    digest = content_digest(normalize_sql(sql))
+    stages = [stage for stage in STAGES if req.stages is None or stage in req.stages]
+
+    if req.session is not None:
+        async for item in _incremental_results(req, stages, digest):
+            yield item
+        return
+
+    gate = _llm_gate(req, stages)
+    pending = []
+    for stage in stages:
+        if stage == "ast" and schema is not None:
+            # Схема уже разобрана конвертером: проверки линейны и не требуют sqlglot
+            started = time.perf_counter()
+            messages = run_schema_checks(schema)
+            _observe_stage(stage, started, "ok")
+            yield stage, messages, False
+            continue
+        if stage == "rules" and schema is not None:
+            started = time.perf_counter()
+            findings = run_schema_rules(schema)
+            _observe_stage(stage, started, "ok")
+            if gate is not None:
+                gate.publish(findings)
+            yield stage, findings, False
+            continue
+        cache_key = ResultCache.key(stage, digest, validator.stage_config(stage, req.dialect))
+        cached = result_cache.get(stage, cache_key)
+        if cached is not MISS:
+            server_timing(stage, 0.0, "cached")
+            if stage == "rules" and gate is not None:
+                gate.publish(cached)
+            yield stage, cached, False
+        else:
+            pending.append((stage, cache_key))
+
+    if pending:
+        # Скрипт разбирается один раз, и только если хоть один этап не в кэше.
+        # Этапы независимы: lint (SQLFluff), SQLite, AST (sqlglot) и LLM (CodeT5)
+        # выполняются одновременно, общее время — по самому долгому из них
+        script = await _parse(sql, req.dialect)
+        runs = []
+        for stage, cache_key in pending:
+            run = partial(_run_stage, stage, script, cache_key, _stage_timeout(stage, req.timeout))
+            if stage == "llm" and _tiered(req):
+                runs.append(_gated_llm(run, _gate_findings(gate, req, schema, script, digest)))
+            elif stage == "rules" and gate is not None:
+                runs.append(gate.run(run()))
+            else:
+                runs.append(run())
+        for next_result in asyncio.as_completed(runs):
+            yield await next_result
+
+async def _run_units(stage: str, script, plan, submission: Submission, timeout: float):
+    """
+    Инкрементальный этап: выполняется только для таблиц plan.todo(stage),
+    результаты остальных берутся из прошлой отправки сессии;
+    возвращает (этап, результат по всему скрипту, истёк ли таймаут)
+    """
+    todo = plan.todo(stage)
+    results = plan.reused(stage)
+    submission.results[stage] = results
+
+    async def compute():
+        if stage == "ast":
+            return await executor.run_thread(ast_unit_messages, script, plan, todo)
+        if stage == "lint":
+            texts = [unit_text(plan.units[table]) for table in todo]
+        else:
+            texts = await executor.run_thread(validator.llm_chunks, script, todo)
+        reports = await executor.run_units(stage, texts, script.dialect)
+        # При выключенном LLM фрагменты не строятся, отчёты пустые
+        return dict(zip(todo, reports)) if reports else {table: [] for table in todo}
+
+    statements = sum(len(plan.units[table]) for table in todo)
+    started = time.perf_counter()
+    try:
+        results.update(await asyncio.wait_for(compute(), timeout))
+    except asyncio.TimeoutError:
+        # Таблицы без результата перепроверятся при следующей отправке
+        _observe_stage(stage, started, "timeout", statements)
+        return stage, None, True
+    except Exception as e:
+        _observe_stage(stage, started, _failure(e), statements)
+        raise
+    _observe_stage(stage, started, "ok", statements)
+
+    if stage == "lint":
+        result = [
+            issue
+            for table, statements in plan.units.items()
+            for issue in map_lint_issues(script, statements, results[table])
+        ]
+    elif stage == "ast":
+        result = [message for table in plan.units for message in results[table]]
+    else:
+        result = merge_reports([results[table] for table in plan.units])
+    return stage, result, False
+
+async def _incremental_results(req: ValidateRequest, stages: list[str], digest: str):
+    """
+    Как _stage_results, но lint, AST и LLM считаются по таблицам и только для
+    изменившихся с прошлой отправки сессии. Первым отдаётся ("incremental", отчёт)
+    """
+    script = await _parse(req.sql, req.dialect)
+    # Результаты по таблицам зависят от диалекта: у каждого своя история сессии
+    session = req.session if req.dialect is None else f"{req.session}:{req.dialect}"
+    plan = await executor.run_thread(plan_revalidation, script, sessions.get(session))
+    submission = Submission(plan.digests)
+
+    unit_stages = [stage for stage in stages if stage in UNIT_STAGES]
+    recomputed = set().union(*(plan.todo(stage) for stage in unit_stages)) - {""}
+    yield "incremental", {
+        "recomputed": sorted(recomputed),
+        "reused": sorted(set(plan.units) - recomputed - {""}),
+        "removed": sorted(plan.removed - {""}),
+    }, False
+
+    gate = _llm_gate(req, stages)
+    pending = []
+    for stage in stages:
+        timeout = _stage_timeout(stage, req.timeout)
+        if stage in UNIT_STAGES:
+            run = partial(_run_units, stage, script, plan, submission, timeout)
+            if stage == "llm" and _tiered(req):
+                pending.append(_gated_llm(run, _gate_findings(gate, req, _request_schema(req), script, digest)))
+            else:
+                pending.append(run())
+            continue
+        cache_key = ResultCache.key(stage, digest, validator.stage_config(stage, req.dialect))
+        cached = result_cache.get(stage, cache_key)
+        if cached is not MISS:
+            server_timing(stage, 0.0, "cached")
+            if stage == "rules" and gate is not None:
+                gate.publish(cached)
+            yield stage, cached, False
+        elif stage == "rules" and gate is not None:
+            pending.append(gate.run(_run_stage(stage, script, cache_key, timeout)))
+        else:
+            pending.append(_run_stage(stage, script, cache_key, timeout))
+
+    for next_result in asyncio.as_completed(pending):
+        yield await next_result
+
+    # Результаты этапов, не запрошенных в этот раз, остаются для неизменённых таблиц
+    for stage in UNIT_STAGES:
+        if stage not in unit_stages:
+            submission.results[stage] = plan.reused(stage)
+    sessions.put(session, submission)
+
+def _apply_stage(response: ValidateResponse, stage: str, result, timed_out: bool) -> None:
+    if stage == "incremental":
+        response.incremental = IncrementalReport(**result)
+    elif timed_out:
+        response.timed_out.append(stage)
+        response.timed_out.sort(key=STAGES.index)
+    elif stage == "lint":
+        response.lint_issues = _lint_issues(result)
+    elif stage == "sqlite" and result is not None:
+        response.sqlite_error = result["error"]
+        response.sqlite_statement = result["statement"]
+    elif stage == "ast":
+        response.ast_messages = result
+    elif stage == "rules":
+        response.rule_findings = [RuleFinding(**finding) for finding in result]
+    elif stage == "llm" and result is LLM_SKIPPED:
+        response.llm_skipped = True
+    elif stage == "llm":
+        response.llm_report = result
+
+@app.post("/validate", response_model=ValidateResponse)
+async def validate(req: ValidateRequest):
+    response = ValidateResponse()
+    async for stage, result, timed_out in _stage_results(req):
+        _apply_stage(response, stage, result, timed_out)
+    return response
+
+def _ndjson(event: str, **data) -> str:
+    return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+
+async def _validation_updates(req: ValidateRequest, started: float):
+    """
+    События проверки: {"event": "stage"} с полями ValidateResponse
+    этого этапа сразу по его завершении и {"event": "done"} с полным отчётом
+    """
+    response = ValidateResponse()
+    async for stage, result, timed_out in _stage_results(req):
+        _apply_stage(response, stage, result, timed_out)
+        if stage == "incremental":
+            yield {"event": "incremental", **result}
+            continue
+        fields = response.model_dump(include=set(STAGE_FIELDS[stage]))
+        yield {"event": "stage", "stage": stage, "timed_out": timed_out, **fields}
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    yield {"event": "done", "report": response.model_dump(), "elapsed_ms": elapsed_ms}
+
+async def _validation_events(req: ValidateRequest, started: float):
+    """События _validation_updates строками NDJSON"""
+    async for event in _validation_updates(req, started):
+        yield _ndjson(**event)
+
+@app.post("/validate/stream")
+async def validate_stream(req: ValidateRequest):
+    """Потоковый /validate: результат каждого этапа отдаётся, как только он готов"""
+    events = _validation_events(req, time.perf_counter())
+    return StreamingResponse(events, media_type="application/x-ndjson")
+
+@app.get("/stats/executors")
+async def executor_stats():
+    """Глубина очередей и счётчики пулов исполнителей"""
+    return executor.stats()
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """Попадания и промахи кэша результатов по этапам"""
+    return result_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Гистограммы этапов и конвертации, состояние пулов и кэша в формате Prometheus"""
+    return PlainTextResponse(
+        render_prometheus(executor.stats(), result_cache.stats()),
+        media_type="text/plain; version=0.0.4",
     )
 
 @app.post("/convert_and_validate", response_model=ValidateResponse)
-async def convert_and_validate(file: UploadFile = File(...)):
-    conv = await convert(file)
+async def convert_and_validate(
+    file: UploadFile = File(...),
+    mode: EmitMode = EMIT_MODE,
+    dialect: Optional[SqlDialect] = None,
+):
+    conv = await convert(file, mode, dialect)
     joined_sql = "\n".join(conv.sql)
-    return await validate(ValidateRequest(sql=joined_sql))
+    return await validate(ValidateRequest(
+        sql=joined_sql,
+        tables=conv.tables if conv.tables else None,
+        foreign_keys=conv.foreign_keys,
+        dialect=dialect,
+    ))
+
+@app.post("/convert_and_validate/stream")
+async def convert_and_validate_stream(
+    file: UploadFile = File(...),
+    mode: EmitMode = EMIT_MODE,
+    dialect: Optional[SqlDialect] = None,
+):
+    """
+    Потоковый /convert_and_validate: первой строкой {"event": "convert"}
+    со сгенерированным SQL, затем события этапов, как в /validate/stream
+    """
+    started = time.perf_counter()
+    # Конвертация выполняется до начала ответа, чтобы ошибки 400/413
+    # вернулись обычным HTTP-статусом, а не оборвали поток
+    conv = await convert(file, mode, dialect)
+    req = ValidateRequest(
+        sql="\n".join(conv.sql),
+        tables=conv.tables if conv.tables else None,
+        foreign_keys=conv.foreign_keys,
+        dialect=dialect,
+    )
+
+    async def events():
+        yield _ndjson("convert", **conv.model_dump())
+        async for line in _validation_events(req, started):
+            yield line
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+async def _run_job(job: Job, progress) -> dict:
+    """
+    Выполняет задачу /jobs: события конвертации и этапов становятся
+    промежуточными результатами, полный отчёт — итогом
+    """
+    if job.request.get("convert") is not None:
+        progress({"event": "convert", **job.request["convert"]})
+    req = ValidateRequest(**job.request["validate"])
+    async for event in _validation_updates(req, time.perf_counter()):
+        if event["event"] == "done":
+            return event["report"]
+        progress(event)
+
+jobs = JobQueue(_run_job)
+
+def _job_info(job: Job | None) -> JobInfo:
+    if job is None:
+        raise HTTPException(404, "Задача не найдена или её результат устарел")
+    return JobInfo(
+        id=job.id,
+        status=job.status,
+        priority=job.priority,
+        created=job.created,
+        updated=job.updated,
+        events=job.events,
+        result=job.result,
+        error=job.error,
+    )
+
+@app.post("/jobs", response_model=JobInfo, status_code=202)
+async def create_job(req: JobRequest):
+    """
+    Ставит проверку SQL в очередь и сразу возвращает id задачи;
+    ход и результат — в GET /jobs/{id}
+    """
+    request = req.model_dump(exclude={"priority"})
+    return _job_info(jobs.submit({"validate": request, "convert": None}, req.priority))
+
+@app.post("/jobs/convert_and_validate", response_model=JobInfo, status_code=202)
+async def create_convert_job(
+    file: UploadFile = File(...),
+    mode: EmitMode = EMIT_MODE,
+    dialect: Optional[SqlDialect] = None,
+    priority: JobPriority = "interactive",
+):
+    """
+    Фоновый /convert_and_validate. Конвертация выполняется сразу (ошибки
+    возвращаются обычным HTTP-статусом), в очередь уходит только проверка:
+    в задаче хранится SQL, а не загруженный файл
+    """
+    conv = await convert(file, mode, dialect)
+    req = ValidateRequest(
+        sql="\n".join(conv.sql),
+        tables=conv.tables if conv.tables else None,
+        foreign_keys=conv.foreign_keys,
+        dialect=dialect,
+    )
+    return _job_info(jobs.submit({"validate": req.model_dump(), "convert": conv.model_dump()}, priority))
+
+@app.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str, wait: float = 0, since: Optional[int] = None):
+    """
+    Состояние задачи. wait > 0 — long-poll: ответ приходит, когда задача
+    завершится (или, если задан since, когда событий станет больше since),
+    но не позже wait секунд (не больше JOBS_MAX_WAIT)
+    """
+    if wait > 0:
+        return _job_info(await jobs.wait(job_id, min(wait, JOBS_MAX_WAIT), since))
+    return _job_info(jobs.get(job_id))
+
+@app.delete("/jobs/{job_id}", response_model=JobInfo)
+async def cancel_job(job_id: str):
+    """Отменяет задачу; завершённая задача возвращается без изменений"""
+    return _job_info(jobs.cancel(job_id))
+
+@app.get("/stats/jobs")
+async def job_stats():
+    """Число задач /jobs по состояниям"""
+    return jobs.stats()
 
 if __name__ == "__main__":
     import uvicorn
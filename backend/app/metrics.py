@@ -0,0 +1,215 @@
+# backend/app/metrics.py
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Границы корзин гистограмм
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BYTES_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с набором меток; запись из любых потоков"""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...], buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # значения меток → (счётчики по корзинам, сумма, количество)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_labels = ",".join(labels + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+REGISTRY: List[Histogram] = []
+
+STAGE_SECONDS = Histogram(
+    "er2sql_stage_duration_seconds",
+    "Время этапа валидации вместе с ожиданием в очереди пула",
+    ("stage", "outcome"),
+)
+STAGE_STATEMENTS = Histogram(
+    "er2sql_stage_input_statements",
+    "Число инструкций скрипта, переданного этапу",
+    ("stage",),
+    SIZE_BUCKETS,
+)
+CONVERT_SECONDS = Histogram(
+    "er2sql_convert_duration_seconds",
+    "Время конвертации диаграммы",
+    ("reader", "outcome"),
+)
+CONVERT_BYTES = Histogram(
+    "er2sql_convert_input_bytes",
+    "Размер конвертируемой диаграммы",
+    ("reader",),
+    BYTES_BUCKETS,
+)
+CONVERT_TABLES = Histogram(
+    "er2sql_convert_tables",
+    "Число таблиц в сконвертированной схеме",
+    ("reader",),
+    SIZE_BUCKETS,
+)
+POOL_WAIT_SECONDS = Histogram(
+    "er2sql_pool_wait_seconds",
+    "Ожидание задачи в очереди пула до начала выполнения",
+    ("pool",),
+)
+POOL_RUN_SECONDS = Histogram(
+    "er2sql_pool_run_seconds",
+    "Время выполнения задачи в воркере пула",
+    ("pool",),
+)
+
+JOB_WAIT_SECONDS = Histogram(
+    "er2sql_job_wait_seconds",
+    "Ожидание задачи /jobs в очереди до начала выполнения",
+    ("priority",),
+)
+JOB_RUN_SECONDS = Histogram(
+    "er2sql_job_run_seconds",
+    "Время выполнения задачи /jobs",
+    ("outcome",),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Замеры текущего запроса для заголовка Server-Timing; None вне запроса
+_timings: ContextVar[Optional[list]] = ContextVar("server_timings", default=None)
+
+
+def server_timing(name: str, seconds: float, description: str = "") -> None:
+    """Добавляет замер в Server-Timing текущего запроса (если он есть)"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds, description))
+
+
+def observe_stage(stage: str, seconds: float, outcome: str, statements: Optional[int] = None) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage, outcome=outcome)
+    if statements is not None:
+        STAGE_STATEMENTS.observe(statements, stage=stage)
+    description = outcome if statements is None else f"{outcome}, {statements} statements"
+    server_timing(stage, seconds, description)
+
+
+def observe_convert(reader: str, seconds: float, outcome: str, size: int, tables: Optional[int]) -> None:
+    CONVERT_SECONDS.observe(seconds, reader=reader, outcome=outcome)
+    CONVERT_BYTES.observe(size, reader=reader)
+    if tables is not None:
+        CONVERT_TABLES.observe(tables, reader=reader)
+    server_timing("convert", seconds, f"{reader}, {outcome}, {size} bytes")
+
+
+def _header(timings: list) -> bytes:
+    entries = []
+    for name, seconds, description in timings:
+        entry = f"{name};dur={seconds * 1000:.3f}"
+        if description:
+            entry += f';desc="{_escape(description)}"'
+        entries.append(entry)
+    return ", ".join(entries).encode("latin-1", "replace")
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI-middleware, добавляющее заголовок Server-Timing с замерами этапов
+    запроса и общим временем до отправки заголовков (total).
+
+    В потоковых ответах заголовки уходят до окончания этапов, поэтому туда
+    попадает только то, что завершилось к началу ответа; полные данные — в /metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = []
+        token = _timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                entries = timings + [("total", time.perf_counter() - started, "")]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _header(entries)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+
+
+def render_prometheus(executor_stats: dict, cache_stats: dict) -> str:
+    """Все гистограммы плюс состояние пулов и кэша на момент запроса"""
+    lines: List[str] = []
+    for histogram in REGISTRY:
+        lines += histogram.render()
+
+    gauges = {
+        "in_flight": ("gauge", "Задачи, выполняемые или ожидающие в пуле"),
+        "queued": ("gauge", "Задачи, ожидающие свободного воркера"),
+        "workers": ("gauge", "Число воркеров пула"),
+        "completed": ("counter", "Успешно выполненные задачи"),
+        "failed": ("counter", "Задачи, завершившиеся исключением"),
+        "rejected": ("counter", "Задачи, отклонённые из-за переполнения очереди"),
+    }
+    for field, (kind, help) in gauges.items():
+        name = f"er2sql_pool_{field}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        for pool, stats in sorted(executor_stats.items()):
+            if field in stats:
+                lines.append(f'{name}{{pool="{_escape(pool)}"}} {stats[field]}')
+
+    for field in ("hits", "misses"):
+        name = f"er2sql_cache_{field}_total"
+        lines += [f"# HELP {name} Обращения к кэшу результатов по этапам", f"# TYPE {name} counter"]
+        for stage, stats in sorted(cache_stats.get("stages", {}).items()):
+            lines.append(f'{name}{{stage="{_escape(stage)}"}} {stats[field]}')
+    for field in ("entries", "bytes"):
+        name = f"er2sql_cache_{field}"
+        lines += [f"# HELP {name} Размер кэша результатов", f"# TYPE {name} gauge",
+                  f"{name} {cache_stats.get(field, 0)}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,117 @@
+# backend/app/profiling.py
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from .config import PROFILE_DIR, PROFILE_ENABLED, PROFILE_SAMPLE_INTERVAL_MS
+
+PROFILE_MODES = {"cprofile": "prof", "sample": "collapsed"}
+
+# Одновременно профилируется один запрос: два cProfile в одном процессе
+# мешают друг другу, а сэмплер и так видит все потоки
+_busy = threading.Lock()
+
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик: фоновый поток раз в interval снимает стеки
+    всех потоков процесса (event loop и пул потоков) и считает одинаковые
+    стеки. Результат — collapsed-формат, который понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware для разбора медленных запросов: с заголовком
+    X-Profile: cprofile или X-Profile: sample запрос профилируется целиком
+    (вместе с потоковой отдачей тела), дамп пишется в PROFILE_DIR, а имя
+    файла возвращается в заголовке X-Profile-Dump.
+
+    cprofile видит только поток event loop — то есть и корутины параллельных
+    запросов; sample снимает стеки всех потоков процесса. Работа в пуле
+    процессов в дамп не попадает: для профилирования SQLFluff и CodeT5
+    запускайте сервис с PROCESS_POOL_SIZE=0.
+    """
+
+    def __init__(self, app, enabled: bool = PROFILE_ENABLED, directory: str = PROFILE_DIR):
+        self.app = app
+        self.enabled = enabled
+        self.directory = directory
+
+    async def __call__(self, scope, receive, send):
+        mode = None
+        if self.enabled and scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    mode = value.decode("latin-1").strip().lower()
+        if mode not in PROFILE_MODES or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}-{slug}.{PROFILE_MODES[mode]}"
+        path = os.path.join(self.directory, filename)
+
+        async def send_with_dump(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(b"x-profile-dump", filename.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_with_dump)
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(path)
+            else:
+                sampler = StackSampler()
+                sampler.start()
+                try:
+                    await self.app(scope, receive, send_with_dump)
+                finally:
+                    sampler.stop()
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(sampler.collapsed())
+        finally:
+            _busy.release()
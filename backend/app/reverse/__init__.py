@@ -0,0 +1,2 @@
+from .sources import SQLITE_HEADER, read_ddl, read_source, read_sqlite
+from .writers import DIAGRAM_WRITERS, diagram_tables, write_drawio, write_erd, write_graphml
@@ -0,0 +1,119 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from sqlglot import expressions
+
+from ..converters.model import Column, ForeignKey, Schema, Table
+from ..validator.ast_checks import index_statements
+from ..validator.script import iter_statements
+
+# Первые байты любого файла базы SQLite 3
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _introspect(conn: sqlite3.Connection) -> Schema:
+    schema = Schema()
+    # Служебные таблицы — по точному префиксу: «_» в LIKE совпадает с любым
+    # символом, и NOT LIKE 'sqlite_%' отбросил бы и пользовательскую sqliteusers
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND substr(name, 1, 7) != 'sqlite_' ORDER BY rowid"
+    )]
+    primary_keys = {}
+    for name in names:
+        # PRAGMA table_info: cid, name, type, notnull, dflt_value, pk (номер в ключе с 1)
+        info = conn.execute(f"PRAGMA table_info({_quote(name)})").fetchall()
+        schema.tables.append(Table(name, [Column(row[1], row[2] or "", row[5] > 0) for row in info]))
+        primary_keys[name.lower()] = next((row[1] for row in info if row[5] == 1), "id")
+
+    for name in names:
+        # PRAGMA foreign_key_list: id, seq, table, from, to, ...; to = NULL — ссылка на PK цели
+        for row in conn.execute(f"PRAGMA foreign_key_list({_quote(name)})"):
+            ref_column = row[4] or primary_keys.get(row[2].lower(), "id")
+            schema.foreign_keys.append(ForeignKey(name, row[3], row[2], ref_column))
+    return schema
+
+
+def read_sqlite(source) -> Schema:
+    """
+    Схема базы SQLite по PRAGMA table_info и foreign_key_list.
+
+    source — путь или файловый объект; файловый объект копируется во
+    временный файл блоками (SQLite открывает только файлы на диске),
+    сама база открывается только на чтение.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        conn = sqlite3.connect(f"file:{os.fspath(source)}?mode=ro", uri=True)
+        try:
+            return _introspect(conn)
+        finally:
+            conn.close()
+
+    fd, path = tempfile.mkstemp(suffix=".sqlite")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(source, f)
+        return read_sqlite(path)
+    finally:
+        os.unlink(path)
+
+
+def _type_sql(kind) -> str:
+    if kind is None:
+        return ""
+    return kind.sql() if isinstance(kind, expressions.Expression) else str(kind)
+
+
+def read_ddl(sql: str) -> Schema:
+    """
+    Схема по SQL-скрипту (CREATE TABLE, ALTER TABLE ... ADD FOREIGN KEY).
+
+    Инструкции разбираются sqlglot по одной, деревья сразу сворачиваются
+    в индекс таблиц — в памяти не держится весь разобранный дамп.
+    Неразобранные инструкции пропускаются.
+    """
+    tables, foreign_keys = index_statements(statement.tree for statement in iter_statements(sql))
+    schema = Schema()
+    for index in tables.values():
+        if not index.columns_known:
+            continue
+        schema.tables.append(Table(index.name, [
+            Column(name, _type_sql(index.types.get(name.lower())), name.lower() in index.primary_key)
+            for name in index.columns
+        ]))
+
+    for fk in foreign_keys:
+        ref_column = fk.ref_column
+        if ref_column is None:
+            # REFERENCES t без столбцов — ссылка на одиночный первичный ключ t
+            target = tables.get(fk.ref_table.lower())
+            primary_key = [name for name in target.columns if name.lower() in target.primary_key] if target else []
+            ref_column = primary_key[0] if len(primary_key) == 1 else "id"
+        schema.foreign_keys.append(ForeignKey(fk.table, fk.column, fk.ref_table, ref_column))
+    return schema
+
+
+def read_source(filename: str, source) -> Schema:
+    """
+    Схема из файла базы SQLite (определяется по сигнатуре) или SQL-дампа;
+    source — файловый объект. ValueError, если таблиц не найдено
+    """
+    header = source.read(len(SQLITE_HEADER))
+    source.seek(0)
+    if header == SQLITE_HEADER:
+        schema = read_sqlite(source)
+    else:
+        try:
+            sql = source.read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError(f"{filename}: ожидается SQL-скрипт в UTF-8 или база SQLite")
+        schema = read_ddl(sql)
+
+    if not schema.tables:
+        raise ValueError(f"{filename}: не найдено ни одной таблицы")
+    return schema
@@ -0,0 +1,154 @@
+import html
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from ..converters.model import Column, Schema, Table
+
+# Ответ собирается из фрагментов примерно такого размера
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(slots=True)
+class DiagramTable:
+    """Таблица в виде, который понимают читатели диаграмм"""
+    id: str
+    table: Table
+    columns: List[Column]
+    # id таблиц, на которые есть связи
+    relations: List[str]
+
+
+def diagram_tables(schema: Schema) -> Iterator[DiagramTable]:
+    """
+    Готовит таблицы схемы к записи в диаграмму.
+
+    Связь в диаграмме — ребро между таблицами: читатели сами добавляют
+    столбец <цель>_id и ссылаются на первичный ключ цели. Поэтому столбцы
+    внешних ключей на таблицы схемы в диаграмму не пишутся, а несколько
+    ключей одной таблицы на одну цель становятся одним ребром. Ключи на
+    отсутствующие таблицы остаются обычными столбцами. Столбцы первичного
+    ключа сохраняются всегда; если такой столбец уже называется <цель>_id,
+    ребро не пишется, чтобы читатель не создал второй столбец с тем же именем.
+    """
+    ids = {table.name.lower() for table in schema.tables}
+    outgoing: Dict[str, Dict[str, set]] = {}
+    for fk in schema.foreign_keys:
+        target = fk.ref_table.lower()
+        if target in ids:
+            outgoing.setdefault(fk.table.lower(), {}).setdefault(target, set()).add(fk.column.lower())
+
+    for table in schema.tables:
+        key = table.name.lower()
+        relations = outgoing.get(key, {})
+        fk_columns = set().union(*relations.values())
+        columns = [col for col in table.columns if col.primary_key or col.name.lower() not in fk_columns]
+        kept = {col.name.lower() for col in columns}
+        yield DiagramTable(
+            id=key,
+            table=table,
+            columns=columns,
+            relations=[target for target in relations if f"{target}_id" not in kept],
+        )
+
+
+def _chunked(parts: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Склеивает мелкие фрагменты в блоки около size символов"""
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _erd_parts(schema: Schema) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<er-diagram>\n'
+    relation = 0
+    for item in diagram_tables(schema):
+        yield f"  <entity id={quoteattr(item.id)} name={quoteattr(item.table.name)}>\n"
+        for col in item.columns:
+            sql_type = f" type={quoteattr(col.type)}" if col.type else ""
+            primary = ' primary="true"' if col.primary_key else ""
+            yield f"    <attribute name={quoteattr(col.name)}{sql_type}{primary}/>\n"
+        yield "  </entity>\n"
+        for target in item.relations:
+            yield f'  <relation id="r{relation}" type="fk" fk-ref={quoteattr(item.id)} pk-ref={quoteattr(target)}/>\n'
+            relation += 1
+    yield "</er-diagram>\n"
+
+
+def _graphml_parts(schema: Schema) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+        'xmlns:y="http://www.yworks.com/xml/graphml">\n<graph id="G" edgedefault="directed">\n'
+    )
+    edge = 0
+    for item in diagram_tables(schema):
+        # Читатель GraphML считает первичным ключом первый столбец
+        columns = sorted(item.columns, key=lambda col: not col.primary_key)
+        attributes = "\n".join(f"{col.name}: {col.type}" if col.type else col.name for col in columns)
+        yield (
+            f"<node id={quoteattr(item.id)}><data><y:GenericNode>"
+            f'<y:NodeLabel configuration="com.yworks.entityRelationship.label.name">'
+            f"{escape(item.table.name)}</y:NodeLabel>"
+            f'<y:NodeLabel configuration="com.yworks.entityRelationship.label.attributes">'
+            f"{escape(attributes)}</y:NodeLabel>"
+            f"</y:GenericNode></data></node>\n"
+        )
+        for target in item.relations:
+            yield f'<edge id="e{edge}" source={quoteattr(item.id)} target={quoteattr(target)}/>\n'
+            edge += 1
+    yield "</graph>\n</graphml>\n"
+
+
+def _drawio_parts(schema: Schema) -> Iterator[str]:
+    yield '<mxfile><diagram name="schema"><mxGraphModel><root>\n<mxCell id="0"/>\n<mxCell id="1" parent="0"/>\n'
+    edge = 0
+    for row, item in enumerate(diagram_tables(schema)):
+        # Значение ячейки — HTML: имя таблицы, столбцы «имя: тип» и строка
+        # «PK: столбец, ...» со всеми столбцами ключа; текст экранируется
+        lines = [f"<b>{html.escape(item.table.name)}</b>"]
+        lines += [html.escape(f"{col.name}: {col.type}" if col.type else col.name) for col in item.columns]
+        primary_key = item.table.primary_key
+        if primary_key:
+            lines.append(html.escape("PK: " + ", ".join(primary_key)))
+        geometry = f'<mxGeometry x="{(row % 20) * 220}" y="{(row // 20) * 260}" width="200" height="240" as="geometry"/>'
+        yield (
+            f"<mxCell id={quoteattr('t:' + item.id)} value={quoteattr('<br>'.join(lines))} "
+            f'style="shape=table;html=1;" vertex="1" parent="1">{geometry}</mxCell>\n'
+        )
+        for target in item.relations:
+            yield (
+                f'<mxCell id="e{edge}" edge="1" parent="1" '
+                f"source={quoteattr('t:' + item.id)} target={quoteattr('t:' + target)}/>\n"
+            )
+            edge += 1
+    yield "</root></mxGraphModel></diagram></mxfile>\n"
+
+
+def write_erd(schema: Schema) -> Iterator[str]:
+    """Диаграмма .erd (читается parse_erd) фрагментами текста"""
+    return _chunked(_erd_parts(schema))
+
+
+def write_graphml(schema: Schema) -> Iterator[str]:
+    """GraphML в разметке yEd/DBeaver (читается parse_graphml) фрагментами текста"""
+    return _chunked(_graphml_parts(schema))
+
+
+def write_drawio(schema: Schema) -> Iterator[str]:
+    """XML draw.io (читается parse_drawio_xml) фрагментами текста"""
+    return _chunked(_drawio_parts(schema))
+
+
+# Формат диаграммы → (расширение файла, функция записи)
+DIAGRAM_WRITERS: Dict[str, Tuple[str, Callable[[Schema], Iterator[str]]]] = {
+    "erd": (".erd", write_erd),
+    "graphml": (".graphml", write_graphml),
+    "drawio": (".xml", write_drawio),
+}
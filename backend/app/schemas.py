@@ -1,21 +1,129 @@
 # backend/app/schemas.py
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
+# Этапы валидации в порядке вывода отчёта
+Stage = Literal["lint", "sqlite", "ast", "rules", "llm"]
+# Режим генерации SQL (см. converters.emitter.EMIT_MODES)
+EmitMode = Literal["alter", "ordered"]
+# Формат диаграммы для /reverse (см. reverse.writers.DIAGRAM_WRITERS)
+DiagramFormat = Literal["erd", "graphml", "drawio"]
+# Целевой диалект SQL (см. converters.emitter.SQL_DIALECTS)
+SqlDialect = Literal["postgres", "mysql", "sqlite"]
+# Приоритет задачи /jobs: interactive (интерфейс) выполняется раньше batch (CI)
+JobPriority = Literal["interactive", "batch"]
+JobStatus = Literal["queued", "running", "done", "failed", "cancelled"]
+
+class ColumnModel(BaseModel):
+    name: str
+    type: str
+    primary_key: bool = False
+
+class ForeignKeyModel(BaseModel):
+    table: str
+    column: str
+    ref_table: str
+    ref_column: str
+
+class TableModel(BaseModel):
+    name: str
+    columns: List[ColumnModel] = []
+
 class ConvertResponse(BaseModel):
     sql: List[str]
+    # Промежуточная схема диаграммы; пусто, если файл не удалось разобрать
+    tables: List[TableModel] = []
+    foreign_keys: List[ForeignKeyModel] = []
+    # Только для mode=ordered: уровни таблиц, которые можно создавать
+    # параллельно (каждый ссылается лишь на предыдущие), и связи,
+    # вынесенные из циклов в ALTER TABLE (только postgres и mysql)
+    levels: List[List[str]] = []
+    deferred_foreign_keys: List[ForeignKeyModel] = []
+
+class BatchItemResult(ConvertResponse):
+    """Строка NDJSON-ответа /convert_batch по одному файлу"""
+    file: str
+    # Текст ошибки, если файл не сконвертирован; остальные файлы пакета это не затрагивает
+    error: Optional[str] = None
+    cached: bool = False
+    elapsed_ms: float = 0.0
+
+class BatchSummary(BaseModel):
+    """Последняя строка ответа /convert_batch"""
+    files: int
+    converted: int
+    failed: int
+    cached: int
+    # Время всего пакета и сумма времени по файлам (больше общего при параллельной работе)
+    elapsed_ms: float
+    convert_ms: float
 
 class LintIssue(BaseModel):
     code: str
     line: Optional[int]
     pos:  Optional[int]
     description: str
+    # Номер инструкции скрипта (с 1), на которую приходится замечание
+    statement: Optional[int] = None
 
 class ValidateRequest(BaseModel):
     sql: str
+    # Схема из /convert: AST-проверки выполняются по ней без разбора SQL
+    tables: Optional[List[TableModel]] = None
+    foreign_keys: List[ForeignKeyModel] = []
+    # None — запустить все этапы
+    stages: Optional[List[Stage]] = None
+    # Таймаут одного этапа в секундах; None — значения из конфигурации
+    timeout: Optional[float] = None
+    # Идентификатор сессии редактирования: lint, AST и LLM перепроверяют только
+    # таблицы, изменившиеся с прошлой отправки, и их соседей по внешним ключам
+    session: Optional[str] = None
+    # Диалект скрипта: разбор sqlglot и правила SQLFluff; None — SQLite-линтер
+    # и общий разбор, как раньше. Для SQLite-проверки скрипт переводится в SQLite
+    dialect: Optional[SqlDialect] = None
+    # Запускать CodeT5, даже если правила нашли ошибки (см. LLM_TIERED)
+    deep: bool = False
+
+class IncrementalReport(BaseModel):
+    """Что перепроверено при инкрементальной проверке (имена таблиц в нижнем регистре)"""
+    recomputed: List[str] = []
+    reused: List[str] = []
+    removed: List[str] = []
+
+class RuleFinding(BaseModel):
+    """Находка этапа rules"""
+    rule: str
+    severity: Literal["error", "warning"]
+    table: Optional[str] = None
+    message: str
 
 class ValidateResponse(BaseModel):
-    lint_issues: List[LintIssue]
-    sqlite_error: Optional[str]
-    ast_messages: List[str]
-    llm_report: List[str]
+    lint_issues: List[LintIssue] = []
+    sqlite_error: Optional[str] = None
+    # Номер инструкции (с 1), на которой SQLite остановился с ошибкой
+    sqlite_statement: Optional[int] = None
+    ast_messages: List[str] = []
+    rule_findings: List[RuleFinding] = []
+    llm_report: List[str] = []
+    # CodeT5 не запускался: правила нашли ошибки (режим tiered без deep)
+    llm_skipped: bool = False
+    # Этапы, не уложившиеся в таймаут; их поля остаются пустыми
+    timed_out: List[Stage] = []
+    # Заполняется, если в запросе передан session
+    incremental: Optional[IncrementalReport] = None
+
+class JobRequest(ValidateRequest):
+    """Тело POST /jobs: проверка SQL в фоне"""
+    priority: JobPriority = "interactive"
+
+class JobInfo(BaseModel):
+    id: str
+    status: JobStatus
+    priority: JobPriority
+    created: float
+    updated: float
+    # Промежуточные результаты: события convert, incremental и stage, как в /validate/stream
+    events: List[dict] = []
+    # Отчёт завершённой проверки (status=done)
+    result: Optional[ValidateResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,180 @@
+# backend/app/uploads.py
+import os
+import zipfile
+from contextlib import aclosing
+from functools import partial
+
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from .config import UPLOAD_MAX_SIZE, UPLOAD_SPOOL_THRESHOLD
+
+
+def _too_large(max_size: int) -> str:
+    return f"Размер загрузки превышает {max_size} байт"
+
+
+class _SpoolingParser(MultiPartParser):
+    # Части multipart меньше порога остаются в памяти, большие пишутся на диск
+    # блоками по мере получения тела запроса
+    spool_max_size = UPLOAD_SPOOL_THRESHOLD
+
+
+class UploadRequest(Request):
+    """Request, разбирающий multipart с порогом UPLOAD_SPOOL_THRESHOLD"""
+
+    async def _get_form(self, *, max_files=1000, max_fields=1000, max_part_size=1024 * 1024):
+        content_type = self.headers.get("content-type", "")
+        if self._form is None and content_type.startswith("multipart/form-data"):
+            try:
+                async with aclosing(self.stream()) as stream:
+                    parser = _SpoolingParser(self.headers, stream, max_files=max_files,
+                                             max_fields=max_fields, max_part_size=max_part_size)
+                    self._form = await parser.parse()
+            except MultiPartException as e:
+                raise HTTPException(400, e.message)
+        # Разобранная форма закэширована в _form; остальные типы тела — как в Starlette
+        return await super()._get_form(max_files=max_files, max_fields=max_fields, max_part_size=max_part_size)
+
+
+class UploadRoute(APIRoute):
+    """
+    Класс маршрутов приложения: обработчики получают UploadRequest.
+    Порог задаётся для маршрутов этого приложения, а не патчем
+    MultiPartParser для всех приложений Starlette в процессе
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            return await handler(UploadRequest(request.scope, request.receive))
+
+        return route_handler
+
+
+class _BodyTooLarge(Exception):
+    """Тело запроса превысило лимит; прерывает приложение, читающее тело"""
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI-middleware, ограничивающее размер тела запроса.
+
+    Content-Length проверяется до чтения тела, а фактически полученные байты
+    считаются по мере поступления, поэтому запрос без заголовка или с неверным
+    заголовком обрывается сразу после превышения лимита. Ответ 413 отправляет
+    само middleware, не полагаясь на обработку ошибок в приложении; всё, что
+    приложение отправит после этого, отбрасывается. Если приложение уже начало
+    ответ (потоковый ответ до конца тела), 413 не отправить — соединение обрывается.
+    """
+
+    def __init__(self, app, max_size: int = UPLOAD_MAX_SIZE):
+        self.app = app
+        self.max_size = max_size
+
+    async def _reject(self, scope, receive, send) -> None:
+        response = JSONResponse({"detail": _too_large(self.max_size)}, status_code=413)
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_size <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_size:
+                await self._reject(scope, receive, send)
+                return
+
+        received = 0
+        started = rejected = False
+
+        async def limited_send(message):
+            nonlocal started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    if not started:
+                        rejected = True
+                        await self._reject(scope, receive, send)
+                    raise _BodyTooLarge()
+            return message
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except _BodyTooLarge:
+            if not rejected:
+                raise
+
+
+def open_upload(file: UploadFile, max_size: int = UPLOAD_MAX_SIZE):
+    """
+    Возвращает файловый объект загрузки без копирования данных.
+
+    UploadFile уже лежит в SpooledTemporaryFile (в памяти или на диске
+    в зависимости от UPLOAD_SPOOL_THRESHOLD), поэтому конвертеры читают
+    его напрямую, без промежуточного временного файла.
+    """
+    if max_size > 0 and file.size is not None and file.size > max_size:
+        raise HTTPException(413, _too_large(max_size))
+    file.file.seek(0)
+    return file.file
+
+
+def _read_upload(file: UploadFile) -> bytes:
+    file.file.seek(0)
+    return file.file.read()
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_size: int) -> bytes:
+    # Размер из оглавления проверяется до распаковки, чтобы не разжимать zip-бомбу
+    if max_size > 0 and info.file_size > max_size:
+        raise ValueError(_too_large(max_size))
+    return archive.read(info)
+
+
+def _fail(message: str) -> bytes:
+    raise ValueError(message)
+
+
+def expand_batch(files: list[UploadFile], max_size: int = UPLOAD_MAX_SIZE):
+    """
+    Раскрывает загрузки пакетной конвертации в список (имя, загрузчик байтов).
+
+    Zip-архивы заменяются своими файлами (имя — «архив/путь»), каталоги
+    и служебные __MACOSX пропускаются. Данные читаются загрузчиком только
+    при отправке файла в пул, поэтому в памяти одновременно лежат лишь
+    файлы, которые сейчас конвертируются. Загрузчик повреждённого архива
+    бросает ValueError — это ошибка одного элемента, а не всего пакета.
+    """
+    items = []
+    for file in files:
+        name = file.filename or ""
+        if os.path.splitext(name)[1].lower() != ".zip":
+            items.append((name, partial(_read_upload, file)))
+            continue
+        try:
+            file.file.seek(0)
+            archive = zipfile.ZipFile(file.file)
+        except zipfile.BadZipFile:
+            items.append((name, partial(_fail, "Повреждённый zip-архив")))
+            continue
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+            items.append((f"{name}/{info.filename}", partial(_read_member, archive, info, max_size)))
+    return items
@@ -1,64 +1,305 @@
 # backend/app/validator/ast_checks.py
-from typing import List
-from sqlglot import expressions, parse_one
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple, Union
 
-def run_ast_checks(tree: expressions.Expression) -> List[str]:
+from sqlglot import expressions
+
+from ..converters.model import Schema
+
+# Семейства типов для сравнения FK-столбца с целевым; неизвестные типы не сравниваются
+_TYPE_FAMILIES = {
+    "integer": {"INT", "INTEGER", "BIGINT", "SMALLINT", "TINYINT", "MEDIUMINT",
+                "INT2", "INT4", "INT8", "SERIAL", "BIGSERIAL", "SMALLSERIAL"},
+    "text": {"TEXT", "VARCHAR", "CHAR", "NVARCHAR", "NCHAR", "CHARACTER", "CHARACTER VARYING",
+             "STRING", "CLOB", "TINYTEXT", "MEDIUMTEXT", "LONGTEXT"},
+    "numeric": {"NUMERIC", "DECIMAL", "FLOAT", "DOUBLE", "DOUBLE PRECISION", "REAL", "NUMBER"},
+    "date": {"DATE"},
+    "datetime": {"DATETIME", "TIMESTAMP", "TIMESTAMPTZ"},
+    "boolean": {"BOOLEAN", "BOOL"},
+    "uuid": {"UUID"},
+}
+_FAMILY_BY_TYPE = {name: family for family, names in _TYPE_FAMILIES.items() for name in names}
+_BASE_TYPE = re.compile(r"\s*([A-Za-z][A-Za-z0-9_]*(?:\s+(?:PRECISION|VARYING))?)", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class TableIndex:
+    """Сведения о таблице, собранные за один проход"""
+    name: str
+    columns: List[str] = field(default_factory=list)
+    types: dict = field(default_factory=dict)
+    primary_key: set = field(default_factory=set)
+    unique: set = field(default_factory=set)
+    has_pk: bool = False
+    # False для CREATE TABLE ... AS SELECT: столбцы неизвестны, таблица не проверяется
+    columns_known: bool = True
+
+
+@dataclass(slots=True)
+class ForeignKeyRef:
+    table: str
+    column: str
+    ref_table: str
+    ref_column: Optional[str]
+
+
+def _type_family(sql_type) -> Optional[str]:
+    if sql_type is None:
+        return None
+    if isinstance(sql_type, expressions.DataType):
+        # Имя перечисления sqlglot (INT, VARCHAR, DOUBLE, ...) без генерации SQL
+        sql_type = sql_type.this.name if hasattr(sql_type.this, "name") else str(sql_type.this)
+    match = _BASE_TYPE.match(sql_type)
+    return _FAMILY_BY_TYPE.get(" ".join(match.group(1).upper().split())) if match else None
+
+
+def _type_sql(sql_type) -> str:
+    return sql_type.sql() if isinstance(sql_type, expressions.Expression) else str(sql_type)
+
+
+def _name(node) -> str:
+    # Identifier, Column и Ordered хранят имя в разных местах
+    return node.name or getattr(node.this, "name", "") or ""
+
+
+class _Indexer:
+    """Строит индекс таблиц и внешних ключей по выражениям sqlglot"""
+
+    def __init__(self):
+        self.tables: dict[str, TableIndex] = {}
+        self.foreign_keys: List[ForeignKeyRef] = []
+        # ALTER TABLE таблиц, не созданных раньше в скрипте: ключ → имя
+        self.missing: dict[str, str] = {}
+
+    def table(self, name: str) -> TableIndex:
+        key = name.lower()
+        if key not in self.tables:
+            self.tables[key] = TableIndex(name)
+        return self.tables[key]
+
+    def add_statement(self, tree: expressions.Expression) -> None:
+        if isinstance(tree, expressions.Create) and tree.kind == "TABLE":
+            target = tree.this
+            if isinstance(target, expressions.Schema):
+                table = self.table(target.this.name)
+                for node in target.expressions:
+                    self._add_definition(table, node)
+            else:
+                self.table(target.name).columns_known = False
+        elif isinstance(tree, expressions.Alter) and isinstance(tree.this, expressions.Table):
+            name = tree.this.name
+            table = self.tables.get(name.lower())
+            if table is None:
+                # Такой ALTER падает целиком: его столбцы и ключи в индекс не попадают
+                self.missing.setdefault(name.lower(), name)
+                return
+            for action in tree.args.get("actions") or []:
+                nodes = action.expressions if isinstance(action, expressions.AddConstraint) else [action]
+                for node in nodes:
+                    self._add_definition(table, node)
+
+    def _add_definition(self, table: TableIndex, node: expressions.Expression) -> None:
+        if isinstance(node, expressions.Constraint):
+            for inner in node.expressions:
+                self._add_definition(table, inner)
+        elif isinstance(node, expressions.ColumnDef):
+            self._add_column(table, node)
+        elif isinstance(node, expressions.PrimaryKey):
+            columns = [_name(col) for col in node.expressions]
+            table.primary_key.update(col.lower() for col in columns)
+            table.has_pk = True
+            if len(columns) == 1:
+                table.unique.add(columns[0].lower())
+        elif isinstance(node, expressions.UniqueColumnConstraint):
+            schema = node.this
+            columns = [_name(col) for col in schema.expressions] if schema is not None else []
+            if len(columns) == 1:
+                table.unique.add(columns[0].lower())
+        elif isinstance(node, expressions.ForeignKey):
+            self._add_reference(table, [_name(col) for col in node.expressions], node.args.get("reference"))
+
+    def _add_column(self, table: TableIndex, col: expressions.ColumnDef) -> None:
+        name = col.name
+        table.columns.append(name)
+        # Узел DataType; в SQL превращается только для сообщения об ошибке
+        table.types[name.lower()] = col.args.get("kind")
+
+        for constraint in col.constraints:
+            kind = constraint.kind
+            if isinstance(kind, expressions.PrimaryKeyColumnConstraint):
+                table.primary_key.add(name.lower())
+                table.unique.add(name.lower())
+                table.has_pk = True
+            elif isinstance(kind, expressions.UniqueColumnConstraint):
+                table.unique.add(name.lower())
+            elif isinstance(kind, expressions.Reference):
+                self._add_reference(table, [name], kind)
+
+    def _add_reference(self, table: TableIndex, columns: List[str], reference) -> None:
+        if reference is None:
+            return
+        target = reference.this
+        if isinstance(target, expressions.Schema):
+            ref_table = target.this.name
+            ref_columns = [_name(col) for col in target.expressions]
+        else:
+            ref_table = target.name
+            ref_columns = []
+
+        for i, column in enumerate(columns):
+            ref_column = ref_columns[i] if i < len(ref_columns) else None
+            self.foreign_keys.append(ForeignKeyRef(table.name, column, ref_table, ref_column))
+
+
+def index_script(trees: Iterable[expressions.Expression]):
+    """
+    Один проход по инструкциям: индекс таблиц, список внешних ключей
+    и имена таблиц, которые меняет ALTER TABLE до (или без) CREATE TABLE
     """
-    AST-проверки на:
+    indexer = _Indexer()
+    for tree in trees:
+        if tree is not None:
+            indexer.add_statement(tree)
+    return indexer.tables, indexer.foreign_keys, list(indexer.missing.values())
+
+
+def index_statements(trees: Iterable[expressions.Expression]):
+    """Индекс таблиц и список внешних ключей (см. index_script)"""
+    tables, foreign_keys, _ = index_script(trees)
+    return tables, foreign_keys
+
+
+def index_schema(schema: Schema):
+    """Тот же индекс, построенный по промежуточной схеме конвертера"""
+    indexer = _Indexer()
+    for source in schema.tables:
+        table = indexer.table(source.name)
+        for col in source.columns:
+            table.columns.append(col.name)
+            table.types[col.name.lower()] = col.type
+            if col.primary_key:
+                table.primary_key.add(col.name.lower())
+                table.has_pk = True
+        if len(table.primary_key) == 1:
+            table.unique.update(table.primary_key)
+    for fk in schema.foreign_keys:
+        indexer.foreign_keys.append(ForeignKeyRef(fk.table, fk.column, fk.ref_table, fk.ref_column))
+    return indexer.tables, indexer.foreign_keys
+
+
+def check_table(table: TableIndex) -> List[str]:
+    """
+    Проверки одной таблицы:
       1) наличие PRIMARY KEY (inline или table-level),
       2) дубли имён столбцов,
       3) отсутствие столбцов (пустая таблица).
     """
     messages: List[str] = []
+    cols = table.columns
+    if not table.columns_known:
+        return messages
 
-    # Сначала собираем карту таблица → список её столбцов
-    table_columns = {}
-    for create in tree.find_all(expressions.Create):
-        # Получаем имя таблицы
-        tbl_node = create.this
-        table = getattr(tbl_node, "name", None) or getattr(tbl_node, "this", str(tbl_node))
-
-        # Сбор всех ColumnDef внутри этого CREATE
-        cols = []
-        for col in create.find_all(expressions.ColumnDef):
-            # Имя столбца может быть в col.this.name или col.this.this
-            name = getattr(col.this, "name", None) or getattr(col.this, "this", None)
-            if name:
-                cols.append(name)
-        table_columns[table] = cols
-
-    # Далее пробегаем каждую CREATE и выполняем проверки
-    for create in tree.find_all(expressions.Create):
-        tbl_node = create.this
-        table = getattr(tbl_node, "name", None) or getattr(tbl_node, "this", str(tbl_node))
-        cols = table_columns.get(table, [])
-
-        # 1) Проверка на PRIMARY KEY
-        has_pk = False
-        # — ищем любой узел PrimaryKey
-        for node in create.walk():
-            if isinstance(node, expressions.PrimaryKey):
-                has_pk = True
-                break
-        # — fallback: смотрим есть ли “PRIMARY KEY” в исходном SQL этого CREATE
-        if not has_pk:
-            raw_sql = create.sql(dialect="sqlite")  # или просто create.sql()
-            if "PRIMARY KEY" in raw_sql.upper():
-                has_pk = True
-
-        if not has_pk:
-            cols_str = ", ".join(cols)
-            messages.append(f"Таблица {table} ({cols_str}) без PRIMARY KEY")
-
-        # 2) Проверка на дубли имён столбцов
-        seen = set()
-        for name in cols:
-            if cols.count(name) > 1 and name not in seen:
-                messages.append(f"В таблице {table} дублируется имя столбца {name}")
-                seen.add(name)
-
-        # 3) Проверка на отсутствие столбцов
-        if not cols:
-            messages.append(f"Таблица {table} не содержит ни одного столбца")
+    # 1) Проверка на PRIMARY KEY
+    if not table.has_pk:
+        cols_str = ", ".join(cols)
+        messages.append(f"Таблица {table.name} ({cols_str}) без PRIMARY KEY")
 
+    # 2) Проверка на дубли имён столбцов
+    for name, count in Counter(cols).items():
+        if count > 1:
+            messages.append(f"В таблице {table.name} дублируется имя столбца {name}")
+
+    # 3) Проверка на отсутствие столбцов
+    if not cols:
+        messages.append(f"Таблица {table.name} не содержит ни одного столбца")
     return messages
+
+
+def foreign_key_problems(fk: ForeignKeyRef, tables: dict) -> List[Tuple[str, str]]:
+    """
+    4) Проверка внешнего ключа: существование таблицы и столбцов, совпадение
+    типов, ссылка на PRIMARY KEY или UNIQUE столбец. Возвращает пары
+    (вид, сообщение): fk_target — ссылка некуда, fk_type — несовпадение типов.
+    """
+    source = tables.get(fk.table.lower())
+    target = tables.get(fk.ref_table.lower())
+    fk_name = f"{fk.table}.{fk.column}"
+
+    if source is not None and source.columns_known and fk.column.lower() not in source.types:
+        return [("fk_target", f"Столбец внешнего ключа {fk_name} отсутствует в таблице {fk.table}")]
+    if target is None:
+        return [("fk_target", f"Внешний ключ {fk_name} ссылается на несуществующую таблицу {fk.ref_table}")]
+    if not target.columns_known:
+        return []
+
+    ref_column = fk.ref_column
+    if ref_column is None:
+        # REFERENCES t без столбцов — ссылка на первичный ключ t
+        if len(target.primary_key) != 1:
+            return [("fk_target", f"Внешний ключ {fk_name} ссылается на {fk.ref_table} без одиночного PRIMARY KEY")]
+        ref_column = next(iter(target.primary_key))
+
+    ref_name = f"{fk.ref_table}.{ref_column}"
+    if ref_column.lower() not in target.types:
+        return [("fk_target", f"Внешний ключ {fk_name} ссылается на несуществующий столбец {ref_name}")]
+
+    problems: List[Tuple[str, str]] = []
+    if ref_column.lower() not in target.unique:
+        problems.append(("fk_target", (
+            f"Внешний ключ {fk_name} ссылается на {ref_name}, "
+            f"который не является PRIMARY KEY или UNIQUE"
+        )))
+
+    if source is not None and source.columns_known:
+        fk_type = source.types.get(fk.column.lower())
+        ref_type = target.types.get(ref_column.lower())
+        fk_family, ref_family = _type_family(fk_type), _type_family(ref_type)
+        if fk_family and ref_family and fk_family != ref_family:
+            problems.append(("fk_type", (
+                f"Тип внешнего ключа {fk_name} ({_type_sql(fk_type)}) "
+                f"не совпадает с типом {ref_name} ({_type_sql(ref_type)})"
+            )))
+    return problems
+
+
+def check_foreign_key(fk: ForeignKeyRef, tables: dict) -> List[str]:
+    """Сообщения foreign_key_problems без вида проблемы"""
+    return [message for _, message in foreign_key_problems(fk, tables)]
+
+
+def missing_table_message(name: str) -> str:
+    return f"ALTER несуществующей таблицы {name}"
+
+
+def check_index(tables: dict, foreign_keys: List[ForeignKeyRef], missing: Iterable[str] = ()) -> List[str]:
+    """
+    Проверки по индексу, линейные по числу столбцов и связей: сначала ALTER
+    несозданных таблиц, затем каждая таблица (check_table) и внешние ключи
+    (check_foreign_key).
+    """
+    messages: List[str] = [missing_table_message(name) for name in missing]
+    for table in tables.values():
+        messages += check_table(table)
+    for fk in foreign_keys:
+        messages += check_foreign_key(fk, tables)
+    return messages
+
+
+def run_ast_checks(trees: Union[expressions.Expression, Iterable[expressions.Expression]]) -> List[str]:
+    """
+    AST-проверки скрипта. Принимает одно выражение или все инструкции скрипта:
+    внешние ключи проверяются только между таблицами из переданных инструкций.
+    """
+    if isinstance(trees, expressions.Expression):
+        trees = [trees]
+    return check_index(*index_script(trees))
+
+
+def run_schema_checks(schema: Schema) -> List[str]:
+    """
+    Те же проверки, что и run_ast_checks, но по промежуточной схеме
+    конвертера — без генерации и повторного разбора SQL.
+    """
+    return check_index(*index_schema(schema))
@@ -0,0 +1,78 @@
+# backend/app/validator/batching.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Собирает элементы от параллельных вызывающих и обрабатывает их пачками.
+
+    Фоновый поток ждёт первый элемент, затем добирает пачку до max_batch_size
+    или до истечения max_wait_ms и одним вызовом process_batch обрабатывает её.
+    Результаты раздаются обратно через concurrent.futures.Future, поэтому
+    ждать их можно и из потока, и из asyncio (asyncio.wrap_future).
+    """
+
+    def __init__(self, process_batch, max_batch_size: int = 8, max_wait_ms: float = 10):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item) -> Future:
+        # Поток запускается лениво, в том процессе, где им действительно пользуются
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+                    self._thread.start()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Отменённые по таймауту запросы не обрабатываем
+        return [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                results = self.process_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0,
+        }
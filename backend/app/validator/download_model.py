@@ -1,10 +1,8 @@
 # backend/app/validator/download_model.py
-from transformers import pipeline
-from .validator import SQLValidator
-from ..config import CODET5_MODEL
+from .validator import load_llm_pipeline
 
 def preload():
-    pipeline("text2text-generation", model=CODET5_MODEL, device=-1)
+    load_llm_pipeline()
 
 if __name__ == "__main__":
     preload()
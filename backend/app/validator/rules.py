@@ -0,0 +1,156 @@
+# backend/app/validator/rules.py
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..converters.emitter import strongly_connected
+from ..converters.model import Schema
+from .ast_checks import (
+    ForeignKeyRef,
+    check_table,
+    foreign_key_problems,
+    index_schema,
+    index_script,
+    missing_table_message,
+)
+
+# Имена в snake_case: строчные латинские буквы, цифры и подчёркивания
+_SNAKE_CASE = re.compile(r"[a-z_][a-z0-9_]*")
+# Самый короткий предел длины идентификатора среди целевых СУБД (PostgreSQL)
+MAX_IDENTIFIER_LENGTH = 63
+
+# Слова, зарезервированные в SQL:2016, PostgreSQL, MySQL или SQLite:
+# без кавычек такие имена ломают скрипт хотя бы в одной из СУБД
+RESERVED_WORDS = frozenset("""
+    add all alter and any as asc between by case cast check collate column constraint
+    create cross current_date current_time current_timestamp current_user database default
+    delete desc distinct drop else end except exists false fetch for foreign from full grant
+    group having in index inner insert intersect into is join key left like limit natural
+    not null offset on or order outer primary references right row rows select session_user
+    set table then to trigger true union unique update user using values when where window with
+""".split())
+
+# Правило → (серьёзность, функция). Функция получает индекс таблиц и внешних
+# ключей (см. ast_checks.index_script) и отдаёт пары (таблица, сообщение).
+# Ошибки (error) означают, что схема заведомо неверна: в режиме tiered CodeT5
+# для неё не запускается. Предупреждения (warning) — стиль и переносимость.
+Rule = Callable[[dict, List[ForeignKeyRef]], Iterator[Tuple[Optional[str], str]]]
+RULES: Dict[str, Tuple[str, Rule]] = {}
+
+
+def rule(name: str, severity: str):
+    def register(fn: Rule) -> Rule:
+        RULES[name] = (severity, fn)
+        return fn
+    return register
+
+
+def _known(tables: dict):
+    return (table for table in tables.values() if table.columns_known)
+
+
+@rule("table", "error")
+def _table_structure(tables, foreign_keys):
+    """PRIMARY KEY, дубли и отсутствие столбцов (см. ast_checks.check_table)"""
+    for table in tables.values():
+        for message in check_table(table):
+            yield table.name, message
+
+
+def _foreign_keys(kind: str) -> Rule:
+    def check(tables, foreign_keys):
+        for fk in foreign_keys:
+            for problem, message in foreign_key_problems(fk, tables):
+                if problem == kind:
+                    yield fk.table, message
+    return check
+
+
+rule("fk_target", "error")(_foreign_keys("fk_target"))
+rule("fk_type", "error")(_foreign_keys("fk_type"))
+
+
+@rule("naming", "warning")
+def _naming(tables, foreign_keys):
+    for table in _known(tables):
+        names = [(f"Имя таблицы {table.name}", table.name)]
+        names += [(f"Имя столбца {table.name}.{col}", col) for col in table.columns]
+        for label, name in names:
+            if not _SNAKE_CASE.fullmatch(name):
+                yield table.name, f"{label} не в snake_case"
+            if len(name) > MAX_IDENTIFIER_LENGTH:
+                yield table.name, f"{label} длиннее {MAX_IDENTIFIER_LENGTH} символов"
+
+
+@rule("reserved_word", "warning")
+def _reserved_words(tables, foreign_keys):
+    for table in _known(tables):
+        if table.name.lower() in RESERVED_WORDS:
+            yield table.name, f"Имя таблицы {table.name} — зарезервированное слово SQL"
+        for col in table.columns:
+            if col.lower() in RESERVED_WORDS:
+                yield table.name, f"Имя столбца {table.name}.{col} — зарезервированное слово SQL"
+
+
+@rule("orphan_table", "warning")
+def _orphan_tables(tables, foreign_keys):
+    """Таблица без связей в схеме, где остальные таблицы связаны"""
+    if not foreign_keys:
+        return
+    linked = {name.lower() for fk in foreign_keys for name in (fk.table, fk.ref_table)}
+    for key, table in tables.items():
+        if key not in linked:
+            yield table.name, f"Таблица {table.name} не связана внешними ключами ни с одной таблицей"
+
+
+@rule("fk_cycle", "warning")
+def _fk_cycles(tables, foreign_keys):
+    """
+    Циклы внешних ключей между разными таблицами: такие таблицы нельзя
+    создать по одной без отложенных ограничений (ссылка на себя — не цикл)
+    """
+    depends: Dict[str, set] = {key: set() for key in tables}
+    for fk in foreign_keys:
+        source, target = fk.table.lower(), fk.ref_table.lower()
+        if source != target and source in depends and target in depends:
+            depends[source].add(target)
+
+    members: Dict[str, List[str]] = {}
+    for key, root in strongly_connected(depends).items():
+        members.setdefault(root, []).append(key)
+    for cycle in members.values():
+        if len(cycle) > 1:
+            names = sorted(tables[key].name for key in cycle)
+            yield names[0], f"Циклические внешние ключи между таблицами {', '.join(names)}"
+
+
+def check_rules(tables: dict, foreign_keys: List[ForeignKeyRef], missing: Iterable[str] = (),
+                rules: Iterable[str] = None) -> List[dict]:
+    """
+    Прогоняет правила (по умолчанию все) по индексу; находки —
+    словари {"rule", "severity", "table", "message"} в порядке правил.
+    ALTER несозданной таблицы (missing, см. index_script) — ошибка правила table
+    """
+    findings = []
+    for name in rules or RULES:
+        severity, fn = RULES[name]
+        if name == "table":
+            for table in missing:
+                findings.append({"rule": name, "severity": severity, "table": table,
+                                 "message": missing_table_message(table)})
+        for table, message in fn(tables, foreign_keys):
+            findings.append({"rule": name, "severity": severity, "table": table, "message": message})
+    return findings
+
+
+def run_rules(trees) -> List[dict]:
+    """Правила по инструкциям скрипта (деревья sqlglot)"""
+    return check_rules(*index_script(trees))
+
+
+def run_schema_rules(schema: Schema) -> List[dict]:
+    """Правила по промежуточной схеме конвертера — без разбора SQL"""
+    return check_rules(*index_schema(schema))
+
+
+def has_errors(findings: List[dict]) -> bool:
+    return any(finding["severity"] == "error" for finding in findings)
@@ -0,0 +1,127 @@
+# backend/app/validator/script.py
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from sqlglot import expressions
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.errors import ParseError, TokenError
+from sqlglot.tokens import TokenType
+
+
+@dataclass(slots=True)
+class Statement:
+    """Одна инструкция скрипта с её положением в исходном тексте"""
+    index: int
+    text: str
+    start: int
+    end: int
+    line: int
+    tree: Optional[expressions.Expression] = None
+    error: Optional[str] = None
+
+
+class ParsedScript:
+    """
+    Скрипт, разобранный один раз на запрос.
+
+    Токенизация и разбор sqlglot выполняются единожды; этапы валидации берут
+    отсюда деревья (AST, LLM), тексты инструкций (SQLite) и их смещения
+    (блоки для SQLFluff и привязка ошибок к инструкциям). Инструкция, которую
+    sqlglot не смог разобрать, остаётся в списке с tree=None и текстом ошибки.
+    """
+
+    def __init__(self, sql: str, dialect: Optional[str] = None):
+        self.sql = sql
+        # Диалект sqlglot, которым разобран скрипт; None — общий
+        self.dialect = dialect
+        self.statements: List[Statement] = list(iter_statements(sql, dialect))
+        self._starts = [statement.start for statement in self.statements]
+        self._line_starts = None
+
+    def by_table(self) -> Dict[str, List[Statement]]:
+        """
+        Инструкции, сгруппированные по таблице (имя в нижнем регистре):
+        CREATE TABLE вместе с ALTER TABLE, CREATE INDEX и прочими инструкциями,
+        которые меняют эту таблицу. Инструкции без таблицы, в том числе
+        неразобранные, собираются под ключом "".
+        """
+        groups: Dict[str, List[Statement]] = {}
+        for statement in self.statements:
+            table = statement_table(statement.tree) if statement.tree is not None else None
+            groups.setdefault(table.lower() if table else "", []).append(statement)
+        return groups
+
+    @property
+    def trees(self) -> List[expressions.Expression]:
+        return [statement.tree for statement in self.statements if statement.tree is not None]
+
+    @property
+    def errors(self) -> List[Statement]:
+        return [statement for statement in self.statements if statement.error]
+
+    def statement_at(self, line: Optional[int], pos: Optional[int] = None) -> Optional[int]:
+        """Номер (с нуля) инструкции, в которую попадает позиция line:pos (обе с 1)"""
+        if not line or not self._starts:
+            return None
+        if self._line_starts is None:
+            self._line_starts = [0] + [i + 1 for i, char in enumerate(self.sql) if char == "\n"]
+        if line > len(self._line_starts):
+            return len(self._starts) - 1
+        offset = self._line_starts[line - 1] + max((pos or 1) - 1, 0)
+        return max(bisect_right(self._starts, offset) - 1, 0)
+
+
+def iter_statements(sql: str, dialect: Optional[str] = None) -> Iterator[Statement]:
+    """
+    Разбирает скрипт по одной инструкции: токенизация выполняется один раз,
+    деревья отдаются по мере разбора и не держатся генератором
+    """
+    dialect = Dialect.get_or_raise(dialect)
+    try:
+        tokens = dialect.tokenize(sql)
+    except TokenError as e:
+        if sql.strip():
+            yield Statement(0, sql, 0, len(sql), 1, error=str(e))
+        return
+
+    groups, current = [], []
+    for token in tokens:
+        if token.token_type == TokenType.SEMICOLON:
+            if current:
+                groups.append((current, token))
+            current = []
+        else:
+            current.append(token)
+    if current:
+        groups.append((current, None))
+
+    parser = dialect.parser()
+    line, offset = 1, 0
+    for index, (group, semicolon) in enumerate(groups):
+        start = group[0].start
+        end = (semicolon or group[-1]).end + 1
+        # Номер строки считаем нарастающим итогом, без повторного прохода от начала
+        line += sql.count("\n", offset, start)
+        offset = start
+
+        statement = Statement(index, sql[start:end], start, end, line)
+        try:
+            statement.tree = parser.parse(group, sql)[0]
+        except ParseError as e:
+            # В str(e) входит фрагмент исходника с ANSI-подсветкой, нужен только текст ошибки
+            statement.error = e.errors[0]["description"] if e.errors else str(e)
+        yield statement
+
+
+def statement_table(tree: expressions.Expression) -> Optional[str]:
+    """Имя таблицы, к которой относится инструкция, или None"""
+    if isinstance(tree, expressions.Create):
+        target = tree.this
+        if isinstance(target, expressions.Schema):
+            target = target.this
+        elif isinstance(target, expressions.Index):
+            target = target.args.get("table")
+    else:
+        target = tree.this if isinstance(tree.this, expressions.Table) else tree.find(expressions.Table)
+    return target.name if isinstance(target, expressions.Table) else None
@@ -0,0 +1,85 @@
+# backend/app/validator/sqlite_pool.py
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Set
+
+
+class SQLitePool:
+    """
+    Пул заранее открытых SQLite-in-memory баз.
+
+    Соединение выдаётся одному потоку за раз; после использования база
+    очищается (откат незавершённой транзакции, отключение ATTACH и DROP всех
+    созданных объектов). Настройки PRAGMA так не откатить, поэтому соединение,
+    на котором скрипт выполнил PRAGMA, закрывается и заменяется новым — как
+    и соединение, которое не удалось очистить.
+    """
+
+    def __init__(self, size: int = 4):
+        self.size = max(1, size)
+        self._free: queue.LifoQueue = queue.LifoQueue()
+        # id соединений, на которых с последней очистки выполнялась PRAGMA
+        self._pragma_used: Set[int] = set()
+        for _ in range(self.size):
+            self._free.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None — скрипт сам управляет транзакциями
+        conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        key = id(conn)
+
+        def authorize(action, *args):
+            # Вызывается при компиляции каждой инструкции, в том числе из executescript
+            if action == sqlite3.SQLITE_PRAGMA:
+                self._pragma_used.add(key)
+            return sqlite3.SQLITE_OK
+
+        conn.set_authorizer(authorize)
+        return conn
+
+    def _reset(self, conn: sqlite3.Connection) -> None:
+        if id(conn) in self._pragma_used:
+            raise sqlite3.Error("PRAGMA изменила настройки соединения")
+        if conn.in_transaction:
+            conn.rollback()
+
+        for _, name, _ in conn.execute("PRAGMA database_list").fetchall():
+            if name not in ("main", "temp"):
+                conn.execute(f'DETACH DATABASE "{name}"')
+
+        for schema in ("temp", "main"):
+            # Не LIKE 'sqlite_%': там «_» — любой символ, а сравнение без учёта
+            # регистра, и пользовательская таблица sqliteusers уцелела бы
+            objects = conn.execute(
+                f"SELECT type, name FROM {schema}.sqlite_master "
+                "WHERE substr(name, 1, 7) != 'sqlite_' AND type IN ('view', 'trigger', 'table')"
+            ).fetchall()
+            # Сначала представления и триггеры, затем таблицы (индексы удалятся вместе с ними)
+            for obj_type, name in sorted(objects, key=lambda o: o[0] == "table"):
+                quoted = name.replace('"', '""')
+                conn.execute(f'DROP {obj_type.upper()} IF EXISTS {schema}."{quoted}"')
+        # PRAGMA database_list самой очистки не в счёт
+        self._pragma_used.discard(id(conn))
+
+    @contextmanager
+    def connection(self):
+        """Выдаёт чистое соединение и возвращает его в пул после использования"""
+        conn = self._free.get()
+        try:
+            yield conn
+        finally:
+            try:
+                self._reset(conn)
+            except sqlite3.Error:
+                self._pragma_used.discard(id(conn))
+                conn.close()
+                conn = self._connect()
+            self._free.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._free.get_nowait().close()
+            except queue.Empty:
+                break
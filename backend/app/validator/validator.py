@@ -1,47 +1,171 @@
 # validator.py
 import sqlite3
-from sqlfluff.core import Linter
-from sqlglot import parse
-from transformers import pipeline
+import threading
+from collections import OrderedDict
+import sqlfluff
+import sqlglot
+from sqlglot.errors import SqlglotError
+from sqlfluff.core import FluffConfig, Linter
 import json
 
-from ..config import CODET5_MODEL
+from ..cache import MISS, ResultCache, content_digest
+from ..config import (
+    CACHE_DB_PATH,
+    CODET5_MODEL,
+    LLM_BATCH_MAX_WAIT_MS,
+    LLM_BATCH_SIZE,
+    LLM_CHUNK_BATCH_SIZE,
+    LLM_CHUNK_CACHE_SIZE,
+    LLM_ENABLED,
+    LLM_QUANTIZE,
+    PARSED_SCRIPT_CACHE_SIZE,
+    SQLITE_POOL_SIZE,
+)
+from .batching import MicroBatcher
 from .ast_checks import run_ast_checks
+from .rules import RULES, run_rules
+from .script import ParsedScript
+from .sqlite_pool import SQLitePool
+
+
+# Диалект SQLFluff и SQLite-проверки, если в запросе диалект не указан
+DEFAULT_LINT_DIALECT = "sqlite"
+
+# Версия формата отчётов этапов; меняется вместе с ним, чтобы сохранённые
+# в CACHE_DB_PATH результаты старого формата не отдавались из кэша
+REPORT_VERSION = 2
+
+# Few-shot prompt is built once; only the script is appended per request
+LLM_PROMPT = """
+            You are an expert SQL validator.  
+            Given an SQL DDL script, return a JSON array of short English error messages.
+            Each message should describe exactly one issue.
+
+            Example 1:
+            Input SQL:
+            CREATE TABLE users (id INT, name TEXT PRIMARY KEY);
+            Output JSON:
+            []
+
+            Example 2:
+            Input SQL:
+            CREATE TABLE customers (name TEXT);
+            ALTER TABLE customers ADD FOREIGN KEY (name) REFERENCES other(id);
+            Output JSON:
+            [
+            "Missing PRIMARY KEY in table customers",
+            "Foreign key column 'name' does not reference an existing primary key"
+            ]
+
+            Now analyze this SQL and output ONLY the JSON array:
+            """
+
+
+def load_llm_pipeline(model_name: str = CODET5_MODEL, quantize: bool = LLM_QUANTIZE):
+    """
+    Загружает CodeT5-пайплайн на CPU.
+
+    transformers импортируется здесь, а не на уровне модуля, чтобы конвертеры
+    и тесты не платили за импорт torch. При quantize=True линейные слои
+    динамически квантуются в int8.
+    """
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    if quantize:
+        import torch
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return pipeline("text2text-generation", model=model, tokenizer=tokenizer, device=-1)
+
 
 class SQLValidator:
     def __init__(self):
-        # SQLFluff для lint’а
-        self.linter = Linter(dialect="sqlite")
-        # CodeT5 для семантической проверки
-        self.llm = pipeline("text2text-generation", model=CODET5_MODEL)
-    
-    def lint(self, sql: str) -> list[dict]:
-        """
-        Линтуем SQL через временный .sql-файл, собираем реальные номера строк,
-        убираем дубли и формируем список словарей из to_dict().
-        """
-        import tempfile, os
-
-        # 1) Записать SQL в файл
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".sql", delete=False, encoding="utf-8"
-        ) as tmp:
-            tmp.write(sql)
-            tmp_path = tmp.name
-
-        try:
-            result = self.linter.lint_path(tmp_path)
-        finally:
-            os.remove(tmp_path)
+        # SQLFluff для lint’а: конфигурация и линтер создаются один раз на диалект
+        self._linters: dict[str, Linter] = {}
+        self._linters_lock = threading.Lock()
+        self.linter = self.linter_for(None)
+        # Пул SQLite-баз для динамической проверки
+        self.sqlite_pool = SQLitePool(SQLITE_POOL_SIZE)
+        # CodeT5 для семантической проверки загружается при первом обращении
+        self._llm = None
+        self._llm_lock = threading.Lock()
+        # Микропакеты запросов к CodeT5 от параллельных проверок
+        self.llm_batcher = None
+        if LLM_BATCH_SIZE > 1:
+            self.llm_batcher = MicroBatcher(self.llm_validate_many, LLM_BATCH_SIZE, LLM_BATCH_MAX_WAIT_MS)
+        # Отчёты CodeT5 по отдельным таблицам
+        self.chunk_cache = ResultCache(max_entries=LLM_CHUNK_CACHE_SIZE, db_path=CACHE_DB_PATH)
+        # Последние разобранные скрипты по хэшу текста
+        self._scripts: OrderedDict[str, ParsedScript] = OrderedDict()
+        self._scripts_lock = threading.Lock()
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = load_llm_pipeline()
+        return self._llm
+
+    def preload(self) -> None:
+        """
+        Загружает модель заранее. Вызывается до fork (gunicorn --preload,
+        пул процессов), чтобы рабочие процессы разделяли одну копию весов.
+        """
+        if LLM_ENABLED:
+            self.llm
+
+    def linter_for(self, dialect: str | None) -> Linter:
+        """Линтер SQLFluff для диалекта (None — DEFAULT_LINT_DIALECT)"""
+        dialect = dialect or DEFAULT_LINT_DIALECT
+        linter = self._linters.get(dialect)
+        if linter is None:
+            with self._linters_lock:
+                linter = self._linters.get(dialect)
+                if linter is None:
+                    linter = Linter(config=FluffConfig(overrides={"dialect": dialect}))
+                    self._linters[dialect] = linter
+        return linter
+
+    def stage_config(self, stage: str, dialect: str | None = None) -> dict:
+        """Параметры этапа, от которых зависит его результат (входят в ключ кэша)"""
+        if stage == "lint":
+            linter = self.linter_for(dialect)
+            return {
+                "sqlfluff": sqlfluff.__version__,
+                "dialect": linter.config.get("dialect"),
+                "rules": linter.config.get("rules"),
+                "exclude_rules": linter.config.get("exclude_rules"),
+                "report": REPORT_VERSION,
+            }
+        if stage == "sqlite":
+            return {"sqlite": sqlite3.sqlite_version, "dialect": dialect, "report": REPORT_VERSION}
+        if stage == "ast":
+            return {"sqlglot": sqlglot.__version__, "dialect": dialect, "report": REPORT_VERSION}
+        if stage == "rules":
+            return {"sqlglot": sqlglot.__version__, "dialect": dialect, "rules": sorted(RULES), "report": REPORT_VERSION}
+        if stage == "llm":
+            return {"model": CODET5_MODEL, "quantize": LLM_QUANTIZE, "enabled": LLM_ENABLED, "max_length": 512,
+                    "dialect": dialect}
+        raise ValueError(f"Неизвестный этап: {stage}")
+
+    def lint(self, sql: str, line_offset: int = 0, dialect: str | None = None) -> list[dict]:
+        """
+        Линтуем SQL прямо из строки, без временного файла, убираем дубли
+        и формируем список словарей. line_offset прибавляется к номерам строк,
+        когда линтуется блок, вырезанный из большого скрипта (см. lint_blocks).
+        """
+        result = self.linter_for(dialect).lint_string(sql)
 
         seen = set()
         issues = []
         for v in result.get_violations():
-            info = v.to_dict()
-            code = info.get("code") or info.get("rule_code") or ""
-            line = info.get("line_no") or info.get("line")
-            pos  = info.get("line_pos") or info.get("position")
-            desc = info.get("description") or ""
+            code = v.rule_code() or ""
+            line = v.line_no + line_offset if v.line_no else None
+            pos  = v.line_pos
+            desc = v.desc() or ""
 
             key = (code, line, pos, desc)
             if key in seen:
@@ -56,71 +180,234 @@ class SQLValidator:
             })
         return issues
 
-    def check_sqlite(self, sql: str) -> str | None:
-        """Проверяет в SQLite-in-memory; возвращает текст ошибки или None"""
-        conn = sqlite3.connect(":memory:")
-        try:
-            conn.executescript(sql)
-            return None
-        except sqlite3.DatabaseError as e:
-            return str(e)
-        finally:
-            conn.close()
-
-    def ast_analysis(self, sql: str) -> list[str]:
-        """Запускает AST-чеки через sqlglot"""
-        trees = parse(sql)
-        msgs: list[str] = []
-        for tree in trees:
-            msgs.extend(run_ast_checks(tree))
-        return msgs
+    def parse_script(self, sql: str, dialect: str | None = None) -> ParsedScript:
+        """
+        Разбирает скрипт один раз для всех этапов валидации. Результат
+        хранится по хэшу текста и диалекту, поэтому повторная проверка того же
+        скрипта не токенизирует его заново. Разобранный скрипт не изменяется этапами.
+        """
+        if PARSED_SCRIPT_CACHE_SIZE <= 0:
+            return ParsedScript(sql, dialect)
+
+        # Ключ — точный текст: смещения инструкций зависят от каждого символа
+        digest = f"{dialect or ''}:{content_digest(sql)}"
+        with self._scripts_lock:
+            script = self._scripts.get(digest)
+            if script is not None:
+                self._scripts.move_to_end(digest)
+                return script
+
+        script = ParsedScript(sql, dialect)
+        with self._scripts_lock:
+            self._scripts[digest] = script
+            while len(self._scripts) > PARSED_SCRIPT_CACHE_SIZE:
+                self._scripts.popitem(last=False)
+        return script
+
+    def lint_blocks(self, script: ParsedScript, parts: int, min_statements: int) -> list[tuple[str, int]]:
+        """
+        Делит скрипт на не более чем parts непрерывных блоков инструкций для
+        параллельного линтинга; возвращает пары (текст блока, смещение строк).
+
+        Границы берутся из смещений инструкций ParsedScript: блок начинается
+        с первой колонки строки, на которой стоит его первая инструкция, поэтому
+        позиции в нём совпадают с исходными. Инструкции, делящие строку с
+        предыдущей, в начало блока не попадают. Скрипты короче min_statements
+        инструкций не делятся.
+        """
+        sql = script.sql
+        cuts = []
+        for prev, statement in zip(script.statements, script.statements[1:]):
+            line_start = sql.rfind("\n", 0, statement.start) + 1
+            if line_start >= prev.end:
+                cuts.append(line_start)
+
+        statements = len(cuts) + 1
+        parts = min(parts, statements)
+        if parts <= 1 or statements < min_statements:
+            return [(sql, 0)]
+
+        step = statements / parts
+        bounds = [0] + [cuts[round(step * k) - 1] for k in range(1, parts)] + [len(sql)]
+        return [(sql[start:end], sql.count("\n", 0, start)) for start, end in zip(bounds, bounds[1:])]
+
+    def lint_many(self, texts: list[str], dialect: str | None = None) -> list[list[dict]]:
+        """Линтует несколько независимых фрагментов за один вызов в пуле"""
+        return [self.lint(text, 0, dialect) for text in texts]
+
+    def check_sqlite(self, script: ParsedScript) -> dict | None:
+        """
+        Выполняет скрипт в SQLite-in-memory по инструкциям; возвращает
+        {"error": текст, "statement": номер инструкции с 1} или None.
+
+        Инструкции склеиваются, пока sqlite3.complete_statement не признает
+        фрагмент законченным: так тело триггера с «;» внутри, которое sqlglot
+        делит на части, уходит в SQLite целиком.
+
+        Скрипт другого диалекта (postgres, mysql) перед выполнением
+        переводится sqlglot в SQLite по инструкциям, номера инструкций сохраняются.
+        """
+        if script.dialect not in (None, "sqlite"):
+            return self._check_transpiled(script)
+
+        with self.sqlite_pool.connection() as conn:
+            first = None
+            last = len(script.statements) - 1
+            for statement in script.statements:
+                first = first or statement
+                text = script.sql[first.start:statement.end]
+                if statement.index < last and not sqlite3.complete_statement(text):
+                    continue
+                try:
+                    conn.executescript(text)
+                except sqlite3.DatabaseError as e:
+                    return {"error": str(e), "statement": first.index + 1}
+                first = None
+        return None
+
+    def _check_transpiled(self, script: ParsedScript) -> dict | None:
+        with self.sqlite_pool.connection() as conn:
+            for statement in script.statements:
+                if statement.tree is None:
+                    # Неразобранную инструкцию перевести нельзя; о ней сообщит этап AST
+                    continue
+                try:
+                    conn.executescript(statement.tree.sql(dialect="sqlite") + ";")
+                except (sqlite3.DatabaseError, SqlglotError) as e:
+                    return {"error": str(e), "statement": statement.index + 1}
+        return None
+
+    def ast_analysis(self, script: ParsedScript) -> list[str]:
+        """Запускает AST-чеки через sqlglot по уже разобранным инструкциям"""
+        messages = [
+            f"Инструкция {statement.index + 1} (строка {statement.line}) не разобрана: {statement.error}"
+            for statement in script.errors
+        ]
+        return messages + run_ast_checks(script.trees)
+
+    def rule_analysis(self, script: ParsedScript) -> list[dict]:
+        """
+        Правила по уже разобранным инструкциям (см. rules.RULES);
+        неразобранная инструкция — ошибка правила parse
+        """
+        findings = [
+            {
+                "rule": "parse",
+                "severity": "error",
+                "table": None,
+                "message": f"Инструкция {statement.index + 1} (строка {statement.line}) не разобрана: {statement.error}",
+            }
+            for statement in script.errors
+        ]
+        return findings + run_rules(script.trees)
+
+    def llm_chunks(self, script: ParsedScript, tables: list[str] | None = None) -> list[str]:
+        """
+        Делит скрипт на фрагменты по таблицам для LLM-проверки
+        (см. ParsedScript.by_table); tables ограничивает список таблиц.
+        При выключенном LLM-этапе фрагменты не строятся.
+        """
+        if not LLM_ENABLED:
+            return []
+        groups = script.by_table()
+        if tables is not None:
+            groups = {table: groups[table] for table in tables}
+        return [llm_chunk(statements) for statements in groups.values()]
 
     def llm_validate(self, sql: str) -> list[str]:
         """
         Run a semantic check of the SQL script via CodeT5, asking for an
         English JSON array of error messages.
+        Returns an empty list when the LLM stage is disabled by config.
         """
-        prompt = """
-            You are an expert SQL validator.  
-            Given an SQL DDL script, return a JSON array of short English error messages.
-            Each message should describe exactly one issue.
+        script = self.parse_script(sql)
+        return self.llm_validate_chunks(self.llm_chunks(script), script.dialect)
 
-            Example 1:
-            Input SQL:
-            CREATE TABLE users (id INT, name TEXT PRIMARY KEY);
-            Output JSON:
-            []
+    def llm_validate_chunks(self, chunks: list[str], dialect: str | None = None) -> list[str]:
+        """
+        Check per-table chunks (see llm_chunks) so that large schemas fit
+        the context window. Chunks are built from the parsed script in the
+        caller's process; only their text crosses into pool workers.
+        """
+        return merge_reports(self.llm_chunk_reports(chunks, dialect))
 
-            Example 2:
-            Input SQL:
-            CREATE TABLE customers (name TEXT);
-            ALTER TABLE customers ADD FOREIGN KEY (name) REFERENCES other(id);
-            Output JSON:
-            [
-            "Missing PRIMARY KEY in table customers",
-            "Foreign key column 'name' does not reference an existing primary key"
-            ]
+    def llm_chunk_reports(self, chunks: list[str], dialect: str | None = None) -> list[list[str]]:
+        """
+        One report per chunk. Reports are cached by chunk hash and script
+        dialect, so editing one table only re-runs that table.
+        """
+        if not LLM_ENABLED or not chunks:
+            return [[] for _ in chunks]
 
-            Now analyze this SQL and output ONLY the JSON array:
-            """ + sql + "\n\nOutput JSON:\n"
-
-        # generate
-        out = self.llm(prompt, max_length=512, do_sample=False)
-        text = out[0]["generated_text"].strip()
-
-        # try to parse JSON
-        try:
-            arr = json.loads(text)
-            if isinstance(arr, list) and all(isinstance(e, str) for e in arr):
-                # dedupe and clean
-                seen = set(); result = []
-                for e in arr:
-                    e = e.strip()
-                    if e and e not in seen:
-                        seen.add(e); result.append(e)
-                return result
-        except json.JSONDecodeError:
-            pass
-
-        # fallback: return entire text as single message
-        return [text]
\ No newline at end of file
+        config = self.stage_config("llm", dialect)
+        keys = [ResultCache.key("llm_chunk", content_digest(chunk), config) for chunk in chunks]
+        reports = [self.chunk_cache.get("llm_chunk", key) for key in keys]
+        pending = [i for i, report in enumerate(reports) if report is MISS]
+
+        if self.llm_batcher is not None:
+            # Chunks join batches together with other concurrent requests
+            futures = {i: self.llm_batcher.submit(chunks[i]) for i in pending}
+            for i, future in futures.items():
+                reports[i] = future.result()
+        else:
+            for start in range(0, len(pending), LLM_CHUNK_BATCH_SIZE):
+                group = pending[start:start + LLM_CHUNK_BATCH_SIZE]
+                for i, report in zip(group, self.llm_validate_many([chunks[i] for i in group])):
+                    reports[i] = report
+
+        for i in pending:
+            self.chunk_cache.put("llm_chunk", keys[i], reports[i])
+        return reports
+
+    def llm_validate_many(self, sqls: list[str]) -> list[list[str]]:
+        """Checks several scripts with one batched generate call"""
+        if not LLM_ENABLED:
+            return [[] for _ in sqls]
+
+        prompts = [LLM_PROMPT + sql + "\n\nOutput JSON:\n" for sql in sqls]
+        outs = self.llm(prompts, max_length=512, do_sample=False, batch_size=len(prompts))
+
+        reports = []
+        for out in outs:
+            # for list input the pipeline returns either dicts or one-element lists
+            if isinstance(out, list):
+                out = out[0]
+            reports.append(_parse_llm_output(out["generated_text"].strip()))
+        return reports
+
+
+def llm_chunk(statements) -> str:
+    """Текст фрагмента для CodeT5: инструкции в каноническом виде sqlglot"""
+    return "\n".join(
+        statement.tree.sql() + ";" if statement.tree is not None else statement.text
+        for statement in statements
+    )
+
+
+def merge_reports(reports: list[list[str]]) -> list[str]:
+    # merge and dedupe chunk reports, keeping the original order
+    seen = set(); result = []
+    for report in reports:
+        for message in report:
+            if message not in seen:
+                seen.add(message); result.append(message)
+    return result
+
+
+def _parse_llm_output(text: str) -> list[str]:
+    # try to parse JSON
+    try:
+        arr = json.loads(text)
+        if isinstance(arr, list) and all(isinstance(e, str) for e in arr):
+            # dedupe and clean
+            seen = set(); result = []
+            for e in arr:
+                e = e.strip()
+                if e and e not in seen:
+                    seen.add(e); result.append(e)
+            return result
+    except json.JSONDecodeError:
+        pass
+
+    # fallback: return entire text as single message
+    return [text]
@@ -0,0 +1,52 @@
+# backend/benchmarks/compare.py
+"""
+Сравнение двух JSON-отчётов benchmarks.run:
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.15
+
+Код возврата 1, если хоть один замер стал медленнее больше чем на threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def _key(result: dict) -> tuple:
+    return result["name"], result.get("tables")
+
+
+def compare(baseline: dict, current: dict, metric: str, threshold: float) -> list:
+    """Строки (имя, размер, было, стало, отношение, регрессия) для общих замеров"""
+    before = {_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = before.get(_key(result))
+        if old is None or not old.get(metric):
+            continue
+        ratio = result[metric] / old[metric]
+        rows.append((result["name"], result.get("tables"), old[metric], result[metric], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="p50_ms")
+    parser.add_argument("--threshold", type=float, default=0.15, help="допустимое замедление, доля")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.metric, args.threshold)
+    for name, tables, old, new, ratio, regression in rows:
+        mark = "РЕГРЕССИЯ" if regression else ""
+        print(f"{name:<40} {tables or '':>6} {old:>10.3f} → {new:>10.3f} {args.metric}  x{ratio:.2f} {mark}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# backend/benchmarks/generators.py
+"""
+Генераторы синтетических диаграмм для бенчмарков.
+
+Все три формата строятся по одной случайной схеме (generate_schema), поэтому
+конвертеры получают сопоставимую нагрузку. Генерация детерминирована по seed.
+"""
+import base64
+import random
+import zlib
+from dataclasses import dataclass, field
+from typing import List, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+# Типы столбцов в записи каждого формата
+ERD_TYPES = ["INTEGER", "VARCHAR(255)", "TEXT", "DATE", "BOOLEAN", "NUMERIC(10,2)"]
+GRAPHML_TYPES = ["int", "str", "date", "bool"]
+DRAWIO_PAGE_HEADER = '<mxGraphModel><root>\n<mxCell id="0"/>\n<mxCell id="1" parent="0"/>\n'
+DRAWIO_TYPES = ["int", "string", "text", "date", "datetime", "bool", "float", "number"]
+
+
+@dataclass
+class SyntheticSchema:
+    """Таблицы (имя, столбцы) и связи (индекс источника, индекс цели)"""
+    tables: List[Tuple[str, List[str]]] = field(default_factory=list)
+    edges: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def generate_schema(tables: int, columns: int, fk_density: float, seed: int = 0) -> SyntheticSchema:
+    """
+    tables таблиц по columns столбцов (первый — id); fk_density — среднее
+    число внешних ключей на таблицу. Пары таблиц в связях не повторяются,
+    иначе в таблице появились бы одинаковые FK-столбцы.
+    """
+    rng = random.Random(seed)
+    schema = SyntheticSchema()
+    for i in range(tables):
+        schema.tables.append((f"table_{i:05d}", ["id"] + [f"col_{j}" for j in range(1, columns)]))
+
+    wanted = min(round(tables * fk_density), tables * (tables - 1))
+    seen = set()
+    while len(seen) < wanted:
+        source, target = rng.randrange(tables), rng.randrange(tables)
+        if source != target and (source, target) not in seen:
+            seen.add((source, target))
+            schema.edges.append((source, target))
+    return schema
+
+
+def _types(schema: SyntheticSchema, names: List[str], seed: int):
+    rng = random.Random(seed)
+    return [[rng.choice(names) for _ in columns] for _, columns in schema.tables]
+
+
+def to_erd(schema: SyntheticSchema, seed: int = 0) -> str:
+    parts = ['<?xml version="1.0"?>\n<er-diagram>\n']
+    for (name, columns), types in zip(schema.tables, _types(schema, ERD_TYPES, seed)):
+        parts.append(f'  <entity id="{name}" name="{name}">\n')
+        for k, (column, sql_type) in enumerate(zip(columns, types)):
+            primary = ' primary="true"' if k == 0 else ""
+            sql_type = "INTEGER" if k == 0 else sql_type
+            parts.append(f'    <attribute name="{column}" type="{sql_type}"{primary}/>\n')
+        parts.append("  </entity>\n")
+    for k, (source, target) in enumerate(schema.edges):
+        parts.append(
+            f'  <relation id="r{k}" type="fk" '
+            f'fk-ref="{schema.tables[source][0]}" pk-ref="{schema.tables[target][0]}"/>\n'
+        )
+    parts.append("</er-diagram>\n")
+    return "".join(parts)
+
+
+def to_graphml(schema: SyntheticSchema, seed: int = 0) -> str:
+    parts = [
+        '<?xml version="1.0"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+        'xmlns:y="http://www.yworks.com/xml/graphml">\n<graph>\n'
+    ]
+    for i, ((name, columns), types) in enumerate(zip(schema.tables, _types(schema, GRAPHML_TYPES, seed))):
+        attributes = "\n".join(
+            f"{column}: {'int' if k == 0 else sql_type}"
+            for k, (column, sql_type) in enumerate(zip(columns, types))
+        )
+        parts.append(
+            f'<node id="n{i}"><data><y:GenericNode>'
+            f'<y:NodeLabel configuration="com.yworks.entityRelationship.label.name">{name}</y:NodeLabel>'
+            f'<y:NodeLabel configuration="com.yworks.entityRelationship.label.attributes">'
+            f'{escape(attributes)}</y:NodeLabel>'
+            f'</y:GenericNode></data></node>\n'
+        )
+    for k, (source, target) in enumerate(schema.edges):
+        parts.append(f'<edge id="e{k}" source="n{source}" target="n{target}"/>\n')
+    parts.append("</graph>\n</graphml>\n")
+    return "".join(parts)
+
+
+def _drawio_table_cells(schema: SyntheticSchema, seed: int) -> List[str]:
+    cells = []
+    for i, ((name, columns), types) in enumerate(zip(schema.tables, _types(schema, DRAWIO_TYPES, seed))):
+        lines = [f"<b>{name}</b>"] + [
+            f"{column}: {'int' if k == 0 else sql_type}"
+            for k, (column, sql_type) in enumerate(zip(columns, types))
+        ]
+        value = quoteattr("<br>".join(lines))
+        cells.append(f'<mxCell id="t{i}" value={value} style="shape=table;" vertex="1" parent="1"/>\n')
+    return cells
+
+
+def _drawio_edge(k: int, source: int, target: int) -> str:
+    return f'<mxCell id="e{k}" edge="1" source="t{source}" target="t{target}" parent="1"/>\n'
+
+
+def to_drawio(schema: SyntheticSchema, seed: int = 0) -> str:
+    parts = ["<mxfile><diagram>" + DRAWIO_PAGE_HEADER]
+    parts += _drawio_table_cells(schema, seed)
+    parts += [_drawio_edge(k, source, target) for k, (source, target) in enumerate(schema.edges)]
+    parts.append("</root></mxGraphModel></diagram></mxfile>\n")
+    return "".join(parts)
+
+
+def to_drawio_pages(schema: SyntheticSchema, seed: int = 0, pages: int = 10) -> str:
+    """
+    Многостраничный draw.io в формате сохранения по умолчанию: каждая
+    страница сжата (URL-кодирование → raw deflate → base64). Таблицы
+    раскладываются по страницам по кругу; связь рисуется на странице
+    источника, куда при необходимости добавляется копия целевой таблицы
+    """
+    cells = _drawio_table_cells(schema, seed)
+    placed = [dict() for _ in range(pages)]
+    edges = [[] for _ in range(pages)]
+    for i, cell in enumerate(cells):
+        placed[i % pages][i] = cell
+    for k, (source, target) in enumerate(schema.edges):
+        page = source % pages
+        placed[page].setdefault(target, cells[target])
+        edges[page].append(_drawio_edge(k, source, target))
+
+    parts = ["<mxfile>"]
+    for page in range(pages):
+        xml = "".join([DRAWIO_PAGE_HEADER, *placed[page].values(), *edges[page], "</root></mxGraphModel>"])
+        deflate = zlib.compressobj(9, zlib.DEFLATED, -15)
+        payload = deflate.compress(quote(xml, safe="").encode("ascii")) + deflate.flush()
+        parts.append(f'<diagram id="page{page}" name="Page-{page + 1}">{base64.b64encode(payload).decode("ascii")}</diagram>')
+    parts.append("</mxfile>\n")
+    return "".join(parts)
+
+
+# Формат → (расширение файла, генератор)
+FORMATS = {
+    "erd": (".erd", to_erd),
+    "graphml": (".graphml", to_graphml),
+    "drawio": (".xml", to_drawio),
+}
+
+
+def generate(fmt: str, tables: int, columns: int, fk_density: float, seed: int = 0) -> Tuple[str, bytes]:
+    """Имя файла и содержимое синтетической диаграммы формата fmt"""
+    extension, writer = FORMATS[fmt]
+    text = writer(generate_schema(tables, columns, fk_density, seed), seed)
+    return f"synthetic_{tables}x{columns}{extension}", text.encode("utf-8")
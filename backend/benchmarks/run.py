@@ -0,0 +1,394 @@
+# backend/benchmarks/run.py
+"""
+Бенчмарки конвертеров, этапов SQLValidator, эндпоинтов и обратного
+преобразования (SQL → диаграмма → SQL).
+
+Запуск из каталога backend:
+
+    python -m benchmarks.run --tables 10,100,500 --columns 8 --fk-density 0.5 \
+        --repeat 20 --output bench.json
+
+Эндпоинты вызываются в том же процессе через ASGI TestClient. CodeT5 по
+умолчанию заменяется заглушкой (--llm stub), поэтому набор работает без сети
+и без весов модели. Кэши результатов отключаются, чтобы каждый повтор
+выполнял всю работу (--cache включает их обратно).
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from .generators import FORMATS, generate, generate_schema, to_drawio_pages
+
+
+def _configure_environment(args) -> None:
+    """Переменные окружения читаются app.config при импорте, поэтому задаются до него"""
+    if not args.cache:
+        os.environ["CACHE_MAX_ENTRIES"] = "0"
+        os.environ["LLM_CHUNK_CACHE_SIZE"] = "0"
+        os.environ["PARSED_SCRIPT_CACHE_SIZE"] = "0"
+    os.environ["LLM_ENABLED"] = "0" if args.llm == "off" else "1"
+    if args.llm == "stub":
+        # Заглушка ставится в родительском процессе и должна достаться воркерам пула
+        if "fork" in multiprocessing.get_all_start_methods():
+            os.environ["PROCESS_POOL_START_METHOD"] = "fork"
+        else:
+            os.environ["PROCESS_POOL_SIZE"] = "0"
+
+
+class StubPipeline:
+    """Заглушка text2text-пайплайна: пустой отчёт после задержки на каждый промпт"""
+
+    def __init__(self, delay_ms: float):
+        self.delay = delay_ms / 1000
+
+    def __call__(self, prompts, **kwargs):
+        time.sleep(self.delay * len(prompts))
+        return [{"generated_text": "[]"} for _ in prompts]
+
+
+def percentile(values, q: float) -> float:
+    """Перцентиль с линейной интерполяцией (q от 0 до 100)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS процесса и его завершённых потомков (Linux: ru_maxrss в КБ)"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / scale, 1)
+
+
+def measure(name: str, fn, repeat: int, warmup: int, items: int = 1, **labels) -> dict:
+    """
+    Время repeat вызовов fn после warmup прогревочных; items — единиц работы
+    на вызов. Если fn возвращает число, оно считается собственным замером
+    в секундах (например, время до первого байта ответа).
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        own = fn()
+        elapsed = time.perf_counter() - started
+        times.append(own if isinstance(own, float) else elapsed)
+
+    total = sum(times)
+    result = {
+        "name": name,
+        **labels,
+        "repeat": repeat,
+        "p50_ms": round(percentile(times, 50) * 1000, 3),
+        "p95_ms": round(percentile(times, 95) * 1000, 3),
+        "mean_ms": round(total / repeat * 1000, 3),
+        "min_ms": round(min(times) * 1000, 3),
+        "max_ms": round(max(times) * 1000, 3),
+        "throughput_per_s": round(items * repeat / total, 3) if total else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(
+        f"{name:<40} {labels.get('tables', ''):>6} "
+        f"p50 {result['p50_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms  "
+        f"{result['throughput_per_s'] or 0:>10.2f}/s  rss {result['peak_rss_mb']:>8.1f} MB",
+        flush=True,
+    )
+    return result
+
+
+def bench_converters(args, tables: int) -> list:
+    from app.converters import get_reader
+    from app.converters.emitter import convert
+
+    results = []
+    for fmt in FORMATS:
+        filename, data = generate(fmt, tables, args.columns, args.fk_density, args.seed)
+        reader = get_reader(filename)
+        for streaming in (False, True):
+            mode = "stream" if streaming else "tree"
+            results.append(measure(
+                f"convert.{fmt}.{mode}",
+                lambda: convert(reader, io.BytesIO(data), streaming),
+                args.repeat, args.warmup, items=tables,
+                group="converter", tables=tables, bytes=len(data),
+            ))
+
+    # Сжатые страницы draw.io (формат сохранения по умолчанию); при нескольких
+    # процессорах и больших файлах страницы разбираются параллельно
+    schema = generate_schema(tables, args.columns, args.fk_density, args.seed)
+    data = to_drawio_pages(schema, args.seed, min(args.drawio_pages, tables)).encode("utf-8")
+    reader = get_reader("pages.xml")
+    results.append(measure(
+        "convert.drawio_pages.tree",
+        lambda: convert(reader, io.BytesIO(data)),
+        args.repeat, args.warmup, items=tables,
+        group="converter", tables=tables, bytes=len(data),
+    ))
+    return results
+
+
+def bench_stages(args, tables: int, validator) -> list:
+    from app.converters import get_reader
+    from app.converters.emitter import convert
+    from app.validator.script import ParsedScript
+
+    filename, data = generate("erd", tables, args.columns, args.fk_density, args.seed)
+    _, statements = convert(get_reader(filename), io.BytesIO(data))
+    sql = "\n".join(statements) + "\n"
+    script = ParsedScript(sql)
+
+    stages = {
+        "parse": lambda: ParsedScript(sql),
+        "lint": lambda: validator.lint(sql),
+        "sqlite": lambda: validator.check_sqlite(script),
+        "ast": lambda: validator.ast_analysis(script),
+        "rules": lambda: validator.rule_analysis(script),
+        "llm": lambda: validator.llm_validate_chunks(validator.llm_chunks(script), script.dialect),
+    }
+    return [
+        measure(f"stage.{stage}", fn, args.repeat, args.warmup, items=1,
+                group="stage", tables=tables, statements=len(script.statements))
+        for stage, fn in stages.items()
+        if stage in args.stages
+    ]
+
+
+def bench_reverse(args, tables: int) -> list:
+    """
+    Обратное преобразование и полный круг SQL → диаграмма → SQL;
+    пропускная способность — таблиц в секунду
+    """
+    import sqlite3
+    import tempfile
+
+    from app.converters import convert, get_reader
+    from app.converters.emitter import emit_sql
+    from app.reverse import DIAGRAM_WRITERS, read_ddl, read_sqlite
+
+    filename, data = generate("erd", tables, args.columns, args.fk_density, args.seed)
+    schema, _ = convert(get_reader(filename), io.BytesIO(data))
+    # Диалект sqlite: все внешние ключи, в том числе из циклов, внутри CREATE TABLE,
+    # поэтому скрипт выполняется в SQLite при любых размерах и seed
+    sql = "\n".join(emit_sql(schema, "ordered", "sqlite")) + "\n"
+
+    results = [measure(
+        "reverse.read.ddl", lambda: read_ddl(sql), args.repeat, args.warmup, items=tables,
+        group="reverse", tables=tables, bytes=len(sql),
+    )]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "schema.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(sql)
+        conn.close()
+        restored = read_sqlite(path)
+        if (len(restored.tables), len(restored.foreign_keys)) != (len(schema.tables), len(schema.foreign_keys)):
+            raise RuntimeError(f"Схема из SQLite не совпадает с исходной ({tables} таблиц, seed {args.seed})")
+        results.append(measure(
+            "reverse.read.sqlite", lambda: read_sqlite(path), args.repeat, args.warmup, items=tables,
+            group="reverse", tables=tables, bytes=os.path.getsize(path),
+        ))
+
+    parsed = read_ddl(sql)
+    for fmt, (extension, writer) in DIAGRAM_WRITERS.items():
+        reader = get_reader("schema" + extension)
+        diagram = "".join(writer(parsed)).encode("utf-8")
+        results.append(measure(
+            f"reverse.write.{fmt}", lambda: sum(len(chunk) for chunk in writer(parsed)),
+            args.repeat, args.warmup, items=tables, group="reverse", tables=tables, bytes=len(diagram),
+        ))
+
+        def round_trip():
+            text = "".join(writer(read_ddl(sql))).encode("utf-8")
+            convert(reader, io.BytesIO(text))
+
+        results.append(measure(
+            f"roundtrip.{fmt}", round_trip, args.repeat, args.warmup, items=tables,
+            group="reverse", tables=tables,
+        ))
+    return results
+
+
+def time_to_first_byte(app, path: str, body: dict) -> float:
+    """
+    Время до первого непустого фрагмента тела ответа. TestClient собирает
+    ответ целиком, поэтому потоковый эндпоинт вызывается напрямую по ASGI;
+    ответ дочитывается до конца, чтобы этапы не копились между повторами.
+    """
+    payload = json.dumps(body).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "client": ("bench", 0), "server": ("bench", 80),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+    }
+
+    async def run() -> float:
+        finished = asyncio.Event()
+        first = None
+        started = time.perf_counter()
+
+        async def receive():
+            nonlocal payload
+            if payload is not None:
+                message, payload = {"type": "http.request", "body": payload, "more_body": False}, None
+                return message
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal first
+            if message["type"] == "http.response.body":
+                if first is None and message.get("body"):
+                    first = time.perf_counter() - started
+                if not message.get("more_body"):
+                    finished.set()
+
+        await app(scope, receive, send)
+        return first
+
+    return asyncio.run(run())
+
+
+def bench_endpoints(args, tables: int, client) -> list:
+    from app.converters import get_reader
+    from app.converters.emitter import convert
+
+    results = []
+    diagrams = {fmt: generate(fmt, tables, args.columns, args.fk_density, args.seed) for fmt in FORMATS}
+    for fmt, (filename, data) in diagrams.items():
+        results.append(measure(
+            f"endpoint.convert.{fmt}",
+            lambda: client.post("/convert", files={"file": (filename, data)}).raise_for_status(),
+            args.repeat, args.warmup, group="endpoint", tables=tables,
+        ))
+
+    filename, data = diagrams["erd"]
+    _, statements = convert(get_reader(filename), io.BytesIO(data))
+    body = {"sql": "\n".join(statements), "stages": args.stages_for_endpoint}
+    results.append(measure(
+        "endpoint.validate",
+        lambda: client.post("/validate", json=body).raise_for_status(),
+        args.repeat, args.warmup, group="endpoint", tables=tables,
+    ))
+
+    results.append(measure(
+        "endpoint.validate_stream.first_event",
+        lambda: time_to_first_byte(client.app, "/validate/stream", body),
+        args.repeat, args.warmup, group="endpoint", tables=tables,
+    ))
+    results.append(measure(
+        "endpoint.convert_and_validate",
+        lambda: client.post("/convert_and_validate", files={"file": (filename, data)}).raise_for_status(),
+        args.repeat, args.warmup, group="endpoint", tables=tables,
+    ))
+
+    batch = [
+        ("files", generate(fmt, tables, args.columns, args.fk_density, args.seed + k))
+        for k in range(args.batch_files) for fmt in FORMATS
+    ]
+    results.append(measure(
+        "endpoint.convert_batch",
+        lambda: client.post("/convert_batch", files=batch).raise_for_status(),
+        args.repeat, args.warmup, items=len(batch), group="endpoint", tables=tables,
+    ))
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки ER2SQL")
+    parser.add_argument("--tables", default="10,100", help="число таблиц, через запятую для нескольких размеров")
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--fk-density", type=float, default=0.5, help="среднее число внешних ключей на таблицу")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--suites", default="converters,stages,endpoints,reverse")
+    parser.add_argument("--stages", default="parse,lint,sqlite,ast,rules,llm")
+    parser.add_argument("--drawio-pages", type=int, default=50, help="страниц в сжатом многостраничном draw.io")
+    parser.add_argument("--batch-files", type=int, default=4, help="диаграмм каждого формата в /convert_batch")
+    parser.add_argument("--llm", choices=("stub", "off", "real"), default="stub")
+    parser.add_argument("--llm-delay-ms", type=float, default=0.0, help="задержка заглушки на один промпт")
+    parser.add_argument("--cache", action="store_true", help="не отключать кэши результатов")
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args(argv)
+    args.tables = [int(value) for value in args.tables.split(",") if value]
+    args.suites = set(args.suites.split(","))
+    args.stages = args.stages.split(",")
+    args.stages_for_endpoint = [stage for stage in args.stages if stage != "parse"]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    _configure_environment(args)
+
+    from fastapi.testclient import TestClient
+    from app.main import app, validator
+
+    if args.llm == "stub":
+        validator._llm = StubPipeline(args.llm_delay_ms)
+
+    results = []
+    with TestClient(app) as client:
+        for tables in args.tables:
+            if "converters" in args.suites:
+                results += bench_converters(args, tables)
+            if "stages" in args.suites:
+                results += bench_stages(args, tables, validator)
+            if "endpoints" in args.suites:
+                results += bench_endpoints(args, tables, client)
+            if "reverse" in args.suites:
+                results += bench_reverse(args, tables)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {
+                "tables": args.tables,
+                "columns": args.columns,
+                "fk_density": args.fk_density,
+                "repeat": args.repeat,
+                "seed": args.seed,
+                "llm": args.llm,
+                "llm_delay_ms": args.llm_delay_ms,
+                "cache": args.cache,
+            },
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+from sqlglot import parse
+from app.validator.ast_checks import run_ast_checks
+
+def test_ast_checks_primary_key_and_duplicates():
+    messages = run_ast_checks(parse("CREATE TABLE t (a INT, a INT);"))
+    assert messages == [
+        "Таблица t (a, a) без PRIMARY KEY",
+        "В таблице t дублируется имя столбца a",
+    ]
+
+def test_ast_checks_foreign_keys():
+    messages = run_ast_checks(parse("""
+        CREATE TABLE users (id INT PRIMARY KEY, email TEXT);
+        CREATE TABLE posts (id INT PRIMARY KEY, user_id TEXT, author TEXT);
+        ALTER TABLE posts ADD FOREIGN KEY (user_id) REFERENCES users(id);
+        ALTER TABLE posts ADD FOREIGN KEY (author) REFERENCES users(email);
+        ALTER TABLE posts ADD FOREIGN KEY (id) REFERENCES missing(id);
+    """))
+    assert messages == [
+        "Тип внешнего ключа posts.user_id (TEXT) не совпадает с типом users.id (INT)",
+        "Внешний ключ posts.author ссылается на users.email, который не является PRIMARY KEY или UNIQUE",
+        "Внешний ключ posts.id ссылается на несуществующую таблицу missing",
+    ]
+
+def test_ast_checks_alter_of_missing_table():
+    messages = run_ast_checks(parse("""
+        CREATE TABLE users (id INT PRIMARY KEY);
+        ALTER TABLE ghost ADD FOREIGN KEY (x) REFERENCES users(id);
+        ALTER TABLE ghost ADD COLUMN y INT;
+    """))
+    assert messages == ["ALTER несуществующей таблицы ghost"]
+
+def test_ast_checks_ignore_indexes():
+    assert run_ast_checks(parse("CREATE TABLE t (id INT PRIMARY KEY); CREATE INDEX i ON t (id);")) == []
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.validator.batching import MicroBatcher
+
+def test_micro_batcher_groups_concurrent_items():
+    sizes = []
+
+    def process(items):
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: batcher.submit(i).result(timeout=5), range(8)))
+
+    assert results == [i * 2 for i in range(8)]
+    assert max(sizes) <= 4
+    assert len(sizes) < 8
+
+def test_micro_batcher_propagates_errors():
+    def process(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=1)
+    future = batcher.submit("x")
+    try:
+        future.result(timeout=5)
+    except ValueError as e:
+        assert str(e) == "boom"
+    else:
+        raise AssertionError("ожидалась ошибка")
@@ -0,0 +1,23 @@
+import io
+
+import pytest
+from app.converters import get_reader
+from app.converters.emitter import convert
+from benchmarks.generators import FORMATS, generate
+from benchmarks.run import bench_reverse, parse_args
+
+@pytest.mark.parametrize("fmt", sorted(FORMATS))
+def test_generated_diagrams_convert_to_expected_schema(fmt):
+    filename, data = generate(fmt, tables=12, columns=5, fk_density=0.5, seed=3)
+    schema, sql = convert(get_reader(filename), io.BytesIO(data))
+    assert len(schema.tables) == 12
+    assert len(schema.foreign_keys) == 6
+    assert all(len(table.primary_key) == 1 for table in schema.tables)
+    assert len(sql) == 12 + 6
+
+@pytest.mark.parametrize("tables", [5, 40])
+def test_reverse_benchmark_runs_for_cyclic_schemas(tables):
+    # Эти размеры дают циклы внешних ключей при seed по умолчанию
+    args = parse_args(["--tables", str(tables), "--repeat", "1", "--warmup", "0"])
+    names = {result["name"] for result in bench_reverse(args, tables)}
+    assert {"reverse.read.ddl", "reverse.read.sqlite"} <= names
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.cache import MISS, ResultCache, content_digest, normalize_sql
+
+def test_cache_stores_none_and_counts_hits():
+    cache = ResultCache(max_entries=10, max_bytes=1024, db_path="")
+    key = ResultCache.key("sqlite", content_digest("SELECT 1;"), {})
+    assert cache.get("sqlite", key) is MISS
+    cache.put("sqlite", key, None)
+    assert cache.get("sqlite", key) is None
+    assert cache.stats()["stages"]["sqlite"] == {"hits": 1, "misses": 1}
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2, max_bytes=1024, db_path="")
+    cache.put("ast", "a", ["a"])
+    cache.put("ast", "b", ["b"])
+    cache.get("ast", "a")
+    cache.put("ast", "c", ["c"])
+    assert cache.get("ast", "b") is MISS
+    assert cache.get("ast", "a") == ["a"]
+
+def test_cache_key_depends_on_stage_config():
+    digest = content_digest(normalize_sql("CREATE TABLE t (id INT);\r\n"))
+    assert digest == content_digest("CREATE TABLE t (id INT);\n")
+    assert ResultCache.key("llm", digest, {"model": "a"}) != ResultCache.key("llm", digest, {"model": "b"})
+
+def test_cache_persists_to_disk(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResultCache(max_entries=10, max_bytes=1024, db_path=db_path)
+    cache.put("lint", "k", [{"code": "LT01"}])
+    cache.close()
+
+    reopened = ResultCache(max_entries=10, max_bytes=1024, db_path=db_path)
+    assert reopened.get("lint", "k") == [{"code": "LT01"}]
+    reopened.close()
+
+# Как executors._validator: кэш достаётся воркеру при fork, а не передаётся аргументом
+_inherited = None
+
+def _put_in_child():
+    _inherited.put("lint", "child", {"pid": os.getpid()})
+    return _inherited._conn is not None
+
+def test_cache_opens_own_connection_in_forked_worker(tmp_path):
+    global _inherited
+    db_path = str(tmp_path / "cache.db")
+    cache = ResultCache(max_entries=10, max_bytes=1024, db_path=db_path)
+    cache.put("lint", "parent", [])
+    parent_conn = cache._conn
+    _inherited = cache
+
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        assert pool.submit(_put_in_child).result()
+
+    # Соединение родителя не тронуто, запись воркера видна через файл
+    assert cache._conn is parent_conn
+    reopened = ResultCache(max_entries=10, max_bytes=1024, db_path=db_path)
+    assert reopened.get("lint", "child")["pid"] != os.getpid()
+    cache.close()
+    reopened.close()
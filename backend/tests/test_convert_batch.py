@@ -0,0 +1,51 @@
+import io
+import json
+import zipfile
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+GRAPHML = b"""<?xml version="1.0"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns" xmlns:y="http://www.yworks.com/xml/graphml">
+    <graph>
+        <node id="n1"><data><y:GenericNode>
+            <y:NodeLabel configuration="com.yworks.entityRelationship.label.name">User</y:NodeLabel>
+            <y:NodeLabel configuration="com.yworks.entityRelationship.label.attributes">id: int</y:NodeLabel>
+        </y:GenericNode></data></node>
+    </graph>
+</graphml>"""
+
+def test_convert_batch_streams_results_and_isolates_errors():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("inner/a.graphml", GRAPHML)
+        zf.writestr("notes.txt", b"-")
+
+    files = [
+        ("files", ("one.graphml", GRAPHML)),
+        ("files", ("broken.xml", b"<mxfile>")),
+        ("files", ("pack.zip", archive.getvalue())),
+    ]
+    with TestClient(app) as client:
+        response = client.post("/convert_batch", files=files)
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    summary = lines.pop()["summary"]
+    by_file = {line["file"]: line for line in lines}
+
+    assert set(by_file) == {"one.graphml", "broken.xml", "pack.zip/inner/a.graphml", "pack.zip/notes.txt"}
+    assert by_file["pack.zip/inner/a.graphml"]["tables"][0]["name"] == "User"
+    assert by_file["broken.xml"]["error"].startswith("Ошибка")
+    assert by_file["pack.zip/notes.txt"]["error"] == "Неподдерживаемый формат файла"
+    assert summary["files"] == 4 and summary["converted"] == 2 and summary["failed"] == 2
+
+def test_convert_renders_dialects_from_one_parsed_schema():
+    with TestClient(app) as client:
+        postgres = client.post("/convert", params={"dialect": "postgres"}, files={"file": ("d.graphml", GRAPHML)})
+        sqlite = client.post("/convert", params={"dialect": "sqlite"}, files={"file": ("d.graphml", GRAPHML)})
+
+    assert postgres.json()["tables"] == sqlite.json()["tables"]
+    # Второй запрос берёт разобранную схему из кэша и только рендерит SQL
+    assert "cached" in sqlite.headers["server-timing"]
+    assert sqlite.json()["sql"][0].startswith("CREATE TABLE User")
@@ -0,0 +1,101 @@
+import sqlite3
+
+from app.converters.emitter import emit_sql, plan_deploy
+from app.converters.model import Column, ForeignKey, Schema, Table
+from app.validator.ast_checks import run_schema_checks
+from app.validator.validator import SQLValidator
+
+def test_emitter_inlines_single_and_groups_composite_pk():
+    schema = Schema(
+        tables=[
+            Table("users", [Column("id", "INTEGER", True), Column("name", "TEXT")]),
+            Table("roles", [Column("user_id", "INTEGER", True), Column("role", "TEXT", True)]),
+        ],
+        foreign_keys=[ForeignKey("roles", "user_id", "users", "id")],
+    )
+    sql = emit_sql(schema)
+    assert "id INTEGER PRIMARY KEY" in sql[0]
+    assert "PRIMARY KEY (user_id, role)" in sql[1]
+    assert sql[2] == "ALTER TABLE roles ADD FOREIGN KEY (user_id) REFERENCES users(id);"
+
+def test_emitter_skips_tables_without_columns():
+    assert emit_sql(Schema(tables=[Table("empty")])) == []
+
+def _table(name):
+    return Table(name, [Column("id", "INTEGER", True), Column("ref_id", "INTEGER")])
+
+def test_ordered_mode_inlines_foreign_keys_in_dependency_order():
+    schema = Schema(
+        tables=[_table("orders"), _table("users"), _table("items")],
+        foreign_keys=[
+            ForeignKey("orders", "ref_id", "users", "id"),
+            ForeignKey("items", "ref_id", "orders", "id"),
+        ],
+    )
+    assert plan_deploy(schema).levels == [["users"], ["orders"], ["items"]]
+
+    sql = emit_sql(schema, "ordered")
+    assert [statement.split()[2] for statement in sql] == ["users", "orders", "items"]
+    assert "FOREIGN KEY (ref_id) REFERENCES users(id)" in sql[1]
+    # Без ALTER TABLE ... ADD FOREIGN KEY скрипт выполняется в SQLite
+    sqlite3.connect(":memory:").executescript("\n".join(sql))
+
+def test_ordered_mode_defers_one_edge_per_cycle():
+    schema = Schema(
+        tables=[_table("a"), _table("b"), _table("c")],
+        foreign_keys=[
+            ForeignKey("c", "ref_id", "a", "id"),
+            ForeignKey("a", "ref_id", "b", "id"),
+            ForeignKey("b", "ref_id", "a", "id"),
+        ],
+    )
+    plan = plan_deploy(schema)
+    assert plan.levels == [["a"], ["b", "c"]]
+    assert plan.deferred == [ForeignKey("a", "ref_id", "b", "id")]
+    assert emit_sql(schema, "ordered", "postgres")[-1] == (
+        "ALTER TABLE a ADD FOREIGN KEY (ref_id) REFERENCES b(id) DEFERRABLE INITIALLY DEFERRED;"
+    )
+
+def test_generic_ordered_cycle_passes_sqlite_check():
+    schema = Schema(
+        tables=[_table("a"), _table("b")],
+        foreign_keys=[ForeignKey("a", "ref_id", "b", "id"), ForeignKey("b", "ref_id", "a", "id")],
+    )
+    sql = emit_sql(schema, "ordered")
+    assert not any(statement.startswith("ALTER") for statement in sql)
+    validator = SQLValidator()
+    assert validator.check_sqlite(validator.parse_script("\n".join(sql))) is None
+
+def test_schema_checks_match_ast_messages():
+    schema = Schema(tables=[Table("t", [Column("a", "INT"), Column("a", "INT")])])
+    assert run_schema_checks(schema) == [
+        "Таблица t (a, a) без PRIMARY KEY",
+        "В таблице t дублируется имя столбца a",
+    ]
+
+def test_dialects_spell_types_and_foreign_keys():
+    schema = Schema(
+        tables=[
+            Table("users", [Column("id", "uuid", True), Column("meta", "json")]),
+            Table("posts", [Column("id", "INTEGER", True), Column("ref_id", "uuid")]),
+        ],
+        foreign_keys=[ForeignKey("posts", "ref_id", "users", "id")],
+    )
+    postgres = emit_sql(schema, dialect="postgres")
+    assert "meta JSONB" in postgres[0]
+    assert postgres[-1].startswith("ALTER TABLE posts")
+
+    mysql = emit_sql(schema, dialect="mysql")
+    assert "id CHAR(36) PRIMARY KEY" in mysql[0]
+
+    # SQLite не умеет ALTER TABLE ... ADD FOREIGN KEY: ключи всегда внутри CREATE TABLE
+    sqlite = emit_sql(schema, dialect="sqlite")
+    assert not any(statement.startswith("ALTER") for statement in sqlite)
+    sqlite3.connect(":memory:").executescript("\n".join(sqlite))
+
+def test_mysql_defers_cycle_edge_without_deferrable():
+    schema = Schema(
+        tables=[_table("a"), _table("b")],
+        foreign_keys=[ForeignKey("a", "ref_id", "b", "id"), ForeignKey("b", "ref_id", "a", "id")],
+    )
+    assert emit_sql(schema, "ordered", "mysql")[-1] == "ALTER TABLE a ADD FOREIGN KEY (ref_id) REFERENCES b(id);"
@@ -26,4 +26,37 @@ def test_erd_converter_contains_table_name(sample_erd_file):
 
 def test_erd_converter_handles_invalid_file():
     result = parse_erd("nonexistent.erd")
-    assert "Ошибка" in result[0]
\ No newline at end of file
+    assert "Ошибка" in result[0]
+
+def test_erd_converter_streaming_matches_tree(tmp_path):
+    data = """<?xml version="1.0"?>
+    <er-diagram>
+        <relation type="fk" fk-ref="2" pk-ref="1"/>
+        <entity id="1" name="User">
+            <attribute name="id" type="int" primary="true"/>
+            <attribute name="name" type="string"/>
+        </entity>
+        <entity id="2" name="Post">
+            <attribute name="id" type="int" primary="true"/>
+        </entity>
+    </er-diagram>"""
+    path = tmp_path / "rel.erd"
+    path.write_text(data)
+    result = parse_erd(str(path), streaming=True)
+    assert result == parse_erd(str(path))
+    assert "REFERENCES User(id)" in result[-1]
+
+def test_erd_converter_keeps_type_modifiers(tmp_path):
+    path = tmp_path / "types.erd"
+    path.write_text("""<?xml version="1.0"?>
+    <er-diagram>
+        <entity name="Item">
+            <attribute name="id" type="INT UNSIGNED" primary="true"/>
+            <attribute name="tags" type="text[]"/>
+            <attribute name="code" type="VARCHAR(20) NOT NULL"/>
+        </entity>
+    </er-diagram>""")
+    sql = parse_erd(str(path))[0]
+    assert "id INT UNSIGNED PRIMARY KEY" in sql
+    assert "tags text[]" in sql
+    assert "code VARCHAR(20) NOT NULL" in sql
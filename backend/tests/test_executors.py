@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app import executors
+from app.executors import STAGES, PoolSaturated, StagePool, ValidationExecutor
+from app.validator.script import ParsedScript
+from app.validator.validator import SQLValidator
+
+class _ThreadNames:
+    """Валидатор-заглушка: каждый этап возвращает имя потока, в котором выполнен"""
+    llm_batcher = None
+
+    def _where(self, *args):
+        return threading.current_thread().name
+
+    check_sqlite = ast_analysis = rule_analysis = llm_validate_chunks = _where
+
+    def lint(self, *args):
+        return [{"code": self._where(), "line": None, "pos": None}]
+
+    def lint_blocks(self, script, workers, min_statements):
+        return [(script.sql, 0)]
+
+    def llm_chunks(self, script):
+        return [script.sql]
+
+def _stage_threads(executor):
+    async def scenario():
+        script = ParsedScript("CREATE TABLE t (id INT PRIMARY KEY);")
+        results = {}
+        for stage in STAGES:
+            result = await executor.run(stage, script)
+            results[stage] = result[0]["code"] if stage == "lint" else result
+        return results
+
+    try:
+        return asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+def test_stages_run_in_their_pools(monkeypatch):
+    monkeypatch.setattr(executors, "_validator", executors._validator)
+    executor = ValidationExecutor(_ThreadNames(), process_workers=0, thread_workers=1)
+    # Процессный пул подменён потоками с узнаваемым именем: заглушка не пересекает границу процесса
+    executor.pools["process"] = StagePool(
+        "process", lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="process"), 1, 0,
+    )
+    prefixes = {"process": "process", "thread": "validator"}
+    for stage, name in _stage_threads(executor).items():
+        assert name.startswith(prefixes[STAGES[stage][0]]), stage
+    assert [stage for stage, (pool, _) in STAGES.items() if pool == "process"] == ["lint", "llm"]
+
+def test_process_stages_fall_back_to_threads_without_process_pool(monkeypatch):
+    monkeypatch.setattr(executors, "_validator", executors._validator)
+    executor = ValidationExecutor(_ThreadNames(), process_workers=0, thread_workers=1)
+    assert "process" not in executor.pools
+    assert all(name.startswith("validator") for name in _stage_threads(executor).values())
+
+def test_stage_pool_counts_cancelled_calls_until_job_finishes():
+    release = threading.Event()
+    pool = StagePool("thread", lambda n: ThreadPoolExecutor(max_workers=n), workers=1, max_queue=0)
+
+    async def scenario():
+        # Тайм-аут этапа отменяет ожидание, но не задачу, занявшую воркер
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.run(release.wait), 0.05)
+        assert pool.in_flight == 1
+        with pytest.raises(PoolSaturated):
+            await pool.run(release.wait)
+
+        release.set()
+        for _ in range(100):
+            if pool.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.in_flight == 0
+        return await pool.run(lambda: "ok")
+
+    try:
+        assert asyncio.run(scenario()) == "ok"
+        assert pool.rejected == 1
+    finally:
+        release.set()
+        pool.shutdown()
+
+LINT_SQL = """CREATE TABLE a (id INT PRIMARY KEY) ;
+CREATE TABLE b (id INT PRIMARY KEY);  CREATE TABLE c (id  INT);
+CREATE TABLE d (
+    id INT PRIMARY KEY,
+    name   TEXT
+);
+CREATE TABLE e (id INT PRIMARY KEY) ;
+"""
+
+def test_split_lint_maps_issues_to_script_lines(monkeypatch):
+    monkeypatch.setattr(executors, "_validator", executors._validator)
+    monkeypatch.setattr(executors, "LINT_SPLIT_MIN_STATEMENTS", 2)
+    validator = SQLValidator()
+    script = validator.parse_script(LINT_SQL)
+    # Инструкция c на одной строке с b в начало блока не попадает
+    blocks = validator.lint_blocks(script, 3, 2)
+    assert [offset for _, offset in blocks] == [0, 1, 6]
+    assert "".join(text for text, _ in blocks) == LINT_SQL
+
+    def lint(process_workers):
+        executor = ValidationExecutor(validator, process_workers=0, thread_workers=1)
+        if process_workers:
+            executor.pools["process"] = StagePool(
+                "process", lambda n: ThreadPoolExecutor(max_workers=n), process_workers, 0,
+            )
+        try:
+            return asyncio.run(executor.run("lint", script))
+        finally:
+            executor.shutdown()
+
+    def key(issue):
+        return issue["line"], issue["pos"], issue["code"]
+
+    split, whole = lint(3), lint(0)
+    assert split and sorted(split, key=key) == sorted(whole, key=key)
+    assert {(issue["line"], issue["statement"]) for issue in split} == {(1, 1), (2, 2), (2, 3), (5, 4), (7, 5)}
@@ -20,4 +20,26 @@ def test_graphml_converter_returns_list(sample_graphml_file):
 
 def test_graphml_converter_handles_empty_result():
     result = parse_graphml("nonexistent.graphml")
-    assert isinstance(result, list)
\ No newline at end of file
+    assert isinstance(result, list)
+
+def test_graphml_converter_streaming_matches_tree(tmp_path):
+    data = """<?xml version="1.0"?>
+    <graphml xmlns="http://graphml.graphdrawing.org/xmlns" xmlns:y="http://www.yworks.com/xml/graphml">
+        <graph>
+            <node id="n1"><data><y:GenericNode>
+                <y:NodeLabel configuration="com.yworks.entityRelationship.label.name">User</y:NodeLabel>
+                <y:NodeLabel configuration="com.yworks.entityRelationship.label.attributes">id: int
+name: string</y:NodeLabel>
+            </y:GenericNode></data></node>
+            <node id="n2"><data><y:GenericNode>
+                <y:NodeLabel configuration="com.yworks.entityRelationship.label.name">Post</y:NodeLabel>
+                <y:NodeLabel configuration="com.yworks.entityRelationship.label.attributes">id: int</y:NodeLabel>
+            </y:GenericNode></data></node>
+            <edge id="e1" source="n2" target="n1"/>
+        </graph>
+    </graphml>"""
+    path = tmp_path / "rel.graphml"
+    path.write_text(data)
+    result = parse_graphml(str(path), streaming=True)
+    assert result == parse_graphml(str(path))
+    assert "REFERENCES User(id)" in result[-1]
@@ -0,0 +1,39 @@
+from app.incremental import Submission, ast_unit_messages, map_lint_issues, plan_revalidation
+from app.validator.script import ParsedScript
+
+SQL = """CREATE TABLE users (id INT PRIMARY KEY);
+CREATE TABLE posts (id INT PRIMARY KEY, user_id INT REFERENCES users(id));
+CREATE TABLE tags (id INT PRIMARY KEY);
+"""
+
+def test_plan_recomputes_changed_tables_and_fk_neighbours():
+    first = plan_revalidation(ParsedScript(SQL), None)
+    assert first.recompute == {"users", "posts", "tags"}
+
+    previous = Submission(first.digests, {"ast": {table: [] for table in first.units}})
+    edited = ParsedScript(SQL.replace("users (id INT PRIMARY KEY)", "users (id INT PRIMARY KEY, name TEXT)"))
+    plan = plan_revalidation(edited, previous)
+    assert plan.recompute == {"users", "posts"}
+    assert plan.todo("ast") == ["users", "posts"]
+    assert list(plan.reused("ast")) == ["tags"]
+    # Этап, которого не было в прошлой отправке, считается заново для всех таблиц
+    assert plan.todo("lint") == ["users", "posts", "tags"]
+
+    removed = plan_revalidation(ParsedScript(SQL.replace("CREATE TABLE tags (id INT PRIMARY KEY);\n", "")), previous)
+    assert removed.removed == {"tags"} and removed.recompute == set()
+
+def test_ast_unit_messages_report_alter_of_missing_table():
+    script = ParsedScript(SQL + "ALTER TABLE ghost ADD COLUMN y INT;\n")
+    plan = plan_revalidation(script, None)
+    messages = ast_unit_messages(script, plan, sorted(plan.units))
+    assert messages["ghost"] == ["ALTER несуществующей таблицы ghost"]
+    assert messages["users"] == messages["posts"] == messages["tags"] == []
+
+def test_map_lint_issues_to_script_coordinates():
+    script = ParsedScript("CREATE TABLE a (id INT);  CREATE TABLE b (\n  x INT);\n")
+    statements = script.by_table()["b"]
+    issues = [{"code": "X", "line": 1, "pos": 3}, {"code": "Y", "line": 2, "pos": 2}]
+    assert map_lint_issues(script, statements, issues) == [
+        {"code": "X", "line": 1, "pos": 29, "statement": 2},
+        {"code": "Y", "line": 2, "pos": 2, "statement": 2},
+    ]
@@ -0,0 +1,96 @@
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.jobs import JobQueue
+
+
+def test_jobs_run_by_priority_and_survive_restart(tmp_path):
+    order = []
+
+    async def runner(job, progress):
+        order.append(job.request["n"])
+        progress({"event": "stage", "n": job.request["n"]})
+        await asyncio.sleep(0)
+        return {"n": job.request["n"]}
+
+    async def scenario():
+        queue = JobQueue(runner, str(tmp_path / "jobs.sqlite3"), workers=1)
+        await queue.start()
+        batch = queue.submit({"n": 1}, "batch")
+        cancelled = queue.submit({"n": 2}, "batch")
+        interactive = queue.submit({"n": 3}, "interactive")
+        queue.cancel(cancelled.id)
+        done = await queue.wait(batch.id, timeout=5)
+        await queue.stop()
+
+        restarted = JobQueue(runner, str(tmp_path / "jobs.sqlite3"))
+        await restarted.start()
+        restored = restarted.get(interactive.id)
+        await restarted.stop()
+        return done, restored, restarted.get(cancelled.id)
+
+    done, restored, cancelled = asyncio.run(scenario())
+    # Интерактивная задача обгоняет пакетные, отменённая не выполняется
+    assert order == [3, 1]
+    assert done.status == "done" and done.result == {"n": 1}
+    assert restored.status == "done" and restored.events == [{"event": "stage", "n": 3}]
+    assert cancelled.status == "cancelled"
+
+
+def test_progress_appends_events_without_rewriting_the_job(tmp_path, monkeypatch):
+    async def runner(job, progress):
+        for n in range(50):
+            progress({"event": "stage", "n": n})
+        return {}
+
+    async def scenario():
+        queue = JobQueue(runner, str(tmp_path / "jobs.sqlite3"), workers=1)
+        await queue.start()
+        statements = []
+        queue._db.set_trace_callback(statements.append)
+        job = queue.submit({})
+        await queue.wait(job.id, timeout=5)
+        await asyncio.sleep(0.05)
+        notifying = len(queue._notifying)
+        await queue.stop()
+
+        restarted = JobQueue(runner, str(tmp_path / "jobs.sqlite3"))
+        await restarted.start()
+        await restarted.stop()
+        return statements, notifying, restarted.get(job.id)
+
+    statements, notifying, restored = asyncio.run(scenario())
+    # Строка задачи пишется при смене состояния (queued, running, done), события — по одной
+    assert sum(sql.startswith("INSERT OR REPLACE INTO jobs") for sql in statements) == 3
+    assert sum(sql.startswith("INSERT INTO job_events") for sql in statements) == 50
+    assert notifying == 0
+    assert restored.events == [{"event": "stage", "n": n} for n in range(50)]
+
+    # Без JOBS_DB_PATH очередь не создаёт файлов в рабочем каталоге
+    monkeypatch.chdir(tmp_path)
+    before = set(os.listdir())
+    queue = JobQueue(runner)
+
+    async def in_memory():
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(in_memory())
+    assert queue.db_path == "" and set(os.listdir()) == before
+
+
+def test_job_endpoints_long_poll_until_done(tmp_path, monkeypatch):
+    monkeypatch.setattr(main.jobs, "db_path", str(tmp_path / "jobs.sqlite3"))
+    with TestClient(main.app) as client:
+        created = client.post("/jobs", json={"sql": "CREATE TABLE t (id INTEGER PRIMARY KEY);", "stages": ["sqlite"]})
+        assert created.status_code == 202
+        job = client.get(f"/jobs/{created.json()['id']}", params={"wait": 10}).json()
+        missing = client.get("/jobs/unknown")
+
+    assert job["status"] == "done"
+    assert job["result"]["sqlite_error"] is None
+    assert [event["stage"] for event in job["events"]] == ["sqlite"]
+    assert missing.status_code == 404
@@ -0,0 +1,106 @@
+import sys
+import types
+
+from app.validator import validator as validator_module
+from app.validator.validator import SQLValidator, load_llm_pipeline
+
+class _FakePipeline:
+    """CodeT5-пайплайн без модели: на каждый промпт — пустой JSON-массив"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def __call__(self, prompts, **kwargs):
+        self.prompts += prompts
+        return [{"generated_text": "[]"} for _ in prompts]
+
+def _count_loads(monkeypatch):
+    loads = []
+
+    def load():
+        loads.append(_FakePipeline())
+        return loads[-1]
+
+    monkeypatch.setattr(validator_module, "load_llm_pipeline", load)
+    return loads
+
+def test_llm_pipeline_loads_lazily_once(monkeypatch):
+    loads = _count_loads(monkeypatch)
+    validator = SQLValidator()
+    assert loads == []
+
+    assert validator.llm_validate("CREATE TABLE t (id INT PRIMARY KEY);") == []
+    assert validator.llm_validate("CREATE TABLE u (id INT PRIMARY KEY);") == []
+    assert len(loads) == 1 and len(loads[0].prompts) == 2
+
+def test_disabled_llm_never_loads_the_model(monkeypatch):
+    loads = _count_loads(monkeypatch)
+    monkeypatch.setattr(validator_module, "LLM_ENABLED", False)
+    validator = SQLValidator()
+
+    validator.preload()
+    assert validator.llm_validate("CREATE TABLE t (id INT PRIMARY KEY);") == []
+    assert validator.llm_validate_many(["SELECT 1;", "SELECT 2;"]) == [[], []]
+    assert loads == []
+
+def test_quantized_loading_wraps_linear_layers(monkeypatch):
+    calls = []
+    model = types.SimpleNamespace(eval=lambda: calls.append("eval"))
+    quantized = types.SimpleNamespace(eval=lambda: calls.append("eval quantized"))
+
+    def quantize_dynamic(target, layers, dtype):
+        calls.append(("quantize", target is model, layers, dtype))
+        return quantized
+
+    def pipeline(task, model, tokenizer, device):
+        calls.append(("pipeline", model is quantized, device))
+        return "pipeline"
+
+    transformers = types.SimpleNamespace(
+        AutoTokenizer=types.SimpleNamespace(from_pretrained=lambda name: "tokenizer"),
+        AutoModelForSeq2SeqLM=types.SimpleNamespace(from_pretrained=lambda name: model),
+        pipeline=pipeline,
+    )
+    torch = types.SimpleNamespace(
+        nn=types.SimpleNamespace(Linear="Linear"),
+        qint8="qint8",
+        ao=types.SimpleNamespace(quantization=types.SimpleNamespace(quantize_dynamic=quantize_dynamic)),
+    )
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    monkeypatch.setitem(sys.modules, "torch", torch)
+
+    assert load_llm_pipeline("stub", quantize=True) == "pipeline"
+    assert calls == [("quantize", True, {"Linear"}, "qint8"), "eval quantized", ("pipeline", True, -1)]
+
+    calls.clear()
+    load_llm_pipeline("stub", quantize=False)
+    assert calls == ["eval", ("pipeline", False, -1)]
+
+CHUNKED_SQL = """CREATE TABLE users (id INT PRIMARY KEY);
+CREATE TABLE posts (id INT PRIMARY KEY, user_id INT);
+ALTER TABLE posts ADD FOREIGN KEY (user_id) REFERENCES users (id);
+"""
+
+def test_llm_chunks_group_statements_by_table():
+    validator = SQLValidator()
+    chunks = validator.llm_chunks(validator.parse_script(CHUNKED_SQL))
+    assert chunks == [
+        "CREATE TABLE users (id INT PRIMARY KEY);",
+        "CREATE TABLE posts (id INT PRIMARY KEY, user_id INT);\n"
+        "ALTER TABLE posts ADD FOREIGN KEY (user_id) REFERENCES users (id);",
+    ]
+    assert validator.llm_chunks(validator.parse_script(CHUNKED_SQL), ["posts"]) == chunks[1:]
+
+def test_llm_chunk_reports_reuse_cached_chunks(monkeypatch):
+    loads = _count_loads(monkeypatch)
+    validator = SQLValidator()
+    chunks = validator.llm_chunks(validator.parse_script(CHUNKED_SQL))
+    assert validator.llm_chunk_reports(chunks) == [[], []]
+
+    # Изменилась одна таблица — в модель уходит только её фрагмент
+    edited = validator.llm_chunks(validator.parse_script(CHUNKED_SQL.replace("users (id INT", "users (id BIGINT")))
+    assert validator.llm_chunk_reports(edited) == [[], []]
+    assert len(loads[0].prompts) == 3 and edited[0] in loads[0].prompts[2]
+
+    validator.llm_chunk_reports(chunks)
+    assert len(loads[0].prompts) == 3
@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.profiling import ProfilingMiddleware
+
+def test_validate_reports_server_timing_and_metrics():
+    sql = "CREATE TABLE metrics_t (id INTEGER PRIMARY KEY);\n"
+    with TestClient(app) as client:
+        response = client.post("/validate", json={"sql": sql, "stages": ["sqlite", "ast"]})
+        metrics = client.get("/metrics")
+
+    timing = response.headers["server-timing"]
+    for name in ("sqlite", "ast", "total"):
+        assert f"{name};dur=" in timing
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'er2sql_stage_duration_seconds_bucket{stage="sqlite",outcome="ok",le="+Inf"}' in metrics.text
+    assert "er2sql_pool_workers" in metrics.text
+
+def test_profiling_middleware_writes_dump(tmp_path):
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = ProfilingMiddleware(endpoint, enabled=True, directory=str(tmp_path))
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "path": "/validate", "headers": [(b"x-profile", b"cprofile")]}
+    asyncio.run(middleware(scope, receive, send))
+
+    headers = dict(sent[0]["headers"])
+    dump = headers[b"x-profile-dump"].decode()
+    assert dump.endswith("-validate.prof")
+    assert os.path.exists(tmp_path / dump)
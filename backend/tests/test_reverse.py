@@ -0,0 +1,67 @@
+import io
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.converters import convert, get_reader
+from app.converters.model import Column, Schema, Table
+from app.main import app
+from app.reverse import DIAGRAM_WRITERS, read_ddl, read_sqlite
+
+DDL = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(100));
+CREATE TABLE posts (id INTEGER PRIMARY KEY, body TEXT, users_id INTEGER);
+ALTER TABLE posts ADD FOREIGN KEY (users_id) REFERENCES users(id);
+"""
+
+@pytest.mark.parametrize("fmt", list(DIAGRAM_WRITERS))
+def test_ddl_round_trips_through_every_diagram_format(fmt):
+    extension, writer = DIAGRAM_WRITERS[fmt]
+    diagram = "".join(writer(read_ddl(DDL))).encode("utf-8")
+
+    schema, sql = convert(get_reader("schema" + extension), io.BytesIO(diagram))
+    assert [table.name for table in schema.tables] == ["users", "posts"]
+    assert [col.name for col in schema.tables[1].columns] == ["id", "body", "users_id"]
+    assert sql[-1] == "ALTER TABLE posts ADD FOREIGN KEY (users_id) REFERENCES users(id);"
+
+def test_drawio_writer_keeps_composite_keys_and_escapes_labels():
+    schema = Schema(tables=[Table("a<b>", [
+        Column("order_id", "INTEGER", True),
+        Column("line", "INTEGER", True),
+        Column("note", "TEXT"),
+    ])])
+    _, writer = DIAGRAM_WRITERS["drawio"]
+    diagram = "".join(writer(schema))
+
+    read, _ = convert(get_reader("schema.drawio"), io.BytesIO(diagram.encode("utf-8")))
+    table = read.tables[0]
+    assert table.name == "a<b>"
+    assert table.primary_key == ["order_id", "line"]
+
+def test_read_sqlite_uses_pragmas(tmp_path):
+    path = tmp_path / "app.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY);
+        CREATE TABLE posts (id INTEGER PRIMARY KEY, author INTEGER REFERENCES users);
+        CREATE TABLE sqliteusers (id INTEGER PRIMARY KEY AUTOINCREMENT);
+    """)
+    conn.close()
+
+    with open(path, "rb") as f:
+        schema = read_sqlite(f)
+    # sqlite_sequence (из-за AUTOINCREMENT) служебная, sqliteusers — нет
+    assert [table.name for table in schema.tables] == ["users", "posts", "sqliteusers"]
+    fk = schema.foreign_keys[0]
+    assert (fk.table, fk.column, fk.ref_table, fk.ref_column) == ("posts", "author", "users", "id")
+
+def test_reverse_endpoint_streams_diagram():
+    with TestClient(app) as client:
+        response = client.post("/reverse", params={"format": "erd"}, files={"file": ("dump.sql", DDL)})
+        empty = client.post("/reverse", files={"file": ("empty.sql", "SELECT 1;")})
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="dump.erd"'
+    assert '<relation id="r0" type="fk" fk-ref="posts" pk-ref="users"/>' in response.text
+    assert empty.status_code == 400
@@ -0,0 +1,69 @@
+from fastapi.testclient import TestClient
+
+from app.main import app, validator
+from app.validator.rules import has_errors, run_rules
+from app.validator.script import ParsedScript
+
+
+def _findings(sql):
+    return {(finding["rule"], finding["table"]) for finding in run_rules(ParsedScript(sql).trees)}
+
+
+def test_rules_cover_structure_naming_and_cycles():
+    findings = _findings("""
+        CREATE TABLE Users (id INT PRIMARY KEY, "order" TEXT, team_id TEXT REFERENCES team(id));
+        CREATE TABLE team (id INT PRIMARY KEY, owner_id INT REFERENCES Users(id));
+        CREATE TABLE lonely (id INT);
+        CREATE TABLE post (id INT PRIMARY KEY, author_id INT REFERENCES ghost(id));
+    """)
+    assert findings == {
+        ("table", "lonely"),
+        ("fk_target", "post"),
+        ("fk_type", "Users"),
+        ("naming", "Users"),
+        ("reserved_word", "Users"),
+        ("orphan_table", "lonely"),
+        ("fk_cycle", "Users"),
+    }
+
+
+def test_alter_of_missing_table_is_single_error():
+    sql = """
+        CREATE TABLE users (id INT PRIMARY KEY);
+        ALTER TABLE ghost ADD FOREIGN KEY (x) REFERENCES users(id);
+    """
+    findings = run_rules(ParsedScript(sql).trees)
+    assert findings == [{
+        "rule": "table", "severity": "error", "table": "ghost",
+        "message": "ALTER несуществующей таблицы ghost",
+    }]
+
+
+def test_self_reference_is_not_a_cycle():
+    sql = "CREATE TABLE node (id INT PRIMARY KEY, parent_id INT REFERENCES node(id));"
+    findings = run_rules(ParsedScript(sql).trees)
+    assert findings == [] and not has_errors(findings)
+
+
+def test_tiered_mode_skips_llm_when_rules_fail():
+    with TestClient(app) as client:
+        report = client.post("/validate", json={"sql": "CREATE TABLE t (x INT);", "stages": ["rules", "llm"]}).json()
+
+    assert report["llm_skipped"] is True
+    assert report["rule_findings"][0]["rule"] == "table"
+
+
+def test_tiered_mode_reuses_rules_stage(monkeypatch):
+    calls = []
+    original = validator.rule_analysis
+    monkeypatch.setattr(validator, "rule_analysis", lambda script: calls.append(script) or original(script))
+    sql = "CREATE TABLE tiered_once (x INT);"
+    with TestClient(app) as client:
+        report = client.post("/validate", json={"sql": sql, "stages": ["rules", "llm"]}).json()
+
+    assert report["llm_skipped"] is True
+    assert len(calls) == 1
+
+
+def test_llm_cache_key_depends_on_dialect():
+    assert validator.stage_config("llm", "postgres") != validator.stage_config("llm", "mysql")
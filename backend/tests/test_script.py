@@ -0,0 +1,30 @@
+from app.validator.script import ParsedScript
+from app.validator.validator import SQLValidator
+
+SQL = """CREATE TABLE a (id INT PRIMARY KEY);
+-- комментарий
+CREATE TABLE b (id INT PRIMARY KEY); CREATE TABLE c (;
+INSERT INTO missing VALUES (1);
+"""
+
+def test_parsed_script_offsets_and_errors():
+    script = ParsedScript(SQL)
+    assert [s.line for s in script.statements] == [1, 3, 3, 4]
+    assert [SQL[s.start:s.end] for s in script.statements] == [s.text for s in script.statements]
+    assert len(script.trees) == 3
+    assert [s.index for s in script.errors] == [2]
+    # Две инструкции на одной строке различаются по позиции
+    assert script.statement_at(3, 1) == 1
+    assert script.statement_at(3, 40) == 2
+
+def test_stages_attribute_errors_to_statements():
+    validator = SQLValidator()
+    script = validator.parse_script(SQL)
+    assert validator.parse_script(SQL) is script
+    assert validator.ast_analysis(script) == ["Инструкция 3 (строка 3) не разобрана: Expecting )"]
+    assert validator.check_sqlite(script)["statement"] == 3
+    assert validator.check_sqlite(validator.parse_script(
+        "CREATE TABLE t (id INT);\n"
+        "CREATE TRIGGER tr AFTER INSERT ON t BEGIN\n  DELETE FROM t;\n  DELETE FROM t;\nEND;\n"
+        "INSERT INTO nope VALUES (1);"
+    )) == {"error": "no such table: nope", "statement": 5}
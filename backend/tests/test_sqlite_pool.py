@@ -0,0 +1,46 @@
+import pytest
+from app.validator.sqlite_pool import SQLitePool
+
+@pytest.fixture
+def pool():
+    p = SQLitePool(size=1)
+    yield p
+    p.close()
+
+def test_sqlite_pool_resets_between_uses(pool):
+    with pool.connection() as conn:
+        conn.executescript("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY);
+            CREATE INDEX idx_users ON users (id);
+            CREATE VIEW v_users AS SELECT id FROM users;
+            CREATE TEMP TABLE scratch (x INTEGER);
+            BEGIN;
+            INSERT INTO users VALUES (1);
+        """)
+    with pool.connection() as conn:
+        objects = conn.execute("SELECT name FROM sqlite_master").fetchall()
+        assert objects == []
+        # Повторное создание той же таблицы не должно падать
+        conn.executescript("CREATE TABLE users (id INTEGER PRIMARY KEY);")
+
+def test_sqlite_pool_reuses_connection(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert first is second
+
+def test_sqlite_pool_drops_tables_named_like_system_tables(pool):
+    # В LIKE 'sqlite_%' «_» — любой символ, а регистр не учитывается
+    with pool.connection() as conn:
+        conn.executescript("CREATE TABLE sqliteusers (id INTEGER); CREATE TABLE SQLite1x (id INTEGER);")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT name FROM sqlite_master").fetchall() == []
+        conn.executescript("CREATE TABLE sqliteusers (id INTEGER);")
+
+def test_sqlite_pool_discards_connection_after_pragma(pool):
+    with pool.connection() as first:
+        first.executescript("PRAGMA recursive_triggers = ON; PRAGMA foreign_keys = ON;")
+    with pool.connection() as second:
+        assert second is not first
+        assert second.execute("PRAGMA recursive_triggers").fetchone() == (0,)
+        assert second.execute("PRAGMA foreign_keys").fetchone() == (0,)
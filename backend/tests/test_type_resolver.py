@@ -0,0 +1,38 @@
+import pytest
+
+from app.converters.types import TypeResolver, get_type_resolver
+
+def test_resolver_matches_whole_words_only():
+    resolve = get_type_resolver().resolve
+    assert resolve("int") == "INTEGER"
+    assert resolve("bigint") == "BIGINT"
+    # Подстрока «int» внутри другого слова типом не считается
+    assert resolve("interval") == "VARCHAR(255)"
+    assert resolve("point") == "VARCHAR(255)"
+    assert resolve("") == "VARCHAR(255)"
+
+def test_resolver_keeps_parameters_and_unknown_sql_types():
+    resolve = get_type_resolver().resolve
+    assert resolve("varchar( 100 )") == "VARCHAR(100)"
+    assert resolve("NUMERIC(10, 2)") == "NUMERIC(10,2)"
+    assert resolve("string") == "VARCHAR(255)"
+    assert resolve("CITEXT", default=None) == "CITEXT"
+
+def test_resolver_keeps_modifiers_and_suffixes():
+    resolve = get_type_resolver().resolve
+    assert resolve("VARCHAR(20) NOT NULL") == "VARCHAR(20) NOT NULL"
+    assert resolve("INT  UNSIGNED") == "INT UNSIGNED"
+    assert resolve("integer[]") == "integer[]"
+    # Ширина отображения MySQL у целых типов в другие СУБД не переносится
+    assert resolve("tinyint(1)") == "SMALLINT"
+    # Тип, не начинающийся с известного псевдонима, считается нераспознанным
+    assert resolve("Unsigned INT") == "VARCHAR(255)"
+    assert resolve("Unsigned INT", default=None) == "Unsigned INT"
+    assert TypeResolver("postgres").resolve("double precision[]", default=None) == "double precision[]"
+
+def test_resolver_uses_dialect_spelling():
+    assert TypeResolver("postgres").resolve("float") == "DOUBLE PRECISION"
+    assert TypeResolver("mysql").resolve("uuid") == "CHAR(36)"
+    assert TypeResolver("mysql").resolve("datetime") == "DATETIME"
+    with pytest.raises(ValueError):
+        TypeResolver("oracle")
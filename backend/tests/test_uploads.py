@@ -0,0 +1,83 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+
+from app import uploads
+from app.main import app
+from app.uploads import UploadLimitMiddleware
+
+def _call(middleware, chunks, headers=()):
+    sent = []
+    body = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+            for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return body.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": list(headers)}
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+def test_upload_limit_sends_413_even_if_app_swallows_error():
+    async def endpoint(scope, receive, send):
+        # Приложение глушит любую ошибку чтения тела и пытается ответить 400
+        try:
+            while (await receive()).get("more_body"):
+                pass
+        except Exception:
+            pass
+        await send({"type": "http.response.start", "status": 400, "headers": []})
+        await send({"type": "http.response.body", "body": b"bad"})
+
+    sent = _call(UploadLimitMiddleware(endpoint, max_size=4), [b"abc", b"def"])
+    assert [m["status"] for m in sent if m["type"] == "http.response.start"] == [413]
+    assert b"bad" not in b"".join(m.get("body", b"") for m in sent)
+
+def test_upload_limit_checks_content_length_before_app():
+    called = []
+
+    async def endpoint(scope, receive, send):
+        called.append(scope)
+
+    sent = _call(UploadLimitMiddleware(endpoint, max_size=4), [b""], [(b"content-length", b"10")])
+    assert sent[0]["status"] == 413 and called == []
+
+def _find_middleware(cls):
+    layer = app.middleware_stack
+    while not isinstance(layer, cls):
+        layer = layer.app
+    return layer
+
+def test_upload_limit_response_has_cors_headers(monkeypatch):
+    with TestClient(app) as client:
+        client.get("/stats/cache")
+        monkeypatch.setattr(_find_middleware(UploadLimitMiddleware), "max_size", 4)
+        response = client.post(
+            "/convert",
+            files={"file": ("t.xml", b"<mxGraphModel/>", "application/xml")},
+            headers={"Origin": "http://localhost:5173"},
+        )
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+
+def test_spool_threshold_is_per_application(monkeypatch):
+    monkeypatch.setattr(uploads._SpoolingParser, "spool_max_size", 4)
+    spooled = []
+    original = uploads._SpoolingParser.parse
+
+    async def parse(self):
+        form = await original(self)
+        spooled.extend(upload.file._rolled for _, upload in form.multi_items())
+        return form
+
+    monkeypatch.setattr(uploads._SpoolingParser, "parse", parse)
+    with TestClient(app) as client:
+        client.post("/convert", files={"file": ("t.xml", b"<mxGraphModel/>", "application/xml")})
+
+    # Файл больше порога приложения ушёл на диск; класс Starlette не изменён
+    assert spooled == [True]
+    assert MultiPartParser.spool_max_size == 1024 * 1024
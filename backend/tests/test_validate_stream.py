@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+from app import main
+from app.main import app
+
+def test_validate_stream_sends_each_stage_then_report():
+    with TestClient(app) as client:
+        response = client.post("/validate/stream", json={
+            "sql": "CREATE TABLE t (id INTEGER PRIMARY KEY);\nINSERT INTO missing VALUES (1);\n",
+            "stages": ["sqlite", "ast"],
+        })
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(event["stage"] for event in events[:-1]) == ["ast", "sqlite"]
+    sqlite = next(event for event in events if event.get("stage") == "sqlite")
+    assert sqlite["sqlite_error"] == "no such table: missing"
+    assert sqlite["sqlite_statement"] == 2
+
+    done = events[-1]
+    assert done["event"] == "done"
+    assert done["report"]["sqlite_statement"] == 2
+
+def test_slow_stage_times_out_while_others_report(monkeypatch):
+    run = main.executor.run
+
+    async def slow_ast(stage, script):
+        if stage == "ast":
+            await asyncio.Event().wait()
+        return await run(stage, script)
+
+    monkeypatch.setattr(main.executor, "run", slow_ast)
+    with TestClient(app) as client:
+        response = client.post("/validate", json={
+            "sql": "CREATE TABLE slow_stage_t (id INTEGER PRIMARY KEY);\nINSERT INTO missing VALUES (1);\n",
+            "stages": ["sqlite", "ast"],
+            "timeout": 0.2,
+        })
+
+    report = response.json()
+    assert report["timed_out"] == ["ast"]
+    assert report["sqlite_error"] == "no such table: missing"
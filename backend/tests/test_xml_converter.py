@@ -1,5 +1,17 @@
+import base64
+import io
+import zlib
+from urllib.parse import quote
+
 import pytest
-from app.converters.xml_converter import parse_drawio_xml
+from fastapi.testclient import TestClient
+
+from app import executors
+from app.converters import xml_converter
+from app.main import app, executor
+from app.converters.model import ForeignKey
+from app.converters.xml_converter import parse_drawio_xml, read_drawio_xml
+from benchmarks.generators import generate_schema, to_drawio_pages
 
 @pytest.fixture
 def sample_xml_file(tmp_path):
@@ -10,4 +22,84 @@ def sample_xml_file(tmp_path):
 
 def test_xml_converter_returns_list(sample_xml_file):
     result = parse_drawio_xml(sample_xml_file)
-    assert isinstance(result, list)
\ No newline at end of file
+    assert isinstance(result, list)
+
+def test_xml_converter_streaming_matches_tree(tmp_path):
+    data = """<mxfile><diagram><mxGraphModel><root>
+        <mxCell id="1" value="User&lt;br&gt;id: int&lt;br&gt;name: string" style="shape=table"/>
+        <mxCell id="2" value="Post&lt;br&gt;id: int" style="shape=table"/>
+        <mxCell id="3" edge="1" source="2" target="1"/>
+    </root></mxGraphModel></diagram></mxfile>"""
+    path = tmp_path / "rel.xml"
+    path.write_text(data)
+    result = parse_drawio_xml(str(path), streaming=True)
+    assert result == parse_drawio_xml(str(path))
+    assert "REFERENCES User(id)" in result[-1]
+
+def test_bare_top_level_cells_read_in_both_modes():
+    data = b"""<mxfile>
+        <mxCell id="u" value="users&lt;br&gt;id: int" style="shape=table"><mxGeometry as="geometry"/></mxCell>
+        <object id="p" label="posts"><mxCell style="swimlane;" vertex="1"/></object>
+        <mxCell id="p1" value="PK id: int" style="text;" vertex="1" parent="p"/>
+        <mxCell id="p2" value="user_id: int" style="text;" vertex="1" parent="p"/>
+        <mxCell id="e" edge="1" source="p2" target="u"/>
+    </mxfile>"""
+    tree, streamed = (read_drawio_xml(io.BytesIO(data), streaming) for streaming in (False, True))
+    assert [table.name for table in streamed.tables] == ["users", "posts"]
+    assert streamed.foreign_keys == [ForeignKey("posts", "user_id", "users", "id")]
+    assert (streamed.tables, streamed.foreign_keys) == (tree.tables, tree.foreign_keys)
+
+def _compress(xml):
+    deflate = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return base64.b64encode(deflate.compress(quote(xml, safe="").encode()) + deflate.flush()).decode()
+
+def test_compressed_pages_with_table_rows_and_html_labels():
+    rows_page = """<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>
+        <mxCell id="u" value="users" style="shape=table;container=1;html=1;" vertex="1" parent="1"/>
+        <mxCell id="u1" style="shape=tableRow;" vertex="1" parent="u"/>
+        <mxCell id="u1a" value="PK" style="shape=partialRectangle;" vertex="1" parent="u1"/>
+        <mxCell id="u1b" value="id" style="shape=partialRectangle;" vertex="1" parent="u1"/>
+        <mxCell id="u1c" value="int" style="shape=partialRectangle;" vertex="1" parent="u1"/>
+        <mxCell id="u2" style="shape=tableRow;" vertex="1" parent="u"/>
+        <mxCell id="u2b" value="&lt;b&gt;email&lt;/b&gt;" style="shape=partialRectangle;html=1;" vertex="1" parent="u2"/>
+        <mxCell id="u2c" value="varchar(100)" style="shape=partialRectangle;" vertex="1" parent="u2"/>
+        <object id="p" label="&lt;div&gt;posts&lt;/div&gt;"><mxCell style="swimlane;html=1;" vertex="1" parent="1"/></object>
+        <mxCell id="p1" value="PK id: int" style="text;" vertex="1" parent="p"/>
+        <mxCell id="p2" value="author: int" style="text;" vertex="1" parent="p"/>
+        <mxCell id="e" edge="1" source="u1" target="p2" parent="1"/>
+    </root></mxGraphModel>"""
+    legacy_page = """<mxGraphModel><root>
+        <mxCell id="t" value="tags&lt;br&gt;id: int&lt;br&gt;name: text" style="shape=table;html=1;"/>
+        <mxCell id="u" value="users" style="shape=table;"/>
+        <mxCell id="e" edge="1" source="t" target="u"/>
+    </root></mxGraphModel>"""
+    data = f"<mxfile><diagram>{_compress(rows_page)}</diagram><diagram>{legacy_page}</diagram></mxfile>"
+
+    for streaming in (False, True):
+        schema = read_drawio_xml(io.BytesIO(data.encode()), streaming)
+        # Таблица users со второй страницы совпадает с первой и не дублируется
+        assert [table.name for table in schema.tables] == ["users", "posts", "tags"]
+        assert [(col.name, col.type, col.primary_key) for col in schema.tables[0].columns] == [
+            ("id", "INTEGER", True), ("email", "VARCHAR(100)", False),
+        ]
+        # Связь от PK к строке author развёрнута в posts.author → users.id
+        assert schema.foreign_keys == [
+            ForeignKey("posts", "author", "users", "id"),
+            ForeignKey("tags", "users_id", "users", "id"),
+        ]
+
+def test_compressed_pages_parse_in_parallel(monkeypatch):
+    monkeypatch.setattr(xml_converter, "DRAWIO_PARALLEL_MIN_BYTES", 0)
+    monkeypatch.setattr(executors, "DRAWIO_PAGE_WORKERS", 2)
+    schema = generate_schema(tables=30, columns=4, fk_density=0.5, seed=1)
+    data = to_drawio_pages(schema, seed=1, pages=5).encode()
+
+    with TestClient(app) as client:
+        pool = executor.convert_pool
+        completed = pool.completed
+        response = client.post("/convert", files={"file": ("pages.drawio", data)}).json()
+        # Страницы ушли в пул конвертации приложения двумя вызовами
+        assert pool.completed - completed == 2
+    assert len(response["tables"]) == 30
+    assert len(response["foreign_keys"]) == 15
+    assert xml_converter._page_map is None
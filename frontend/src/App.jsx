@@ -4,6 +4,29 @@ import "./App.css";
 
 const Spinner = () => <div className="spinner" />;
 
+// очистка LLM-отчёта
+const cleanLLM = (raw) =>
+  raw
+    .map((line) => line.trim())
+    .filter((line) => line.length > 5)
+    .filter((line, i, arr) => arr.indexOf(line) === i);
+
+// Читает NDJSON-ответ построчно и передаёт каждое событие в onEvent
+const readEvents = async (res, onEvent) => {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+    if (done) break;
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+};
+
 export default function App() {
   const [file, setFile] = useState(null);
   const [sql, setSql] = useState("");
@@ -11,10 +34,20 @@ export default function App() {
   const [convertLoading, setConvertLoading] = useState(false);
   const [validateLoading, setValidateLoading] = useState(false);
   const [error, setError] = useState("");
+  // Сессия редактирования одной диаграммы: повторная проверка перепроверяет
+  // только изменившиеся таблицы
+  const [session, setSession] = useState(() => crypto.randomUUID());
+  // Внешние ключи внутри CREATE TABLE, таблицы в порядке зависимостей
+  const [ordered, setOrdered] = useState(false);
+  const [levels, setLevels] = useState([]);
+  // Целевой диалект SQL; пустая строка — общий SQL
+  const [dialect, setDialect] = useState("");
 
   const handleFile = (e) => {
     setFile(e.target.files[0]);
+    setSession(crypto.randomUUID());
     setSql("");
+    setLevels([]);
     setReport(null);
     setError("");
   };
@@ -31,8 +64,10 @@ export default function App() {
       form.append("file", file);
       const res = await axios.post("http://127.0.0.1:8000/convert", form, {
         headers: { "Content-Type": "multipart/form-data" },
+        params: { mode: ordered ? "ordered" : "alter", dialect: dialect || undefined },
       });
       setSql(res.data.sql.join("\n"));
+      setLevels(res.data.levels || []);
     } catch (e) {
       setError(e.response?.data?.detail || e.message);
     } finally {
@@ -47,31 +82,33 @@ export default function App() {
     }
     setValidateLoading(true);
     setError("");
+    setReport({ lint_issues: [], ast_messages: [], rule_findings: [], llm_report: [], timed_out: [] });
     try {
-      const res = await axios.post(
-        "http://127.0.0.1:8000/validate",
-        { sql },
-        { headers: { "Content-Type": "application/json" } }
-      );
-      // очистка LLM-отчёта
-      const rawLLM = res.data.llm_report || [];
-      const cleanLLM = rawLLM
-        .map((line) => line.trim())
-        .filter((line) => line.length > 5)
-        .filter((line, i, arr) => arr.indexOf(line) === i);
-
-      setReport({
-        lint_issues: res.data.lint_issues,
-        sqlite_error: res.data.sqlite_error,
-        ast_messages: res.data.ast_messages,
-        llm_report: cleanLLM,
+      // Этапы приходят NDJSON-строками по мере готовности: быстрые проверки
+      // видны сразу, не дожидаясь LLM
+      const res = await fetch("http://127.0.0.1:8000/validate/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ sql, session, dialect: dialect || null }),
+      });
+      if (!res.ok) {
+        const data = await res.json().catch(() => ({}));
+        throw new Error(
+          typeof data.detail === "string" ? data.detail : JSON.stringify(data)
+        );
+      }
+      await readEvents(res, (event) => {
+        if (event.event !== "stage") return;
+        const { event: _, stage, timed_out, ...fields } = event;
+        if (fields.llm_report) fields.llm_report = cleanLLM(fields.llm_report);
+        setReport((prev) => ({
+          ...prev,
+          ...fields,
+          timed_out: timed_out ? [...prev.timed_out, stage] : prev.timed_out,
+        }));
       });
     } catch (e) {
-      setError(
-        e.response?.data?.detail ||
-          JSON.stringify(e.response?.data) ||
-          e.message
-      );
+      setError(e.message);
     } finally {
       setValidateLoading(false);
     }
@@ -94,9 +131,23 @@ export default function App() {
       <div className="uploader">
         <input
           type="file"
-          accept=".xml,.erd,.graphml"
+          accept=".xml,.drawio,.erd,.graphml"
           onChange={handleFile}
         />
+        <label>
+          <input
+            type="checkbox"
+            checked={ordered}
+            onChange={(e) => setOrdered(e.target.checked)}
+          />
+          Внешние ключи внутри CREATE TABLE
+        </label>
+        <select value={dialect} onChange={(e) => setDialect(e.target.value)}>
+          <option value="">Общий SQL</option>
+          <option value="postgres">PostgreSQL</option>
+          <option value="mysql">MySQL</option>
+          <option value="sqlite">SQLite</option>
+        </select>
         <button
           className="btn-primary"
           onClick={handleConvert}
@@ -113,6 +164,12 @@ export default function App() {
         <section className="panel">
           <h2>Сгенерированный SQL</h2>
           <textarea readOnly value={sql} rows={10} />
+          {levels.length > 0 && (
+            <p>
+              Уровней развёртывания: {levels.length} (таблицы одного уровня
+              можно создавать параллельно)
+            </p>
+          )}
           <div className="download-bar">
             <button
               className="btn-secondary"
@@ -159,7 +216,11 @@ export default function App() {
           {report.sqlite_error && (
             <section className="panel">
               <h2>SQLite Error</h2>
-              <pre>{report.sqlite_error}</pre>
+              <pre>
+                {report.sqlite_statement != null
+                  ? `Инструкция ${report.sqlite_statement}: ${report.sqlite_error}`
+                  : report.sqlite_error}
+              </pre>
             </section>
           )}
 
@@ -171,6 +232,25 @@ export default function App() {
             </section>
           )}
 
+          {/* Правила */}
+          {report.rule_findings.length > 0 && (
+            <section className="panel">
+              <h2>Правила</h2>
+              <pre>
+                {report.rule_findings
+                  .map((f) => `${f.severity === "error" ? "Ошибка" : "Предупреждение"} [${f.rule}]: ${f.message}`)
+                  .join("\n")}
+              </pre>
+            </section>
+          )}
+
+          {report.llm_skipped && (
+            <section className="panel">
+              <h2>LLM Report</h2>
+              <p>CodeT5 не запускался: сначала исправьте ошибки, найденные правилами</p>
+            </section>
+          )}
+
           {/* LLM Report */}
           {report.llm_report.length > 0 && (
             <section className="panel">